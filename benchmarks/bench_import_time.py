@@ -0,0 +1,53 @@
+"""Benchmark import cost of the CLI and package entry points.
+
+Runs each import in a fresh interpreter under ``python -X importtime``
+and reports the median cumulative time plus the slowest modules it pulled
+in, so a stray top-level import of CrewAI, Ollama or the ORM shows up.
+
+Usage::
+
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --repeat 10 --top 15
+"""
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+import typer
+
+cli = typer.Typer(help="Import time benchmark")
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+TARGETS = ["mimi3", "ma_framework", "mimi3.cli", "mimi3.database", "mimi3.models", "mimi3.agents.base"]
+
+def import_profile(module: str) -> dict[str, tuple[int, int]]:
+    """``{module: (self_us, cumulative_us)}`` for a fresh ``import module``."""
+    env = {**os.environ, "PYTHONPATH": str(SRC)}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+@cli.command()
+def run(
+    repeat: int = typer.Option(5, help="Fresh interpreters per target."),
+    top: int = typer.Option(5, help="Slowest imported modules to list per target."),
+) -> None:
+    for target in TARGETS:
+        profiles = [import_profile(target) for _ in range(repeat)]
+        total = statistics.median(p[target][1] for p in profiles) / 1000
+        typer.echo(f"{target:<20} {total:9.1f} ms  ({len(profiles[-1])} modules)")
+        slowest = sorted(profiles[-1].items(), key=lambda kv: -kv[1][0])[:top]
+        for name, (self_us, _) in slowest:
+            typer.echo(f"    {name:<40} {self_us / 1000:8.1f} ms self")
+
+if __name__ == "__main__":
+    cli()
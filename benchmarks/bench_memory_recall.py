@@ -0,0 +1,121 @@
+"""Benchmark MemoryTool recall latency as the memories table grows.
+
+The log is spread over many tasks so that recall for a single
+``(agent, task)`` pair must be served by the composite index rather than a
+scan. At every checkpoint the script reports the latency of ``recall``, a
+keyset ``recall_page`` deep into history and the equivalent OFFSET query.
+
+Usage::
+
+    python benchmarks/bench_memory_recall.py --rows 10000000
+    python benchmarks/bench_memory_recall.py --rows 1000000 --no-index
+"""
+import datetime
+import os
+import statistics
+import tempfile
+import time
+import uuid
+import typer
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from mimi3 import models
+from mimi3.models import Base
+from mimi3.crud import create_role, create_model, create_agent, create_project, create_task
+from mimi3.tools.memory import MemoryTool
+
+cli = typer.Typer(help="MemoryTool recall benchmark")
+
+def _median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+@cli.command()
+def run(
+    url: str = typer.Option("", help="Database URL (defaults to a temporary SQLite file)."),
+    rows: int = typer.Option(1_000_000, help="Final size of the memories table."),
+    tasks: int = typer.Option(100, help="Number of tasks the log is spread across."),
+    depth: int = typer.Option(50, help="Page number used for the deep-history probe."),
+    page_size: int = typer.Option(20, help="Entries per page."),
+    chunk: int = typer.Option(50_000, help="Rows inserted per transaction while seeding."),
+    repeat: int = typer.Option(20, help="Samples per measurement."),
+    index: bool = typer.Option(True, help="Keep the composite recall index."),
+) -> None:
+    if not url:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    if not index:
+        for idx in models.Memory.__table__.indexes:
+            idx.drop(bind=engine, checkfirst=True)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    typer.echo(f"Database: {engine.url.render_as_string(hide_password=True)}  index={index}")
+
+    checkpoints = []
+    n = 10_000
+    while n < rows:
+        checkpoints.append(n)
+        n *= 10
+    checkpoints.append(rows)
+
+    with Session() as db:
+        uid = uuid.uuid4().hex[:8]
+        role = create_role(db, name=f"BenchRole-{uid}")
+        model = create_model(db, name=f"bench-{uid}")
+        agent = create_agent(db, name=f"BenchAgent-{uid}", role=role, models_=[model])
+        project = create_project(db, name=f"BenchProject-{uid}", goal="Benchmark")
+        task_ids = [create_task(db, project=project, title=f"BenchTask-{uid}-{i}").id for i in range(tasks)]
+        agent_id, target = agent.id, task_ids[0]
+        mem = MemoryTool(db)
+        m = models.Memory
+        base = datetime.datetime(2024, 1, 1)
+
+        typer.echo(f"{'rows':>12} {'recall':>10} {'keyset':>10} {'offset':>10}   (median ms, page {depth})")
+        written = 0
+        for target_rows in checkpoints:
+            while written < target_rows:
+                n = min(chunk, target_rows - written)
+                db.execute(
+                    insert(m),
+                    [
+                        {
+                            "agent_id": agent_id,
+                            "task_id": task_ids[i % tasks],
+                            "timestamp": base + datetime.timedelta(microseconds=i),
+                            "content": f"memory {i}",
+                        }
+                        for i in range(written, written + n)
+                    ],
+                )
+                db.commit()
+                written += n
+
+            # Resolve the cursor that precedes the deep page once, outside the timing.
+            cursor = None
+            for _ in range(depth):
+                _, cursor = mem.recall_page(agent_id=agent_id, task_id=target, limit=page_size, before=cursor)
+                if cursor is None:
+                    break
+
+            offset_stmt = (
+                select(m.content)
+                .where(m.agent_id == agent_id, m.task_id == target)
+                .order_by(m.timestamp.desc(), m.id.desc())
+                .offset(depth * page_size)
+                .limit(page_size)
+            )
+            recall_ms = _median_ms(lambda: mem.recall(agent_id=agent_id, task_id=target, limit=page_size), repeat)
+            keyset_ms = _median_ms(
+                lambda: mem.recall_page(agent_id=agent_id, task_id=target, limit=page_size, before=cursor), repeat
+            )
+            offset_ms = _median_ms(lambda: db.execute(offset_stmt).all(), repeat)
+            typer.echo(f"{written:>12,} {recall_ms:>10.3f} {keyset_ms:>10.3f} {offset_ms:>10.3f}")
+
+    engine.dispose()
+
+if __name__ == "__main__":
+    cli()
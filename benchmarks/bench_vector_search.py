@@ -0,0 +1,67 @@
+"""Benchmark memory vector search: exact vs. IVF recall and latency.
+
+Synthetic clustered embeddings stand in for real ones so the run needs no
+Ollama server. For each ``n_probe`` the IVF index is compared with the
+brute-force result for the same queries (recall@k), and median query
+latency is reported for both.
+
+Usage::
+
+    python benchmarks/bench_vector_search.py --vectors 200000 --dim 768
+    python benchmarks/bench_vector_search.py --probes 1,4,16,64
+"""
+import statistics
+import time
+import numpy as np
+import typer
+from mimi3.tools.vector_index import BruteForceIndex, IVFIndex
+
+cli = typer.Typer(help="Vector search benchmark")
+
+def _clustered(rng, n: int, dim: int, centres: np.ndarray) -> np.ndarray:
+    points = centres[rng.integers(len(centres), size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+
+def _median_ms(index, queries, k: int) -> tuple[float, list[set[int]]]:
+    samples, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        hits = index.search(q, k)
+        samples.append((time.perf_counter() - start) * 1000)
+        results.append({i for i, _ in hits})
+    return statistics.median(samples), results
+
+@cli.command()
+def run(
+    vectors: int = typer.Option(100_000, help="Number of stored vectors."),
+    dim: int = typer.Option(384, help="Embedding dimension."),
+    clusters: int = typer.Option(200, help="Topics the synthetic data is drawn from."),
+    queries: int = typer.Option(200, help="Number of queries."),
+    k: int = typer.Option(10, help="Neighbours per query."),
+    lists: int = typer.Option(0, help="IVF cells (0 = sqrt(vectors))."),
+    probes: str = typer.Option("1,4,8,16,32", help="Comma-separated n_probe values."),
+) -> None:
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(clusters, dim))
+    data = _clustered(rng, vectors, dim, centres)
+    qs = _clustered(rng, queries, dim, centres)
+    ids = np.arange(vectors)
+
+    exact = BruteForceIndex()
+    exact.add(ids, data)
+    exact_ms, truth = _median_ms(exact, qs, k)
+    typer.echo(f"{vectors} vectors x {dim} dims, k={k}")
+    typer.echo(f"{'brute force':<16} recall 1.000  {exact_ms:8.3f} ms/query")
+
+    start = time.perf_counter()
+    ivf = IVFIndex(n_lists=lists or None, train_size=min(vectors, 20_000))
+    ivf.add(ids, data)
+    typer.echo(f"IVF build ({len(ivf._lists)} cells): {time.perf_counter() - start:.2f}s")
+    for n_probe in (int(p) for p in probes.split(",")):
+        ivf.n_probe = n_probe
+        ms, found = _median_ms(ivf, qs, k)
+        recall = statistics.mean(len(f & t) / k for f, t in zip(found, truth))
+        typer.echo(f"{'IVF n_probe=' + str(n_probe):<16} recall {recall:.3f}  {ms:8.3f} ms/query")
+
+if __name__ == "__main__":
+    cli()
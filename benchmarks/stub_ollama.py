@@ -0,0 +1,191 @@
+"""Local stand-in for the Ollama HTTP API, for benchmarks.
+
+Serves ``/api/generate`` (streamed and not), ``/api/embed`` and
+``/api/ps`` with configurable per-model behaviour, so throughput of the
+framework itself can be measured without a GPU. Generated text is
+``tokens`` words long and is produced at ``tokens_per_sec`` after
+``latency`` seconds; a model fails a request with probability
+``failure_rate`` and pays ``load_delay`` on its first request. Timings are
+reported in Ollama's ``*_duration`` fields.
+
+Usage::
+
+    python benchmarks/stub_ollama.py --port 11434 --latency 0.05 --tokens-per-sec 200
+    python benchmarks/stub_ollama.py --failure-rate 0.2 --model flaky
+"""
+from __future__ import annotations
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import typer
+
+@dataclass(frozen=True)
+class ModelBehaviour:
+    latency: float = 0.0  # seconds before the first token
+    tokens_per_sec: float = 0.0  # 0: all tokens at once
+    tokens: int = 16
+    failure_rate: float = 0.0
+    load_delay: float = 0.0
+
+class StubOllama:
+    """Threaded stub server; use as a context manager or call :meth:`start`.
+
+    ``models`` maps a model name to its :class:`ModelBehaviour`; other
+    models get ``default``. Request counts per model and outcome are kept
+    in ``stats``.
+    """
+
+    def __init__(
+        self,
+        models: dict[str, ModelBehaviour] | None = None,
+        *,
+        default: ModelBehaviour = ModelBehaviour(),
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ) -> None:
+        self.models = dict(models or {})
+        self.default = default
+        self.stats: dict[tuple[str, str], int] = {}
+        self._loaded: set[str] = set()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+            disable_nagle_algorithm = True  # headers and body are separate writes
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path != "/api/ps":
+                    self._send(404, {"error": "not found"})
+                    return
+                with stub._lock:
+                    loaded = sorted(stub._loaded)
+                self._send(200, {"models": [{"name": m, "model": m, "size": 0, "size_vram": 0} for m in loaded]})
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                model = body.get("model", "")
+                spec = stub.behaviour(model)
+                with stub._lock:
+                    fail = stub._rng.random() < spec.failure_rate
+                    cold = model not in stub._loaded
+                    stub._loaded.add(model)
+                load = spec.load_delay if cold else 0.0
+                time.sleep(load + spec.latency)
+                if fail:
+                    stub._count(model, "failed")
+                    self._send(500, {"error": f"{model}: injected failure"})
+                    return
+                stub._count(model, "ok")
+                if self.path == "/api/embed":
+                    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+                    vectors = [[float(len(t) % 7), float(len(t) % 11), 1.0] for t in inputs]
+                    self._send(200, {"model": model, "embeddings": vectors})
+                    return
+                timings = {
+                    "load_duration": int(load * 1e9),
+                    "prompt_eval_count": len(str(body.get("prompt", "")).split()),
+                    "prompt_eval_duration": int(spec.latency * 1e9),
+                }
+                if body.get("prompt") == "":
+                    self._send(200, {"model": model, "response": "", "done": True, "done_reason": "load", **timings})
+                    return
+                words = [f"tok{i}" for i in range(spec.tokens)]
+                gap = 1 / spec.tokens_per_sec if spec.tokens_per_sec else 0.0
+                timings |= {"eval_count": len(words), "eval_duration": int(gap * len(words) * 1e9)}
+                if body.get("stream", True):
+                    self._stream(model, words, gap, timings)
+                    return
+                time.sleep(gap * len(words))
+                context = list(body.get("context") or []) + [len(words)]
+                self._send(200, {"model": model, "response": " ".join(words), "done": True, "context": context, **timings})
+
+            def _stream(self, model: str, words: list[str], gap: float, timings: dict) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, word in enumerate(words):
+                    time.sleep(gap)
+                    self._chunk({"model": model, "response": word if i == 0 else " " + word, "done": False})
+                self._chunk({"model": model, "response": "", "done": True, **timings})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, payload: dict) -> None:
+                data = json.dumps(payload).encode() + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send(self, status: int, payload: dict) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def behaviour(self, model: str) -> ModelBehaviour:
+        return self.models.get(model, self.default)
+
+    def _count(self, model: str, outcome: str) -> None:
+        with self._lock:
+            self.stats[(model, outcome)] = self.stats.get((model, outcome), 0) + 1
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubOllama":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubOllama":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+cli = typer.Typer(help="Stub Ollama server")
+
+@cli.command()
+def serve(
+    host: str = typer.Option("127.0.0.1"),
+    port: int = typer.Option(11434),
+    latency: float = typer.Option(0.05, help="Seconds before the first token."),
+    tokens_per_sec: float = typer.Option(100.0, help="Generation rate (0 = instant)."),
+    tokens: int = typer.Option(32, help="Tokens per completion."),
+    failure_rate: float = typer.Option(0.0, help="Probability a request fails."),
+    load_delay: float = typer.Option(0.0, help="Seconds a model takes to load on first use."),
+    model: list[str] = typer.Option([], help="Apply these settings only to these models (others are instant)."),
+) -> None:
+    behaviour = ModelBehaviour(latency, tokens_per_sec, tokens, failure_rate, load_delay)
+    if model:
+        stub = StubOllama({m: behaviour for m in model}, host=host, port=port)
+    else:
+        stub = StubOllama(default=behaviour, host=host, port=port)
+    typer.echo(f"Stub Ollama at {stub.url}; Ctrl-C to stop.")
+    with stub:
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    cli()
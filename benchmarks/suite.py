@@ -0,0 +1,261 @@
+"""Throughput benchmark suite against a stub Ollama server.
+
+Runs each scenario on a fresh database and a local :mod:`stub_ollama`
+server, and writes machine-readable results for regression comparison:
+
+* ``crud``    - seeding a synthetic project (tasks/s)
+* ``memory``  - ``MemoryTool.save`` vs. ``save_many`` (rows/s), ``recall`` latency
+* ``agent``   - ``MultiModelAgent.run`` with a healthy primary, a dead
+  primary (static fallback and adaptive routing) and a flaky primary
+* ``project`` - end-to-end ``TaskRunner`` execution of a layered project,
+  thread and async modes (tasks/s)
+
+Results are a JSON document ``{"meta": {...}, "results": [...]}`` with one
+entry per ``(benchmark, case, metric)``. With ``--baseline`` the run is
+compared against an earlier file and exits non-zero if any metric
+regressed by more than ``--tolerance``.
+
+Usage::
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --only agent --only project --latency 0.02
+    python benchmarks/suite.py --baseline results.json --tolerance 0.15
+"""
+from __future__ import annotations
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+import typer
+from stub_ollama import ModelBehaviour, StubOllama
+from synthetic import generate_project, sentences
+
+cli = typer.Typer(help="Benchmark suite")
+
+SCENARIOS = ["crud", "memory", "agent", "project"]
+
+class Results:
+    def __init__(self) -> None:
+        self.rows: list[dict] = []
+
+    def add(self, benchmark: str, case: str, metric: str, value: float, unit: str, *, higher_is_better: bool) -> None:
+        self.rows.append(
+            {
+                "benchmark": benchmark,
+                "case": case,
+                "metric": metric,
+                "value": round(value, 6),
+                "unit": unit,
+                "higher_is_better": higher_is_better,
+            }
+        )
+        typer.echo(f"  {benchmark:<8} {case:<22} {metric:<14} {value:>12.3f} {unit}")
+
+def _latencies(fn: Callable[[], object], n: int) -> tuple[float, list[float]]:
+    samples = []
+    start = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return time.perf_counter() - start, samples
+
+def _p95(samples: list[float]) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+# ---------- Scenarios ----------------------------------------------------
+
+def bench_crud(results: Results, session_factory, *, tasks: int, agents: int) -> None:
+    with session_factory() as db:
+        start = time.perf_counter()
+        generate_project(db, tasks=tasks, agents=agents, agents_per_task=2, layers=4)
+        elapsed = time.perf_counter() - start
+    results.add("crud", f"seed {tasks}x{agents}", "throughput", tasks / elapsed, "tasks/s", higher_is_better=True)
+
+def bench_memory(results: Results, session_factory, *, rows: int, repeat: int) -> None:
+    from mimi3.tools.memory import MemoryTool
+
+    with session_factory() as db:
+        p = generate_project(db, tasks=10, agents=2, memories=rows // 10)
+        tool = MemoryTool(db)
+        agent_id, task_id = p.agent_ids[0], p.task_ids[0]
+        texts = sentences(random.Random(1), 1000)
+
+        n = min(rows, 1000)
+        start = time.perf_counter()
+        for text in texts[:n]:
+            tool.save(agent_id=agent_id, task_id=task_id, content=text)
+        results.add("memory", "save", "throughput", n / (time.perf_counter() - start), "rows/s", higher_is_better=True)
+
+        batch = [{"agent_id": agent_id, "task_id": task_id, "content": t} for t in texts] * (rows // 1000 or 1)
+        start = time.perf_counter()
+        tool.save_many(batch)
+        results.add(
+            "memory", "save_many", "throughput", len(batch) / (time.perf_counter() - start), "rows/s", higher_is_better=True
+        )
+
+        _, samples = _latencies(lambda: tool.recall(agent_id=agent_id, task_id=task_id, limit=20), repeat)
+        results.add("memory", "recall", "p50", statistics.median(samples), "ms", higher_is_better=False)
+        results.add("memory", "recall", "p95", _p95(samples), "ms", higher_is_better=False)
+
+def bench_agent(results: Results, *, calls: int) -> None:
+    from mimi3.agents import base
+    from mimi3.agents.base import MultiModelAgent
+    from mimi3.llm.health import HealthRegistry
+    from mimi3.runner import PromptTask
+
+    cases = {
+        "primary": (["bench-fast"], "static"),
+        "fallback static": (["bench-down", "bench-fast"], "static"),
+        "fallback adaptive": (["bench-down", "bench-fast"], "adaptive"),
+        "flaky primary": (["bench-flaky", "bench-fast"], "static"),
+    }
+    for case, (model_names, routing) in cases.items():
+        base._health = HealthRegistry()  # every case starts with no routing history
+        agent = MultiModelAgent(
+            name=f"Bench {case}", role="Benchmark", goal="Answer", backstory="", models=model_names, routing=routing
+        )
+        task = PromptTask("Say something short.")
+        elapsed, samples = _latencies(lambda: agent.run(task), calls)
+        results.add("agent", case, "throughput", calls / elapsed, "calls/s", higher_is_better=True)
+        results.add("agent", case, "p50", statistics.median(samples), "ms", higher_is_better=False)
+        results.add("agent", case, "p95", _p95(samples), "ms", higher_is_better=False)
+
+def bench_project(results: Results, session_factory, *, tasks: int, agents: int, concurrency: int) -> None:
+    from mimi3.runner import COMPLETED, TaskRunner
+
+    for mode in ("thread", "async"):
+        with session_factory() as db:
+            p = generate_project(db, tasks=tasks, agents=agents, layers=5, model_names=["bench-fast"])
+        start = time.perf_counter()
+        outcomes = TaskRunner(concurrency=concurrency, mode=mode).run_project(p.project_id)
+        elapsed = time.perf_counter() - start
+        done = sum(o.status == COMPLETED for o in outcomes)
+        if done != tasks:
+            typer.echo(f"  ⚠️  {mode}: {done}/{tasks} tasks completed")
+        results.add("project", f"{mode} x{concurrency}", "throughput", done / elapsed, "tasks/s", higher_is_better=True)
+        results.add("project", f"{mode} x{concurrency}", "makespan", elapsed, "s", higher_is_better=False)
+
+# ---------- Comparison ---------------------------------------------------
+
+def compare(current: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Descriptions of metrics that regressed by more than ``tolerance``."""
+    before = {(r["benchmark"], r["case"], r["metric"]): r for r in baseline}
+    regressions = []
+    for r in current:
+        old = before.get((r["benchmark"], r["case"], r["metric"]))
+        if old is None or not old["value"]:
+            continue
+        change = (r["value"] - old["value"]) / old["value"]
+        worse = -change if r["higher_is_better"] else change
+        flag = "REGRESSED" if worse > tolerance else ""
+        typer.echo(f"  {r['benchmark']:<8} {r['case']:<22} {r['metric']:<14} {change:>+8.1%} {flag}")
+        if flag:
+            regressions.append(f"{r['benchmark']}/{r['case']}/{r['metric']}: {change:+.1%}")
+    return regressions
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+@cli.command()
+def run(
+    output: Path = typer.Option(Path("benchmark-results.json"), help="Where to write the JSON results."),
+    only: list[str] = typer.Option([], help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})."),
+    url: str = typer.Option("", help="Database URL (defaults to a temporary SQLite file)."),
+    latency: float = typer.Option(0.01, help="Stub seconds before the first token."),
+    tokens_per_sec: float = typer.Option(0.0, help="Stub generation rate (0 = instant)."),
+    failure_rate: float = typer.Option(0.3, help="Failure rate of the flaky model."),
+    tasks: int = typer.Option(200, help="Tasks per seeded project."),
+    agents: int = typer.Option(10, help="Agents per seeded project."),
+    memories: int = typer.Option(20_000, help="Memory rows for the memory scenario."),
+    calls: int = typer.Option(100, help="Agent calls per agent case."),
+    concurrency: int = typer.Option(8, help="Concurrent tasks in the project scenario."),
+    repeat: int = typer.Option(50, help="Samples per latency measurement."),
+    baseline: Path = typer.Option(None, help="Earlier results to compare against."),
+    tolerance: float = typer.Option(0.2, help="Allowed relative regression before failing."),
+) -> None:
+    scenarios = only or SCENARIOS
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise typer.BadParameter(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if not url:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    fast = ModelBehaviour(latency=latency, tokens_per_sec=tokens_per_sec)
+    stub = StubOllama(
+        {
+            "bench-fast": fast,
+            "bench-flaky": ModelBehaviour(latency=latency, tokens_per_sec=tokens_per_sec, failure_rate=failure_rate),
+            "bench-down": ModelBehaviour(latency=latency, failure_rate=1.0),
+        },
+        default=fast,
+    ).start()
+
+    # Point the lazily-built engine and Ollama client at the benchmark
+    # database and stub before anything uses them.
+    from mimi3.settings import settings
+
+    os.environ.pop("TESTING", None)
+    settings.database_url = url
+    settings.ollama_host = stub.url
+    settings.llm_telemetry = False
+    from mimi3.database import SessionLocal, init_db
+
+    init_db()
+    typer.echo(f"Database: {url}  stub: {stub.url}")
+
+    results = Results()
+    try:
+        if "crud" in scenarios:
+            bench_crud(results, SessionLocal, tasks=tasks, agents=agents)
+        if "memory" in scenarios:
+            bench_memory(results, SessionLocal, rows=memories, repeat=repeat)
+        if "agent" in scenarios:
+            bench_agent(results, calls=calls)
+        if "project" in scenarios:
+            bench_project(results, SessionLocal, tasks=tasks, agents=agents, concurrency=concurrency)
+    finally:
+        stub.stop()
+
+    document = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.UTC).isoformat(),
+            "git_rev": _git_rev(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "database": url.split(":", 1)[0],
+            "params": {
+                "latency": latency, "tokens_per_sec": tokens_per_sec, "failure_rate": failure_rate,
+                "tasks": tasks, "agents": agents, "memories": memories, "calls": calls,
+                "concurrency": concurrency, "repeat": repeat,
+            },
+        },
+        "results": results.rows,
+    }
+    output.write_text(json.dumps(document, indent=2) + "\n")
+    typer.echo(f"Wrote {len(results.rows)} results to {output}")
+
+    if baseline is not None:
+        typer.echo(f"Compared with {baseline}:")
+        regressions = compare(results.rows, json.loads(baseline.read_text())["results"], tolerance)
+        if regressions:
+            typer.echo("Regressions: " + "; ".join(regressions))
+            raise typer.Exit(1)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,131 @@
+"""Synthetic projects for benchmarks: N tasks x M agents x K memories.
+
+:func:`generate_project` seeds a project with the bulk CRUD helpers. Tasks
+are arranged in ``layers``; each task depends on up to ``fan_in`` tasks of
+the previous layer, so execution benchmarks see a realistic DAG rather
+than independent tasks. Memory text is drawn from a small vocabulary
+with Zipf-like frequencies.
+
+Usage::
+
+    python benchmarks/synthetic.py --tasks 1000 --agents 20 --memories 50 --url sqlite:///synthetic.db
+"""
+from __future__ import annotations
+import random
+import uuid
+from typing import NamedTuple, Sequence
+import typer
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from mimi3 import crud, models
+
+VOCABULARY = [f"word{i}" for i in range(2000)]
+
+class SyntheticProject(NamedTuple):
+    project_id: int
+    task_ids: list[int]
+    agent_ids: list[int]
+    model_tags: list[str]
+    memories: int
+
+def sentences(rng: random.Random, n: int, words: int = 12) -> list[str]:
+    cum_weights, total = [], 0.0
+    for i in range(len(VOCABULARY)):
+        total += 1 / (i + 1)
+        cum_weights.append(total)
+    return [" ".join(rng.choices(VOCABULARY, cum_weights=cum_weights, k=words)) for _ in range(n)]
+
+def generate_project(
+    db: Session,
+    *,
+    tasks: int,
+    agents: int,
+    memories: int = 0,
+    model_names: Sequence[str] = ("bench-fast",),
+    agents_per_task: int = 1,
+    layers: int = 1,
+    fan_in: int = 2,
+    seed: int = 0,
+) -> SyntheticProject:
+    """Seed one project; ``memories`` entries are written per task."""
+    rng = random.Random(seed)
+    uid = uuid.uuid4().hex[:8]
+    role = crud.create_role(db, name=f"SynthRole-{uid}", commit=False)
+    model_rows = [crud.create_model(db, name=name, commit=False) for name in model_names]
+    db.flush()
+    agent_rows = crud.create_agents_bulk(
+        db,
+        [
+            {"name": f"SynthAgent-{uid}-{i}", "role": role, "description": "Synthetic agent", "models_": model_rows}
+            for i in range(agents)
+        ],
+        commit=False,
+    )
+    project = crud.create_project(db, name=f"SynthProject-{uid}", goal="Synthetic workload", commit=False)
+    db.flush()
+
+    per_layer = max(1, -(-tasks // max(1, layers)))
+    task_ids: list[int] = []
+    previous: list[int] = []
+    while len(task_ids) < tasks:
+        n = min(per_layer, tasks - len(task_ids))
+        specs = [
+            {
+                "title": f"Synthetic task {len(task_ids) + i}",
+                "description": "Produce a short answer.",
+                "agents": rng.sample(agent_rows, min(agents_per_task, len(agent_rows))),
+                "depends_on": rng.sample(previous, min(fan_in, len(previous))),
+            }
+            for i in range(n)
+        ]
+        created = [t.id for t in crud.create_tasks_bulk(db, project=project, tasks=specs, commit=False)]
+        task_ids += created
+        previous = created
+
+    written = 0
+    if memories and agent_rows:
+        texts = sentences(rng, memories * len(task_ids))
+        rows = [
+            {"agent_id": rng.choice(agent_rows).id, "task_id": task_id, "content": texts[i * memories + j]}
+            for i, task_id in enumerate(task_ids)
+            for j in range(memories)
+        ]
+        for start in range(0, len(rows), 50_000):
+            db.execute(insert(models.Memory), rows[start : start + 50_000])
+        written = len(rows)
+    db.commit()
+    return SyntheticProject(project.id, task_ids, [a.id for a in agent_rows], [m.tag for m in model_rows], written)
+
+cli = typer.Typer(help="Synthetic project generator")
+
+@cli.command()
+def seed(
+    url: str = typer.Option(..., help="Database URL to seed."),
+    tasks: int = typer.Option(100),
+    agents: int = typer.Option(10),
+    memories: int = typer.Option(20, help="Memory entries per task."),
+    agents_per_task: int = typer.Option(1),
+    layers: int = typer.Option(4, help="Dependency layers."),
+    model: list[str] = typer.Option(["bench-fast"], help="Models every agent may use, in fallback order."),
+) -> None:
+    from sqlalchemy.orm import sessionmaker
+    from mimi3.database import _sync_schema, make_engine
+
+    engine = make_engine(url)
+    with engine.begin() as conn:
+        _sync_schema(conn)
+    with sessionmaker(bind=engine, autoflush=False)() as db:
+        p = generate_project(
+            db,
+            tasks=tasks,
+            agents=agents,
+            memories=memories,
+            model_names=model,
+            agents_per_task=agents_per_task,
+            layers=layers,
+        )
+    typer.echo(f"Project {p.project_id}: {len(p.task_ids)} tasks, {len(p.agent_ids)} agents, {p.memories} memories")
+    engine.dispose()
+
+if __name__ == "__main__":
+    cli()
@@ -7,9 +7,12 @@ setup(
     package_dir={"": "src"},
     install_requires=[
         "crewai>=0.2.0",
-        "ollama>=0.1.5",
-        "SQLAlchemy>=2.0",
+        "ollama>=0.4",
+        "SQLAlchemy[asyncio]>=2.0",
         "psycopg2-binary>=2.9",
+        "asyncpg>=0.29",
+        "aiosqlite>=0.19",
+        "numpy>=1.24",
         "pydantic>=2.0",
         "pydantic-settings>=2.0",
         "typer[all]>=0.9",
@@ -18,5 +21,8 @@ setup(
     extras_require={
         "test": ["pytest>=8.2"],
     },
+    entry_points={
+        "console_scripts": ["mimi3=mimi3.cli:app"],
+    },
     python_requires=">=3.10",
 ) 
\ No newline at end of file
@@ -1,15 +1,46 @@
-"""Compatibility wrapper for the legacy ``ma_framework`` import path."""
+"""Compatibility wrapper for the legacy ``ma_framework`` import path.
+
+``ma_framework.<name>`` resolves to ``mimi3.<name>``, as an attribute and
+as an import (``import ma_framework.models``). Nothing is imported from
+``mimi3`` until it is asked for.
+"""
 from __future__ import annotations
+import importlib
+import importlib.abc
+import importlib.util
 import sys
+from typing import Any
 import mimi3
+from mimi3 import __all__, __version__  # noqa: F401
+
+class _AliasImporter(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Serve ``ma_framework.x`` imports with the already-loaded ``mimi3.x``."""
+
+    prefix = __name__ + "."
+
+    def __init__(self) -> None:
+        self._specs: dict[str, Any] = {}  # the import system overwrites ``__spec__``
+
+    def find_spec(self, fullname: str, path: Any = None, target: Any = None):
+        if not fullname.startswith(self.prefix):
+            return None
+        return importlib.util.spec_from_loader(fullname, self)
+
+    def create_module(self, spec):
+        module = importlib.import_module("mimi3." + spec.name[len(self.prefix):])
+        self._specs[spec.name] = module.__spec__
+        return module
+
+    def exec_module(self, module) -> None:
+        module.__spec__ = self._specs.pop(module.__spec__.name)
+
+# Ahead of the path finder, which would load a second copy of nested
+# modules (``ma_framework.tools.memory``) from the aliased package's path.
+if not any(isinstance(finder, _AliasImporter) for finder in sys.meta_path):
+    sys.meta_path.insert(0, _AliasImporter())
 
-# Re-export the public API of mimi3
-from mimi3 import *  # noqa: F401,F403
+def __getattr__(name: str) -> Any:
+    return getattr(mimi3, name)
 
-# Register submodules under this package name for backwards compatibility
-sys.modules[__name__ + ".models"] = mimi3.models
-sys.modules[__name__ + ".schemas"] = mimi3.schemas
-sys.modules[__name__ + ".database"] = mimi3.database
-sys.modules[__name__ + ".tools"] = mimi3.tools
-sys.modules[__name__ + ".agents"] = mimi3.agents
-sys.modules[__name__ + ".crud"] = mimi3.crud
+def __dir__() -> list[str]:
+    return dir(mimi3)
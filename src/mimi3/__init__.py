@@ -1,15 +1,26 @@
 """Multi-Agent / Multi-Model Framework.
 
 A minimal, opinionated framework for building software-engineering agents.
+
+Submodules are imported on first attribute access (PEP 562), so
+``import mimi3`` and the CLI stay cheap until a command needs the ORM or
+the agents.
 """
+from __future__ import annotations
+import importlib
+from typing import TYPE_CHECKING, Any
 
 __version__ = "0.1.0"
 
-from . import models
-from . import schemas
-from . import database
-from . import crud
-from . import tools
-from . import agents
-
 __all__ = ["models", "schemas", "database", "crud", "tools", "agents"]
+
+if TYPE_CHECKING:
+    from . import agents, crud, database, models, schemas, tools
+
+def __getattr__(name: str) -> Any:
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,35 +1,477 @@
 """CrewAI wrapper with multi‑model support."""
-from typing import Sequence, Any
+import asyncio
+import atexit
+import time
+from contextlib import nullcontext
+from typing import AsyncIterator, Callable, Iterator, Sequence, Any, Literal
 from crewai import Agent, Task
-from ollama import Client as OllamaClient  # type: ignore
+from pydantic import Field, PrivateAttr
 from ..settings import settings
+from ..llm.admission import AdmissionController, Overloaded, Priority, Ticket, estimate_tokens
+from ..llm.batching import Batcher
+from ..llm.cache import cache_key, is_deterministic
+from ..llm.health import HealthRegistry
+from ..llm.hosts import HostPool
+from ..llm.lifecycle import ModelManager
+from ..llm.pool import AsyncClientPool
+from ..llm.prompts import PromptBuilder
+from ..llm.singleflight import SingleFlight
+from ..llm.telemetry import Telemetry, call_record
+from ..llm.streaming import AsyncTokenStream, Sink, StreamStats, TokenStream, ameasure, measure
 
-_ollama = OllamaClient(host=settings.ollama_host)
+# The Ollama client is created on first use (see ``_client``); importing
+# ``ollama`` costs about as much as the rest of this package.
+_ollama = None
+_async_pool = AsyncClientPool(
+    default_host=settings.ollama_host,
+    max_concurrency=settings.ollama_max_concurrency,
+    timeout=settings.ollama_timeout,
+)
+
+# Health is a property of the backend model, so it is shared by all agents.
+_health = HealthRegistry(
+    window=settings.health_window,
+    failure_threshold=settings.breaker_failure_threshold,
+    reset_timeout=settings.breaker_reset_timeout,
+)
+
+# Per-call records, written to ``llm_calls`` in batches and on exit.
+_telemetry = Telemetry(persist=settings.llm_telemetry, flush_every=settings.llm_telemetry_flush_every)
+atexit.register(_telemetry.flush)
+
+# Identical requests in flight at once (any agent, thread or task) run once.
+_flights = SingleFlight()
+
+# With OLLAMA_HOSTS, calls are balanced over several servers.
+_hosts = None
+if settings.ollama_hosts:
+    _hosts = HostPool(
+        settings.ollama_hosts,
+        strategy=settings.ollama_balancing,
+        failure_threshold=settings.breaker_failure_threshold,
+        reset_timeout=settings.breaker_reset_timeout,
+        check_interval=settings.ollama_host_check_interval,
+    )
+    _telemetry.collectors.append(_hosts.render)
+
+# Load/inference timings and residency, also per backend model; warm-up
+# reaches every pool host.
+_models = ModelManager(keep_alive=settings.ollama_keep_alive, hosts=_hosts.hosts if _hosts is not None else ())
+
+# Concurrency limits, token budgets and priority queueing, if configured.
+_admission = None
+if settings.llm_model_concurrency or settings.llm_host_concurrency or settings.llm_token_rate:
+    _admission = AdmissionController(
+        model_concurrency=settings.llm_model_concurrency,
+        host_concurrency=settings.llm_host_concurrency,
+        # A host pool is one scope; its limit covers all of its hosts.
+        host_limits={"pool": settings.llm_host_concurrency * len(_hosts.hosts)}
+        if _hosts is not None and settings.llm_host_concurrency
+        else None,
+        token_rate=settings.llm_token_rate,
+        token_burst=settings.llm_token_burst,
+        timeout=settings.llm_admission_timeout,
+    )
+    _telemetry.collectors.append(_admission.render)
+
+Policy = Literal["fallback", "race"]
+
+def _host_overloaded(exc: BaseException) -> bool:
+    """Falling back to another model would only queue on the same saturated host."""
+    return isinstance(exc, Overloaded) and exc.host
+
+def _host_key() -> str:
+    return "pool" if _hosts is not None else settings.ollama_host
+
+def _send(*, host: str | None = None, **request: Any) -> Any:
+    if _hosts is None:
+        return _client().generate(stream=False, **request)
+    return _hosts.call(request["model"], lambda h: h.client.generate(stream=False, **request), prefer=host)
+
+async def _asend(**request: Any) -> Any:
+    if _batcher is not None:  # cancelling the wait drops the request if it has not been sent
+        return await asyncio.wrap_future(_batcher.submit(**request))
+    if _hosts is not None:
+        return await _hosts.acall(request["model"], lambda host: _async_pool.generate(host=host.url, **request))
+    return await _async_pool.generate(**request)
+
+# With OLLAMA_BATCHING, non-streaming calls from every agent go through
+# per-model queues and reach the host in batches. With OLLAMA_HOSTS each
+# batch goes to one host, and OLLAMA_NUM_PARALLEL applies per host.
+_batcher = None
+if settings.ollama_batching:
+    _batcher = Batcher(
+        _send,
+        max_batch=settings.ollama_batch_size,
+        max_wait=settings.ollama_batch_wait_ms / 1000,
+        parallelism=settings.ollama_num_parallel,
+        route=_hosts.pick if _hosts is not None else None,
+    )
+    _telemetry.collectors.append(_batcher.render)
+
+def _client():
+    global _ollama
+    if _ollama is None:
+        from ollama import Client  # type: ignore
+
+        _ollama = Client(host=settings.ollama_host)
+    return _ollama
 
 class MultiModelAgent(Agent):
     """CrewAI Agent that can swap between multiple LLM backends."""
 
+    name: str = ""
+    models: list[str] = Field(default_factory=lambda: [settings.default_llm])
+    options: dict[str, Any] = Field(default_factory=dict)  # Ollama generation options
+    completion_cache: Any = Field(default=None, exclude=True)  # mimi3.llm.cache.CompletionCache
+    routing: Literal["static", "adaptive"] = "adaptive"  # model order: as listed, or by observed health
+    keep_alive: str | float | None = Field(default_factory=lambda: settings.ollama_keep_alive)
+    reuse_context: bool = False  # continue each model's previous conversation via Ollama ``context``
+    single_flight: bool = True  # share the result of an identical request already in flight
+    priority: Priority | None = None  # admission class; defaults to settings.llm_priorities[role] or "normal"
+
+    _prompts: PromptBuilder | None = PrivateAttr(default=None)
+    _contexts: dict[str, list[int]] = PrivateAttr(default_factory=dict)
+
     def __init__(self, *args, models: Sequence[str] | None = None, **kwargs) -> None:
-        super().__init__(*args, **kwargs)
-        self.models = list(models or [settings.default_llm])
+        super().__init__(*args, models=list(models or [settings.default_llm]), **kwargs)
 
     # ------------------------------------------------------------------ #
     # Helpers
     # ------------------------------------------------------------------ #
 
-    def _call_llm(self, prompt: str, model_name: str) -> str:
+    def _route(self) -> list[str]:
+        """Models in the order they should be tried for the next call."""
+        if self.routing == "adaptive":
+            return _health.order(self.models)
+        return list(self.models)
+
+    @property
+    def prompts(self) -> PromptBuilder:
+        """Precompiled persona and memoised task prompts (built on first use)."""
+        if self._prompts is None:
+            self._prompts = PromptBuilder(role=self.role, goal=self.goal, backstory=self.backstory)
+        return self._prompts
+
+    def _generate_kwargs(self, model_name: str) -> dict[str, Any]:
+        """Request fields shared by every call to ``model_name``."""
+        kwargs: dict[str, Any] = {"system": self.prompts.system, "options": self.options or None}
+        if self.keep_alive is not None:
+            kwargs["keep_alive"] = self.keep_alive
+        if self.reuse_context and (context := self._contexts.get(model_name)):
+            kwargs["context"] = context
+        return kwargs
+
+    def _remember_context(self, model_name: str, context: Sequence[int] | None) -> None:
+        if self.reuse_context and context:
+            self._contexts[model_name] = list(context)
+
+    def _cache_key(self, prompt: str, model_name: str) -> str | None:
+        """Cache key for this call, or ``None`` if it must not be cached."""
+        if self.completion_cache is None or self.reuse_context or not is_deterministic(self.options):
+            return None
+        return cache_key(model_name, prompt, self.options, system=self.prompts.system)
+
+    def _flight_key(self, prompt: str, model_name: str) -> str | None:
+        """Identity of this request for coalescing, or ``None`` to always send it.
+
+        Requests carrying a per-agent ``context`` are never shared.
+        """
+        if not self.single_flight or self.reuse_context:
+            return None
+        return cache_key(model_name, prompt, self.options, system=self.prompts.system)
+
+    @property
+    def priority_class(self) -> Priority:
+        return self.priority or settings.llm_priorities.get(self.role, "normal")
+
+    def _admit(self, model_name: str, prompt: str):
+        """Wait for an admission slot (no-op without limits); yields a :class:`Ticket`."""
+        if _admission is None:
+            return nullcontext(Ticket())
+        return _admission.slot(
+            model_name, _host_key(), priority=self.priority_class, tokens=estimate_tokens(self.prompts.system, prompt)
+        )
+
+    def _aadmit(self, model_name: str, prompt: str):
+        """Async counterpart of :meth:`_admit`."""
+        if _admission is None:
+            return nullcontext(Ticket())
+        return _admission.aslot(
+            model_name, _host_key(), priority=self.priority_class, tokens=estimate_tokens(self.prompts.system, prompt)
+        )
+
+    def _gated(self, model_name: str, prompt: str, open_: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+        """Hold an admission slot while the stream from ``open_()`` is read."""
+        with self._admit(model_name, prompt) as ticket:
+            for chunk in open_():
+                if chunk.get("done"):
+                    ticket.settle(chunk)
+                yield chunk
+
+    async def _agated(
+        self, model_name: str, prompt: str, open_: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncIterator[Any]:
+        async with self._aadmit(model_name, prompt) as ticket:
+            async for chunk in open_():
+                if chunk.get("done"):
+                    ticket.settle(chunk)
+                yield chunk
+
+    def _record(self, model_name: str, started: float, task_id: int | None, attempt: int, **outcome: Any) -> None:
+        """Add one call to the telemetry log (``outcome``: response, error, cached or coalesced)."""
+        _telemetry.record(
+            call_record(
+                model_name,
+                agent=self.name,
+                task_id=task_id,
+                attempt=attempt,
+                latency=time.perf_counter() - started,
+                **outcome,
+            )
+        )
+
+    def _generate(self, prompt: str, model_name: str, started: float, task_id: int | None, attempt: int) -> Any:
+        """Send one request to Ollama (or the batcher) and record it."""
+        request = {"model": model_name, "prompt": prompt, **self._generate_kwargs(model_name)}
+        try:
+            with self._admit(model_name, prompt) as ticket, _health.track(model_name):
+                response = _send(**request) if _batcher is None else _batcher(**request)
+                ticket.settle(response)
+        except Exception as exc:
+            self._record(model_name, started, task_id, attempt, error=exc)
+            raise
+        self._record(model_name, started, task_id, attempt, response=response)
+        _models.observe(model_name, response)
+        return response
+
+    def _call_llm(self, prompt: str, model_name: str, *, task_id: int | None = None, attempt: int = 1) -> str:
         """Call Ollama model and return completion text."""
-        response = _ollama.generate(model=model_name, prompt=prompt, stream=False)
+        started = time.perf_counter()
+        key = self._cache_key(prompt, model_name)
+        if key is not None and (cached := self.completion_cache.get(key)) is not None:
+            self._record(model_name, started, task_id, attempt, cached=True)
+            return cached
+        send = lambda: self._generate(prompt, model_name, started, task_id, attempt)
+        flight = self._flight_key(prompt, model_name)
+        if flight is None:
+            response, led = send(), True
+        else:
+            response, led = _flights.do(flight, send)
+        if not led:  # the leader's call carries the timings
+            self._record(model_name, started, task_id, attempt, coalesced=True)
+        self._remember_context(model_name, response.get("context"))
+        if key is not None and led:
+            self.completion_cache.set(key, response["response"], model=model_name)
         return response["response"]
 
+    async def _agenerate(self, prompt: str, model_name: str, started: float, task_id: int | None, attempt: int) -> Any:
+        """Async counterpart of :meth:`_generate` using the pooled client."""
+        request = {"model": model_name, "prompt": prompt, **self._generate_kwargs(model_name)}
+        try:
+            async with self._aadmit(model_name, prompt) as ticket:
+                with _health.track(model_name):
+                    response = await _asend(**request)
+                ticket.settle(response)
+        except Exception as exc:  # cancelled race losers are not recorded
+            self._record(model_name, started, task_id, attempt, error=exc)
+            raise
+        self._record(model_name, started, task_id, attempt, response=response)
+        _models.observe(model_name, response)
+        return response
+
+    async def _acall_llm(self, prompt: str, model_name: str, *, task_id: int | None = None, attempt: int = 1) -> str:
+        """Async counterpart of :meth:`_call_llm`."""
+        started = time.perf_counter()
+        key = self._cache_key(prompt, model_name)
+        if key is not None and (cached := self.completion_cache.get(key)) is not None:
+            self._record(model_name, started, task_id, attempt, cached=True)
+            return cached
+        send = lambda: self._agenerate(prompt, model_name, started, task_id, attempt)
+        flight = self._flight_key(prompt, model_name)
+        if flight is None:
+            response, led = await send(), True
+        else:
+            response, led = await _flights.ado(flight, send)
+        if not led:
+            self._record(model_name, started, task_id, attempt, coalesced=True)
+        self._remember_context(model_name, response.get("context"))
+        if key is not None and led:
+            self.completion_cache.set(key, response["response"], model=model_name)
+        return response["response"]
+
+    def _stream_llm(self, prompt: str, model_name: str, stats: StreamStats) -> Iterator[str]:
+        """Stream completion text from an Ollama model."""
+        stats.start(model_name)
+        request = {"model": model_name, "prompt": prompt, "stream": True, **self._generate_kwargs(model_name)}
+        if _hosts is None:
+            open_ = lambda: _client().generate(**request)
+        else:
+            open_ = lambda: _hosts.stream(model_name, lambda host: host.client.generate(**request))
+        return measure(open_() if _admission is None else self._gated(model_name, prompt, open_), stats)
+
+    def _astream_llm(self, prompt: str, model_name: str, stats: StreamStats) -> AsyncIterator[str]:
+        """Async counterpart of :meth:`_stream_llm` using the pooled client."""
+        stats.start(model_name)
+        request = {"model": model_name, "prompt": prompt, **self._generate_kwargs(model_name)}
+        if _hosts is None:
+            open_ = lambda: _async_pool.stream(**request)
+        else:
+            open_ = lambda: _hosts.astream(model_name, lambda host: _async_pool.stream(host=host.url, **request))
+        return ameasure(open_() if _admission is None else self._agated(model_name, prompt, open_), stats)
+
+    def _stream_fallback(self, prompt: str, stats: StreamStats, task_id: int | None = None) -> Iterator[str]:
+        # A model may only be skipped before it has produced output.
+        for attempt, model_name in enumerate(self._route(), 1):
+            started = time.perf_counter()
+            _health.begin(model_name)
+            chunks = self._stream_llm(prompt, model_name, stats)
+            try:
+                first = next(chunks)
+            except StopIteration:
+                return
+            except Exception as exc:
+                if not isinstance(exc, Overloaded):  # queueing says nothing about the model
+                    _health.record(model_name, ok=False)
+                self._record(model_name, started, task_id, attempt, error=exc)
+                print(f"[{self.name}] ⚠️  Model {model_name} failed: {exc}")
+                if _host_overloaded(exc):
+                    raise
+                continue
+            _health.record(model_name, latency=stats.time_to_first_token)
+            yield first
+            yield from chunks
+            self._record(model_name, started, task_id, attempt, response=stats.usage)
+            _models.observe(model_name, stats.usage)
+            self._remember_context(model_name, stats.context)
+            return
+        raise RuntimeError(f"No available models succeeded for {self.name}")
+
+    async def _astream_fallback(
+        self, prompt: str, stats: StreamStats, task_id: int | None = None
+    ) -> AsyncIterator[str]:
+        for attempt, model_name in enumerate(self._route(), 1):
+            started = time.perf_counter()
+            _health.begin(model_name)
+            chunks = self._astream_llm(prompt, model_name, stats)
+            try:
+                first = await anext(chunks)
+            except StopAsyncIteration:
+                return
+            except Exception as exc:
+                if not isinstance(exc, Overloaded):  # queueing says nothing about the model
+                    _health.record(model_name, ok=False)
+                self._record(model_name, started, task_id, attempt, error=exc)
+                print(f"[{self.name}] ⚠️  Model {model_name} failed: {exc}")
+                if _host_overloaded(exc):
+                    raise
+                continue
+            _health.record(model_name, latency=stats.time_to_first_token)
+            yield first
+            async for text in chunks:
+                yield text
+            self._record(model_name, started, task_id, attempt, response=stats.usage)
+            _models.observe(model_name, stats.usage)
+            self._remember_context(model_name, stats.context)
+            return
+        raise RuntimeError(f"No available models succeeded for {self.name}")
+
+    async def _race(self, prompt: str, model_names: Sequence[str], task_id: int | None = None) -> str:
+        """Query ``model_names`` concurrently; first success wins, the rest are cancelled."""
+        pending = {
+            asyncio.ensure_future(self._acall_llm(prompt, m, task_id=task_id, attempt=i)): m
+            for i, m in enumerate(model_names, 1)
+        }
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    model_name = pending.pop(fut)
+                    exc = fut.exception()
+                    if exc is None:
+                        return fut.result()
+                    print(f"[{self.name}] ⚠️  Model {model_name} failed: {exc}")
+        finally:
+            for fut in pending:
+                fut.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        raise RuntimeError(f"No available models succeeded for {self.name}")
+
+    def warm_up(self, *, pin: bool = True) -> dict[str, float]:
+        """Load every model in the fallback chain now; returns load seconds.
+
+        Pinned models stay resident while the shared manager's pinger runs
+        (``_models.start()``).
+        """
+        return _models.preload(self.models, pin=pin)
+
     def run(self, task: Task, *args: Any, **kwargs: Any) -> str:  # noqa: D401
         """Override Agent.run with first‑fit LLM execution."""
-        prompt = task.compile_prompt(*args, **kwargs)
-        for model_name in self.models:
+        prompt = self.prompts.compile(task, *args, **kwargs)
+        task_id = getattr(task, "task_id", None)
+        for attempt, model_name in enumerate(self._route(), 1):
             try:
-                return self._call_llm(prompt, model_name=model_name)
+                return self._call_llm(prompt, model_name=model_name, task_id=task_id, attempt=attempt)
             except Exception as exc:  # pragma: no cover
                 # fallback to next model
                 print(f"[{self.name}] ⚠️  Model {model_name} failed: {exc}")
+                if _host_overloaded(exc):
+                    raise
+                continue
+        raise RuntimeError(f"No available models succeeded for {self.name}")
+
+    async def arun(
+        self,
+        task: Task,
+        *args: Any,
+        policy: Policy = "fallback",
+        race_width: int | None = None,
+        **kwargs: Any,
+    ) -> str:
+        """Asyncio variant of :meth:`run`.
+
+        ``policy="fallback"`` tries models one at a time like ``run``.
+        ``policy="race"`` sends the prompt to the first ``race_width``
+        routed models (all by default) at once and returns the first
+        completion.
+        """
+        prompt = self.prompts.compile(task, *args, **kwargs)
+        task_id = getattr(task, "task_id", None)
+        if policy == "race":
+            return await self._race(prompt, self._route()[:race_width], task_id)
+        for attempt, model_name in enumerate(self._route(), 1):
+            try:
+                return await self._acall_llm(prompt, model_name=model_name, task_id=task_id, attempt=attempt)
+            except Exception as exc:
+                print(f"[{self.name}] ⚠️  Model {model_name} failed: {exc}")
+                if _host_overloaded(exc):
+                    raise
                 continue
         raise RuntimeError(f"No available models succeeded for {self.name}")
+
+    def stream(self, task: Task, *args: Any, **kwargs: Any) -> TokenStream:
+        """Like :meth:`run` but yield the completion as it is generated.
+
+        Falls back to the next model only if the current one fails before
+        its first token. Timing is available on the returned ``.stats``.
+        """
+        prompt = self.prompts.compile(task, *args, **kwargs)
+        stats = StreamStats()
+        return TokenStream(self._stream_fallback(prompt, stats, getattr(task, "task_id", None)), stats)
+
+    def astream(self, task: Task, *args: Any, **kwargs: Any) -> AsyncTokenStream:
+        """Asyncio variant of :meth:`stream`."""
+        prompt = self.prompts.compile(task, *args, **kwargs)
+        stats = StreamStats()
+        return AsyncTokenStream(self._astream_fallback(prompt, stats, getattr(task, "task_id", None)), stats)
+
+    def run_to_sink(self, task: Task, sink: Sink, *args: Any, **kwargs: Any) -> str:
+        """Stream the completion into ``sink`` and return the full text."""
+        parts = []
+        try:
+            for chunk in self.stream(task, *args, **kwargs):
+                sink.write(chunk)
+                parts.append(chunk)
+        finally:
+            sink.close()
+        return "".join(parts)
@@ -1,9 +1,12 @@
 """BuilderAgent specializing in code generation."""
 from crewai import Task
+from ..llm.streaming import Sink
 from .base import MultiModelAgent
 
 class BuilderAgent(MultiModelAgent):
     """Builds code artifacts."""
 
-    def build(self, task: Task) -> str:
+    def build(self, task: Task, sink: Sink | None = None) -> str:
+        if sink is not None:
+            return self.run_to_sink(task, sink)
         return self.run(task)
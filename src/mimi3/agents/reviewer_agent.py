@@ -1,9 +1,12 @@
 """ReviewerAgent specializing in code review."""
 from crewai import Task
+from ..llm.streaming import Sink
 from .base import MultiModelAgent
 
 class ReviewerAgent(MultiModelAgent):
     """Reviews code artifacts."""
 
-    def review(self, task: Task) -> str:
+    def review(self, task: Task, sink: Sink | None = None) -> str:
+        if sink is not None:
+            return self.run_to_sink(task, sink)
         return self.run(task)
@@ -1,34 +1,199 @@
-"""Typer CLI for quick DB operations."""
+"""Typer CLI for quick DB operations.
+
+Commands import what they need when they run, so ``mimi3 --help`` and the
+DB commands never load CrewAI or the Ollama client (see
+``tests/test_import_time.py``).
+"""
+from enum import Enum
 import typer
-from .database import init_db, SessionLocal
-from .crud import create_role, create_model, create_tool
-from . import models
 
 app = typer.Typer(help="MiMi-3 CLI")
 
+class RunMode(str, Enum):
+    """``TaskRunner`` modes (``runner.Mode``), kept here so the CLI imports fast."""
+
+    thread = "thread"
+    process = "process"
+    async_ = "async"
+
+class ReportGroup(str, Enum):
+    """``llm.telemetry.GroupBy`` columns for ``report --by``."""
+
+    agent = "agent"
+    model = "model"
+    task = "task"
+
 @app.command()
 def initdb() -> None:
     """Create DB schema."""
+    from .database import init_db
+
     init_db()
     typer.echo("✅ Database initialized.")
 
 @app.command()
 def role(name: str, description: str = "") -> None:
+    from .crud import create_role
+    from .database import SessionLocal
+
     with SessionLocal() as db:
         role = create_role(db, name=name, description=description or None)
         typer.echo(f"✅ Role {role.id}: {role.name}")
 
 @app.command()
 def model(name: str, version: str = "", description: str = "") -> None:
+    from .crud import create_model
+    from .database import SessionLocal
+
     with SessionLocal() as db:
         model = create_model(db, name=name, version=version or None, description=description or None)
         typer.echo(f"✅ Model {model.id}: {model.name}")
 
 @app.command()
 def tool(name: str, type_: str, description: str = "") -> None:
+    from .crud import create_tool
+    from .database import SessionLocal
+
     with SessionLocal() as db:
         tool = create_tool(db, name=name, type_=type_, description=description)
         typer.echo(f"✅ Tool {tool.id}: {tool.name}")
 
+@app.command()
+def run(
+    project_id: int,
+    concurrency: int = typer.Option(4, help="Tasks executed at once."),
+    mode: RunMode = typer.Option(RunMode.thread, case_sensitive=False, help="How tasks run at once."),
+) -> None:
+    """Execute the pending tasks of a project."""
+    from .runner import TaskRunner
+
+    outcomes = TaskRunner(concurrency=concurrency, mode=mode.value).run_project(project_id)
+    for outcome in outcomes:
+        typer.echo(f"Task {outcome.task_id}: {outcome.status} ({outcome.elapsed:.1f}s)")
+    failed = sum(o.status == "failed" for o in outcomes)
+    typer.echo(f"✅ {len(outcomes) - failed}/{len(outcomes)} tasks completed.")
+
+@app.command()
+def worker(
+    concurrency: int = typer.Option(1, help="Tasks this worker runs at once."),
+    project_id: int = typer.Option(None, help="Only claim tasks of this project."),
+    max_tasks: int = typer.Option(None, help="Exit after this many tasks."),
+    exit_when_idle: bool = typer.Option(False, help="Exit once no task is ready."),
+    report_interval: float = typer.Option(10.0, help="Seconds between throughput reports."),
+    warm_up: bool = typer.Option(True, help="Preload OLLAMA_PRELOAD models and keep them loaded."),
+    metrics_port: int = typer.Option(None, help="Serve Prometheus metrics for this worker on this port."),
+) -> None:
+    """Claim and execute queued tasks; run several of these to scale out."""
+    from .settings import settings
+    from .worker import Worker
+
+    w = Worker(concurrency=concurrency, project_id=project_id)
+    if warm_up and settings.ollama_preload:
+        from .agents.base import _models
+
+        _models.preload(settings.ollama_preload)
+        _models.start()
+    if settings.ollama_hosts:
+        from .agents.base import _hosts
+
+        _hosts.start()
+    if metrics_port is not None:
+        from .agents.base import _telemetry
+        from .llm.telemetry import serve_metrics
+
+        serve_metrics(_telemetry.render, port=metrics_port, host="0.0.0.0")
+        typer.echo(f"Metrics at http://0.0.0.0:{metrics_port}/metrics")
+    typer.echo(f"Worker {w.worker_id} started.")
+    try:
+        w.run(
+            max_tasks=max_tasks,
+            exit_when_idle=exit_when_idle,
+            report=lambda stats: typer.echo(f"[{w.worker_id}] {stats}"),
+            report_interval=report_interval,
+        )
+    except KeyboardInterrupt:  # run() has stopped the loops; in-flight tasks finish
+        typer.echo(f"[{w.worker_id}] {w.stats}")
+
+@app.command()
+def warmup(
+    names: list[str] = typer.Argument(
+        None, metavar="MODELS", help="Models to load (default: OLLAMA_PRELOAD, else every registered model)."
+    ),
+) -> None:
+    """Load models into Ollama now and report load time and residency."""
+    from . import models
+    from .agents.base import _models
+    from .database import SessionLocal
+    from .settings import settings
+
+    if not names:
+        names = settings.ollama_preload
+    if not names:
+        with SessionLocal() as db:
+            names = [m.tag for m in db.query(models.Model)]
+    for name, seconds in _models.preload(names, pin=False).items():
+        typer.echo(f"{name}: loaded in {seconds:.2f}s")
+    typer.echo("Resident: " + (", ".join(_models.refresh()) or "none"))
+
+@app.command()
+def report(
+    by: list[ReportGroup] = typer.Option(
+        [ReportGroup.agent, ReportGroup.model], case_sensitive=False, help="Group by agent, model and/or task."
+    ),
+    project_id: int = typer.Option(None, help="Only calls made for this project's tasks."),
+    hours: float = typer.Option(None, help="Only calls from the last N hours."),
+    prometheus: bool = typer.Option(False, help="Print Prometheus text format instead of a table."),
+) -> None:
+    """Where LLM wall time and tokens went, from the ``llm_calls`` log."""
+    from datetime import timedelta
+    from .database import SessionLocal
+    from .llm.telemetry import render_prometheus, summarize
+
+    groups = [b.value for b in by]
+    with SessionLocal() as db:
+        rows = summarize(db, by=groups, project_id=project_id, since=timedelta(hours=hours) if hours else None)
+    if prometheus:
+        typer.echo(render_prometheus(rows, groups), nl=False)
+        return
+    total = sum(r.latency for r in rows) or 1.0
+    typer.echo(
+        f"{'/'.join(groups):<40} {'calls':>6} {'err':>4} {'fallb':>5} {'wall s':>9} {'share':>6} "
+        f"{'load s':>8} {'infer s':>8} {'tok in':>8} {'tok out':>8}"
+    )
+    for r in rows:
+        name = "/".join(str(g) for g in r.group)
+        typer.echo(
+            f"{name[:40]:<40} {r.calls:>6} {r.errors:>4} {r.fallbacks:>5} {r.latency:>9.1f} "
+            f"{r.latency / total:>6.1%} {r.load:>8.1f} {r.inference:>8.1f} {r.prompt_tokens:>8} {r.completion_tokens:>8}"
+        )
+    if not rows:
+        typer.echo("No calls recorded.")
+
+@app.command()
+def search(
+    query: str,
+    limit: int = typer.Option(10, help="Results per kind."),
+    project_id: int = typer.Option(None, help="Only search this project."),
+    memories: bool = typer.Option(True, help="Search memory entries."),
+    tasks: bool = typer.Option(True, help="Search task titles and results."),
+    recent: bool = typer.Option(False, help="Newest matches first instead of best."),
+) -> None:
+    """Full-text search over memories and task results."""
+    from .database import SessionLocal
+    from .search import search_memories, search_tasks
+
+    order = "recent" if recent else "rank"
+    with SessionLocal() as db:
+        hits = []
+        if tasks:
+            hits += search_tasks(db, query, limit=limit, project_id=project_id, order=order)
+        if memories:
+            hits += search_memories(db, query, limit=limit, project_id=project_id, order=order)
+    for hit in hits:
+        snippet = " ".join(hit.text.split())[:100]
+        typer.echo(f"[{hit.kind} {hit.id}] (task {hit.task_id}, rank {hit.rank:.3f}) {snippet}")
+    if not hits:
+        typer.echo("No matches.")
+
 if __name__ == "__main__":
     app()
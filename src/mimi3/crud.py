@@ -1,32 +1,76 @@
-"""CRUD helpers. Feel free to extend with advanced queries."""
-from sqlalchemy.orm import Session
-from . import models
+"""CRUD helpers. Feel free to extend with advanced queries.
+
+Every ``create_*`` helper commits and refreshes by default. Pass
+``commit=False`` (or run inside :func:`unit_of_work`) to only flush, so
+many creates share one transaction and the generated keys come back via
+``RETURNING`` instead of a follow-up SELECT per object.
+"""
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Mapping
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from . import models, schemas
+
+_UOW_KEY = "mimi3_unit_of_work"
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """Group helper calls into one transaction, committed on clean exit.
+
+    Inside the block ``create_*`` helpers flush instead of committing.
+    Nested blocks join the outermost one.
+    """
+    depth = db.info.get(_UOW_KEY, 0)
+    db.info[_UOW_KEY] = depth + 1
+    try:
+        yield db
+        if depth == 0:
+            db.commit()
+    except BaseException:
+        if depth == 0:
+            db.rollback()
+        raise
+    finally:
+        db.info[_UOW_KEY] = depth
+
+def _persist(db: Session, obj: Any, commit: bool) -> None:
+    db.add(obj)
+    if commit and not db.info.get(_UOW_KEY):
+        db.commit()
+        db.refresh(obj)
+    else:
+        db.flush()
+
+def _id(obj: Any) -> int:
+    return obj if isinstance(obj, int) else obj.id
+
+def _finish(db: Session, commit: bool) -> None:
+    if commit and not db.info.get(_UOW_KEY):
+        db.commit()
 
 # ---------- Role ---------------------------------------------------------
 
-def create_role(db: Session, *, name: str, description: str | None = None) -> models.Role:
+def create_role(db: Session, *, name: str, description: str | None = None, commit: bool = True) -> models.Role:
     role = models.Role(name=name, description=description)
-    db.add(role)
-    db.commit()
-    db.refresh(role)
+    _persist(db, role, commit)
     return role
 
 # ---------- Model --------------------------------------------------------
 
-def create_model(db: Session, *, name: str, version: str | None = None, description: str | None = None) -> models.Model:
+def create_model(
+    db: Session, *, name: str, version: str | None = None, description: str | None = None, commit: bool = True
+) -> models.Model:
     model = models.Model(name=name, version=version, description=description)
-    db.add(model)
-    db.commit()
-    db.refresh(model)
+    _persist(db, model, commit)
     return model
 
 # ---------- Tool ---------------------------------------------------------
 
-def create_tool(db: Session, *, name: str, type_: str, description: str = "", config: str | None = None) -> models.Tool:
+def create_tool(
+    db: Session, *, name: str, type_: str, description: str = "", config: str | None = None, commit: bool = True
+) -> models.Tool:
     tool = models.Tool(name=name, type=type_, description=description, config=config)
-    db.add(tool)
-    db.commit()
-    db.refresh(tool)
+    _persist(db, tool, commit)
     return tool
 
 # ---------- Agent --------------------------------------------------------
@@ -39,23 +83,48 @@ def create_agent(
     models_: list[models.Model],
     tools: list[models.Tool] | None = None,
     description: str | None = None,
+    commit: bool = True,
 ) -> models.Agent:
     agent = models.Agent(name=name, role=role, description=description)
     agent.models.extend(models_)
     if tools:
         agent.tools.extend(tools)
-    db.add(agent)
-    db.commit()
-    db.refresh(agent)
+    _persist(db, agent, commit)
     return agent
 
+def create_agents_bulk(db: Session, agents: Iterable[Mapping[str, Any]], *, commit: bool = True) -> list[models.Agent]:
+    """Insert many agents and their model/tool links in a few statements.
+
+    Each mapping takes ``name``, ``role`` (object or id) and optionally
+    ``description``, ``models_`` and ``tools`` (objects or ids).
+    """
+    specs = list(agents)
+    if not specs:
+        return []
+    created = list(
+        db.scalars(
+            insert(models.Agent).returning(models.Agent, sort_by_parameter_order=True),
+            [{"name": s["name"], "role_id": _id(s["role"]), "description": s.get("description")} for s in specs],
+        )
+    )
+    model_links = [
+        {"agent_id": agent.id, "model_id": _id(m)} for agent, s in zip(created, specs) for m in s.get("models_") or ()
+    ]
+    tool_links = [
+        {"agent_id": agent.id, "tool_id": _id(t)} for agent, s in zip(created, specs) for t in s.get("tools") or ()
+    ]
+    if model_links:
+        db.execute(insert(models.agent_model_association), model_links)
+    if tool_links:
+        db.execute(insert(models.agent_tool_association), tool_links)
+    _finish(db, commit)
+    return created
+
 # ---------- Project & Task ----------------------------------------------
 
-def create_project(db: Session, *, name: str, goal: str) -> models.Project:
+def create_project(db: Session, *, name: str, goal: str, commit: bool = True) -> models.Project:
     project = models.Project(name=name, goal=goal)
-    db.add(project)
-    db.commit()
-    db.refresh(project)
+    _persist(db, project, commit)
     return project
 
 def create_task(
@@ -65,11 +134,112 @@ def create_task(
     title: str,
     description: str | None = None,
     agents: list[models.Agent] | None = None,
+    depends_on: list[models.Task] | None = None,
+    commit: bool = True,
 ) -> models.Task:
     task = models.Task(title=title, description=description, project=project)
     if agents:
         task.agents.extend(agents)
-    db.add(task)
-    db.commit()
-    db.refresh(task)
+    if depends_on:
+        task.dependencies.extend(depends_on)
+    _persist(db, task, commit)
     return task
+
+def create_tasks_bulk(
+    db: Session,
+    *,
+    project: models.Project | int,
+    tasks: Iterable[Mapping[str, Any]],
+    commit: bool = True,
+) -> list[models.Task]:
+    """Insert many tasks for ``project`` with one INSERT … RETURNING.
+
+    Each mapping takes ``title`` and optionally ``description``, ``status``,
+    ``agents`` to assign and ``depends_on`` tasks (objects or ids).
+    """
+    specs = list(tasks)
+    if not specs:
+        return []
+    project_id = _id(project)
+    rows = []
+    for s in specs:
+        row = {"project_id": project_id, "title": s["title"], "description": s.get("description")}
+        if "status" in s:
+            row["status"] = s["status"]
+        rows.append(row)
+    created = list(db.scalars(insert(models.Task).returning(models.Task, sort_by_parameter_order=True), rows))
+    assign_agents_bulk(
+        db,
+        [(task, agent) for task, s in zip(created, specs) for agent in s.get("agents") or ()],
+        commit=False,
+    )
+    add_task_dependencies(
+        db,
+        [(task, dep) for task, s in zip(created, specs) for dep in s.get("depends_on") or ()],
+        commit=False,
+    )
+    _finish(db, commit)
+    return created
+
+def add_task_dependencies(
+    db: Session,
+    edges: Iterable[tuple[models.Task | int, models.Task | int]],
+    *,
+    commit: bool = True,
+) -> int:
+    """Record ``(task, depends_on)`` edges; ``task`` waits for ``depends_on``.
+
+    Self-dependencies are rejected here; longer cycles are reported by the
+    scheduler (:func:`mimi3.scheduler.TaskGraph.topological_order`).
+    """
+    rows = [{"task_id": _id(task), "depends_on_id": _id(dep)} for task, dep in edges]
+    if any(r["task_id"] == r["depends_on_id"] for r in rows):
+        raise ValueError("A task cannot depend on itself")
+    if rows:
+        db.execute(insert(models.task_dependency_association), rows)
+    _finish(db, commit)
+    return len(rows)
+
+def assign_agents_bulk(
+    db: Session,
+    assignments: Iterable[tuple[models.Task | int, models.Agent | int]],
+    *,
+    commit: bool = True,
+) -> int:
+    """Insert ``(task, agent)`` rows into ``task_agent_association`` in one executemany."""
+    rows = [{"task_id": _id(task), "agent_id": _id(agent)} for task, agent in assignments]
+    if rows:
+        db.execute(insert(models.task_agent_association), rows)
+    _finish(db, commit)
+    return len(rows)
+
+# ---------- Read helpers --------------------------------------------------
+
+def project_tree_options():
+    """Loader options that fetch everything ``ProjectSchema`` serialises.
+
+    Collections use ``selectinload`` (one ``IN`` query per relationship,
+    no row explosion); the many-to-one ``Agent.role`` is joined onto the
+    agents query. The total is five queries however large the project is.
+    """
+    return (
+        selectinload(models.Project.tasks)
+        .selectinload(models.Task.agents)
+        .options(
+            joinedload(models.Agent.role),
+            selectinload(models.Agent.models),
+            selectinload(models.Agent.tools),
+        ),
+    )
+
+def get_project_trees(db: Session, project_ids: Iterable[int] | None = None) -> list[schemas.ProjectSchema]:
+    """Serialise projects (all by default) without per-relationship lazy loads."""
+    stmt = select(models.Project).options(*project_tree_options()).order_by(models.Project.id)
+    if project_ids is not None:
+        stmt = stmt.where(models.Project.id.in_(list(project_ids)))
+    return [schemas.ProjectSchema.model_validate(p) for p in db.scalars(stmt)]
+
+def get_project_tree(db: Session, project_id: int) -> schemas.ProjectSchema | None:
+    """Fully populated ``ProjectSchema`` for one project, or ``None``."""
+    trees = get_project_trees(db, [project_id])
+    return trees[0] if trees else None
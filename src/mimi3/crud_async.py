@@ -0,0 +1,78 @@
+"""Asyncio CRUD helpers mirroring :mod:`mimi3.crud`.
+
+Use with :data:`mimi3.database.AsyncSessionLocal`. Sessions from that
+factory keep attributes loaded after commit, so the helpers return objects
+without the extra ``refresh`` SELECT the sync versions issue.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+
+# ---------- Role ---------------------------------------------------------
+
+async def create_role(db: AsyncSession, *, name: str, description: str | None = None) -> models.Role:
+    role = models.Role(name=name, description=description)
+    db.add(role)
+    await db.commit()
+    return role
+
+# ---------- Model --------------------------------------------------------
+
+async def create_model(
+    db: AsyncSession, *, name: str, version: str | None = None, description: str | None = None
+) -> models.Model:
+    model = models.Model(name=name, version=version, description=description)
+    db.add(model)
+    await db.commit()
+    return model
+
+# ---------- Tool ---------------------------------------------------------
+
+async def create_tool(
+    db: AsyncSession, *, name: str, type_: str, description: str = "", config: str | None = None
+) -> models.Tool:
+    tool = models.Tool(name=name, type=type_, description=description, config=config)
+    db.add(tool)
+    await db.commit()
+    return tool
+
+# ---------- Agent --------------------------------------------------------
+
+async def create_agent(
+    db: AsyncSession,
+    *,
+    name: str,
+    role: models.Role,
+    models_: list[models.Model],
+    tools: list[models.Tool] | None = None,
+    description: str | None = None,
+) -> models.Agent:
+    agent = models.Agent(name=name, role=role, description=description)
+    agent.models.extend(models_)
+    if tools:
+        agent.tools.extend(tools)
+    db.add(agent)
+    await db.commit()
+    return agent
+
+# ---------- Project & Task ----------------------------------------------
+
+async def create_project(db: AsyncSession, *, name: str, goal: str) -> models.Project:
+    project = models.Project(name=name, goal=goal)
+    db.add(project)
+    await db.commit()
+    return project
+
+async def create_task(
+    db: AsyncSession,
+    *,
+    project: models.Project,
+    title: str,
+    description: str | None = None,
+    agents: list[models.Agent] | None = None,
+) -> models.Task:
+    task = models.Task(title=title, description=description, project=project)
+    if agents:
+        task.agents.extend(agents)
+    db.add(task)
+    await db.commit()
+    return task
@@ -1,24 +1,270 @@
-"""SQLAlchemy DB connection setup."""
+"""SQLAlchemy DB connection setup.
+
+The engine is built on first use from :class:`~mimi3.settings.Settings`
+rather than at import time, so ``TESTING`` and other configuration can be
+set after ``mimi3`` has been imported.
+"""
+from __future__ import annotations
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from .settings import Settings, settings
 
-# Check if we're in testing mode
-is_testing = os.environ.get("TESTING", "False").lower() in ("true", "1", "t")
+def is_testing() -> bool:
+    return os.environ.get("TESTING", "False").lower() in ("true", "1", "t")
 
-# Configure database connection based on environment
-if is_testing:
-    # Use SQLite for testing
-    SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    # Use the configured PostgreSQL database
-    from .settings import settings
-    engine = create_engine(settings.database_url)
+# ---------- Pool instrumentation ----------------------------------------
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class PoolMetrics:
+    """Counters for connection checkouts from an :class:`InstrumentedQueuePool`."""
 
-def init_db():
-    """Create tables (idempotent)."""
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, *, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):  # type: ignore[override]
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return conn
+
+# ---------- Engine factory ----------------------------------------------
+
+def _sqlite_pragmas(dbapi_conn, _record) -> None:
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+def make_engine(url: str | None = None, *, cfg: Settings | None = None) -> Engine:
+    """Build an engine for ``url`` (default: from settings) with tuned pooling.
+
+    Pooled engines use the ``db_pool_*`` settings and record checkout waits.
+    SQLite files also get WAL journaling and ``synchronous=NORMAL``; Postgres
+    gets ``statement_timeout`` when ``db_statement_timeout_ms`` is set.
+    """
+    cfg = cfg or settings
+    if url is None:
+        url = cfg.test_database_url if is_testing() else cfg.database_url
+
+    connect_args: dict[str, Any] = {}
+    if url.startswith("sqlite"):
+        connect_args["check_same_thread"] = False
+        if ":memory:" in url or url.rstrip("/") == "sqlite:":
+            # In-memory databases live in a single connection; keep SQLAlchemy's default pool.
+            return create_engine(url, connect_args=connect_args)
+    elif cfg.db_statement_timeout_ms and url.startswith("postgresql"):
+        connect_args["options"] = f"-c statement_timeout={cfg.db_statement_timeout_ms}"
+
+    engine = create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=cfg.db_pool_size,
+        max_overflow=cfg.db_max_overflow,
+        pool_timeout=cfg.db_pool_timeout,
+        pool_recycle=cfg.db_pool_recycle,
+        pool_pre_ping=cfg.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+    if url.startswith("sqlite"):
+        event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
+
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """Return the process-wide engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = make_engine()
+    return _engine
+
+def reset_engine(*, close: bool = True) -> None:
+    """Dispose the current engine; the next use rebuilds it from settings.
+
+    Pass ``close=False`` in a forked child so the parent's connections are
+    abandoned rather than closed underneath it.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose(close=close)
+        _engine = None
+        SessionLocal.configure(bind=None)
+
+class _LazySessionmaker(sessionmaker):
+    """``sessionmaker`` that binds to :func:`get_engine` on first call."""
+
+    def __call__(self, **local_kw: Any):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+
+def __getattr__(name: str) -> Any:
+    # ``database.engine`` keeps working but no longer connects at import.
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def pool_status() -> dict[str, Any]:
+    """Utilisation of the current engine's pool."""
+    pool = get_engine().pool
+    status: dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow(), checked_in=pool.checkedin())
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(
+            checkouts=metrics.checkouts,
+            timeouts=metrics.timeouts,
+            avg_wait_ms=metrics.total_wait / metrics.checkouts * 1000 if metrics.checkouts else 0.0,
+            max_wait_ms=metrics.max_wait * 1000,
+        )
+    return status
+
+# ---------- Async engine -----------------------------------------------
+
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def async_url(url: str) -> str:
+    """Swap a sync driver for its asyncio counterpart (aiosqlite / asyncpg)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r}")
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def make_async_engine(url: str | None = None, *, cfg: Settings | None = None) -> AsyncEngine:
+    """Async counterpart of :func:`make_engine` with the same pool settings."""
+    cfg = cfg or settings
+    if url is None:
+        url = cfg.test_database_url if is_testing() else cfg.database_url
+    url = async_url(url)
+
+    if url.startswith("sqlite"):
+        engine = create_async_engine(url)
+        if ":memory:" not in url:
+            event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+        return engine
+
+    connect_args: dict[str, Any] = {}
+    if cfg.db_statement_timeout_ms:
+        connect_args["server_settings"] = {"statement_timeout": str(cfg.db_statement_timeout_ms)}
+    return create_async_engine(
+        url,
+        pool_size=cfg.db_pool_size,
+        max_overflow=cfg.db_max_overflow,
+        pool_timeout=cfg.db_pool_timeout,
+        pool_recycle=cfg.db_pool_recycle,
+        pool_pre_ping=cfg.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+_async_engine: AsyncEngine | None = None
+
+def get_async_engine() -> AsyncEngine:
+    """Return the process-wide async engine, creating it on first use.
+
+    Async drivers bind connections to the running event loop; call
+    :func:`dispose_async_engine` before that loop closes.
+    """
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                _async_engine = make_async_engine()
+    return _async_engine
+
+async def dispose_async_engine() -> None:
+    """Dispose the async engine; the next use rebuilds it from settings."""
+    global _async_engine
+    engine, _async_engine = _async_engine, None
+    AsyncSessionLocal.configure(bind=None)
+    if engine is not None:
+        await engine.dispose()
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    """``async_sessionmaker`` that binds to :func:`get_async_engine` on first call."""
+
+    def __call__(self, **local_kw: Any):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_async_engine())
+        return super().__call__(**local_kw)
+
+# Attributes stay loaded after commit: lazy loads are not available under asyncio.
+AsyncSessionLocal = _LazyAsyncSessionmaker(autoflush=False, expire_on_commit=False)
+
+def _sync_schema(conn) -> None:
+    """Create missing tables, then the columns and indexes ``create_all`` skips.
+
+    Only additive changes are applied: a new column must be nullable or
+    carry a ``server_default``.
+    """
     from .models import Base
-    Base.metadata.create_all(bind=engine)
+    from .search import install_fts
+
+    Base.metadata.create_all(bind=conn)
+    inspector = inspect(conn)
+    preparer = conn.dialect.identifier_preparer
+    ddl_compiler = conn.dialect.ddl_compiler(conn.dialect, None)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} "
+            ddl += column.type.compile(dialect=conn.dialect)
+            if column.server_default is not None:
+                ddl += f" DEFAULT {ddl_compiler.get_column_default_string(column)}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            conn.execute(text(ddl))
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+    install_fts(conn)
+
+async def init_db_async() -> None:
+    """Async counterpart of :func:`init_db`."""
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(_sync_schema)
+
+def init_db():
+    """Create tables, columns and indexes (idempotent)."""
+    with get_engine().begin() as conn:
+        _sync_schema(conn)
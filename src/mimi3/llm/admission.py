@@ -0,0 +1,318 @@
+"""Admission control for LLM calls: concurrency limits, token budgets, priorities.
+
+Every call needs a slot on its model and on its host. A model can also
+have a token bucket refilled at ``token_rate`` tokens per second. A call
+is charged an estimate of its tokens when admitted, and the difference
+from Ollama's reported counts is settled when it finishes. A bucket may
+go into debt, which holds back the calls after it.
+
+Calls that cannot be admitted wait in one queue ordered by priority
+class, then arrival. A waiting call also holds back lower-priority calls
+that need the same model or host. Calls for other models are not held
+back. A call that waits longer than ``timeout`` raises
+:class:`Overloaded` instead of piling more work onto a saturated host.
+"""
+from __future__ import annotations
+import asyncio
+import bisect
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator, Literal, Mapping
+
+Priority = Literal["high", "normal", "low"]
+PRIORITIES: dict[Priority, int] = {"high": 0, "normal": 1, "low": 2}
+
+_GAUGES = [
+    ("limit", "mimi3_admission_limit", "Concurrent calls allowed (0 = unlimited)."),
+    ("active", "mimi3_admission_active", "Calls admitted and not finished."),
+    ("waiting", "mimi3_admission_waiting", "Calls queued for admission."),
+    ("admitted", "mimi3_admission_admitted", "Calls admitted since start."),
+    ("rejected", "mimi3_admission_rejected", "Calls that timed out waiting."),
+    ("wait_seconds", "mimi3_admission_wait_seconds", "Total time calls spent queued."),
+    ("tokens", "mimi3_admission_tokens_available", "Token bucket level (negative = debt)."),
+]
+
+def estimate_tokens(*texts: str | None) -> int:
+    """Rough token count of ``texts`` (about four characters per token)."""
+    return sum(len(t) for t in texts if t) // 4 + 1
+
+class Overloaded(TimeoutError):
+    """A call waited ``waited`` seconds for ``scope`` (``model:<name>`` or ``host:<url>``)."""
+
+    def __init__(self, scope: str, waited: float) -> None:
+        super().__init__(f"{scope} is overloaded; gave up after {waited:.1f}s in the admission queue")
+        self.scope = scope
+        self.waited = waited
+
+    @property
+    def host(self) -> bool:
+        """Whether the whole host is saturated, so other models would wait too."""
+        return self.scope.startswith("host:")
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``burst``."""
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.level = self.burst
+        self._at = time.monotonic()
+
+    def refill(self, now: float) -> float:
+        self.level = min(self.burst, self.level + (now - self._at) * self.rate)
+        self._at = now
+        return self.level
+
+    def eta(self) -> float:
+        """Seconds until the level is back to zero."""
+        return max(0.0, -self.level / self.rate)
+
+class _Scope:
+    """One limited resource: a model or a host."""
+
+    def __init__(self, name: str, limit: int | None, bucket: TokenBucket | None) -> None:
+        self.name = name
+        self.limit = limit
+        self.bucket = bucket
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+
+    def free(self, now: float) -> bool:
+        if self.limit is not None and self.active >= self.limit:
+            return False
+        return self.bucket is None or self.bucket.refill(now) >= 0
+
+class Ticket:
+    """An admitted call; :meth:`settle` with the response to correct the token charge."""
+
+    __slots__ = ("scopes", "charged", "used", "priority", "seq", "admitted", "wake")
+
+    def __init__(self, scopes: tuple[_Scope, ...] = (), charged: int = 0, priority: int = 1, seq: int = 0) -> None:
+        self.scopes = scopes
+        self.charged = charged
+        self.used: int | None = None
+        self.priority = priority
+        self.seq = seq
+        self.admitted = False
+        self.wake: Any = None
+
+    def __lt__(self, other: "Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def settle(self, response: Mapping[str, Any] | None) -> None:
+        """Record the tokens Ollama actually processed."""
+        if response is not None and (response.get("prompt_eval_count") or response.get("eval_count")):
+            self.used = (response.get("prompt_eval_count") or 0) + (response.get("eval_count") or 0)
+
+class AdmissionController:
+    """Per-model and per-host concurrency limits plus per-model token buckets.
+
+    ``None`` disables a limit. ``host_limits`` overrides
+    ``host_concurrency`` for particular host keys.
+    """
+
+    def __init__(
+        self,
+        *,
+        model_concurrency: int | None = None,
+        host_concurrency: int | None = None,
+        host_limits: Mapping[str, int] | None = None,
+        token_rate: float | None = None,
+        token_burst: float | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        self.model_concurrency = model_concurrency
+        self.host_concurrency = host_concurrency
+        self.host_limits = dict(host_limits or {})
+        self.token_rate = token_rate
+        self.token_burst = token_burst
+        self.timeout = timeout
+        self._scopes: dict[str, _Scope] = {}
+        self._waiters: list[Ticket] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+
+    def _scope(self, name: str) -> _Scope:
+        scope = self._scopes.get(name)
+        if scope is None:
+            if name.startswith("model:"):
+                bucket = TokenBucket(self.token_rate, self.token_burst) if self.token_rate else None
+                scope = _Scope(name, self.model_concurrency, bucket)
+            else:
+                scope = _Scope(name, self.host_limits.get(name[5:], self.host_concurrency), None)
+            self._scopes[name] = scope
+        return scope
+
+    def _grant(self) -> None:
+        """Admit queued calls in priority order; lock held."""
+        now = time.monotonic()
+        blocked: set[_Scope] = set()
+        for ticket in list(self._waiters):
+            if blocked.intersection(ticket.scopes):
+                continue
+            full = [s for s in ticket.scopes if not s.free(now)]
+            if full:
+                blocked.update(full)  # nothing behind it may take these first
+                continue
+            self._waiters.remove(ticket)
+            for s in ticket.scopes:
+                s.active += 1
+                s.admitted += 1
+                if s.bucket is not None:
+                    s.bucket.level -= ticket.charged
+            ticket.admitted = True
+            if ticket.wake is not None:
+                ticket.wake()
+
+    def _enqueue(self, model: str, host: str, priority: Priority, tokens: int) -> Ticket:
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r}; expected one of {', '.join(PRIORITIES)}")
+        with self._lock:
+            scopes = (self._scope(f"model:{model}"), self._scope(f"host:{host}"))
+            ticket = Ticket(scopes, tokens, PRIORITIES[priority], next(self._seq))
+            bisect.insort(self._waiters, ticket)
+            self._grant()
+        return ticket
+
+    def _poll(self, ticket: Ticket, start: float, timeout: float | None) -> float | None:
+        """Retry admission; returns how long to sleep, or ``None`` once admitted.
+
+        Raises :class:`Overloaded` when ``timeout`` has passed.
+        """
+        with self._lock:
+            if not ticket.admitted:
+                self._grant()
+            waited = time.monotonic() - start
+            if ticket.admitted:
+                for s in ticket.scopes:
+                    s.wait_seconds += waited
+                return None
+            if timeout is not None and waited >= timeout:
+                blocking = self._remove(ticket, waited, rejected=True)
+                raise Overloaded(blocking, waited)
+            refill = max((s.bucket.eta() for s in ticket.scopes if s.bucket is not None), default=0.0)
+        sleeps = [1.0] + [x for x in (refill, None if timeout is None else timeout - waited) if x]
+        return min(sleeps)
+
+    def _remove(self, ticket: Ticket, waited: float, *, rejected: bool) -> str:
+        """Take a waiting call out of the queue; returns the scope that held it. Lock held."""
+        self._waiters.remove(ticket)
+        now = time.monotonic()
+        blocking = next((s.name for s in ticket.scopes if not s.free(now)), ticket.scopes[0].name)
+        for s in ticket.scopes:
+            s.wait_seconds += waited
+            s.rejected += rejected
+        self._grant()  # it may have been holding back others
+        return blocking
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+
+    def acquire(
+        self, model: str, host: str, *, priority: Priority = "normal", tokens: int = 0, timeout: float | None = None
+    ) -> Ticket:
+        """Block until the call may run; raises :class:`Overloaded` after ``timeout``."""
+        timeout = self.timeout if timeout is None else timeout
+        ticket = self._enqueue(model, host, priority, tokens)
+        if ticket.admitted:
+            return ticket
+        event = threading.Event()
+        ticket.wake = event.set
+        start = time.monotonic()
+        while (sleep := self._poll(ticket, start, timeout)) is not None:
+            event.wait(sleep)
+            event.clear()
+        return ticket
+
+    async def aacquire(
+        self, model: str, host: str, *, priority: Priority = "normal", tokens: int = 0, timeout: float | None = None
+    ) -> Ticket:
+        """Asyncio variant of :meth:`acquire`; cancellation leaves the queue."""
+        timeout = self.timeout if timeout is None else timeout
+        ticket = self._enqueue(model, host, priority, tokens)
+        if ticket.admitted:
+            return ticket
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        ticket.wake = lambda: loop.call_soon_threadsafe(event.set)
+        start = time.monotonic()
+        try:
+            while (sleep := self._poll(ticket, start, timeout)) is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), sleep)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except asyncio.CancelledError:
+            with self._lock:
+                admitted = ticket.admitted
+                if not admitted:
+                    self._remove(ticket, time.monotonic() - start, rejected=False)
+            if admitted:
+                self.release(ticket)
+            raise
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """Free the call's slots and settle its token charge."""
+        with self._lock:
+            for s in ticket.scopes:
+                s.active -= 1
+                if s.bucket is not None and ticket.used is not None:
+                    s.bucket.level += ticket.charged - ticket.used
+            self._grant()
+
+    @contextmanager
+    def slot(self, model: str, host: str, *, priority: Priority = "normal", tokens: int = 0) -> Iterator[Ticket]:
+        ticket = self.acquire(model, host, priority=priority, tokens=tokens)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def aslot(
+        self, model: str, host: str, *, priority: Priority = "normal", tokens: int = 0
+    ) -> AsyncIterator[Ticket]:
+        ticket = await self.aacquire(model, host, priority=priority, tokens=tokens)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    # ------------------------------------------------------------------ #
+    # Metrics
+    # ------------------------------------------------------------------ #
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """Per model/host scope: limit, load, queue and token level."""
+        with self._lock:
+            now = time.monotonic()
+            out = {}
+            for name, s in sorted(self._scopes.items()):
+                out[name] = {
+                    "limit": s.limit or 0,
+                    "active": s.active,
+                    "waiting": sum(s in t.scopes for t in self._waiters),
+                    "admitted": s.admitted,
+                    "rejected": s.rejected,
+                    "wait_seconds": s.wait_seconds,
+                    "tokens": s.bucket.refill(now) if s.bucket is not None else 0,
+                }
+            return out
+
+    def render(self) -> str:
+        from .telemetry import render_gauges
+
+        return render_gauges(self.metrics(), _GAUGES, "scope")
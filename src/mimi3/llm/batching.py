@@ -0,0 +1,244 @@
+"""Dynamic batching of generate requests per model.
+
+Ollama serves up to ``OLLAMA_NUM_PARALLEL`` requests for a loaded model
+in the same forward passes, so a burst of prompts finishes in little more
+time than one. Agents call models independently, though, and their
+requests trickle in one at a time. :class:`Batcher` puts every request for
+a model in one queue; a dispatcher thread per model waits up to
+``max_wait`` for the queue to reach ``max_batch`` requests and sends them
+together, never keeping more than ``parallelism`` in flight.
+
+With several Ollama hosts, ``route(model)`` picks the host for each batch
+and ``parallelism`` applies per host, since every server has its own
+``OLLAMA_NUM_PARALLEL``; ``send`` then receives the host as ``host=``.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+Send = Callable[..., Any]  # send(model=..., **request) -> response
+Route = Callable[[str], str]  # route(model) -> host the next batch goes to
+
+_GAUGES = [
+    ("queued", "mimi3_batch_queued", "Requests waiting for a batch."),
+    ("in_flight", "mimi3_batch_in_flight", "Requests sent and not yet answered."),
+    ("mean_batch", "mimi3_batch_mean_size", "Mean requests per dispatched batch."),
+    ("mean_wait_seconds", "mimi3_batch_mean_wait_seconds", "Mean time a request spent queued."),
+]
+
+class _Request:
+    __slots__ = ("kwargs", "future", "queued")
+
+    def __init__(self, kwargs: dict[str, Any]) -> None:
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.queued = time.perf_counter()
+
+class _Slots:
+    """Requests one host may have in flight for a model, and the threads sending them."""
+
+    def __init__(self, parallelism: int) -> None:
+        self.free = threading.BoundedSemaphore(parallelism)
+        self.executor = ThreadPoolExecutor(parallelism, thread_name_prefix="mimi3-batch")
+
+class _Lane:
+    """Queue and counters for one model; slots per host."""
+
+    def __init__(self, parallelism: int) -> None:
+        self.parallelism = parallelism
+        self.queue: deque[_Request] = deque()
+        self.cond = threading.Condition()
+        self.hosts: dict[str | None, _Slots] = {}
+        self.in_flight = 0
+        self.batches = 0
+        self.requests = 0
+        self.wait_seconds = 0.0
+
+    def slots(self, host: str | None) -> _Slots:
+        with self.cond:
+            slots = self.hosts.get(host)
+            if slots is None:
+                slots = self.hosts[host] = _Slots(self.parallelism)
+            return slots
+
+class Batcher:
+    """Per-model request queues dispatched in batches.
+
+    :meth:`submit` returns a :class:`concurrent.futures.Future`; async
+    callers wrap it with :func:`asyncio.wrap_future`. Requests cancelled
+    before dispatch are never sent. Without ``route`` all requests go to
+    one host. If routing or handing a batch to a sender raises, that batch's
+    futures get the error and the model's queue keeps being served.
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        *,
+        max_batch: int = 4,
+        max_wait: float = 0.005,
+        parallelism: int = 4,
+        route: Route | None = None,
+    ) -> None:
+        if max_batch < 1 or parallelism < 1:
+            raise ValueError("max_batch and parallelism must be >= 1")
+        self.send = send
+        self.route = route
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.parallelism = parallelism
+        self._lanes: dict[str, _Lane] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._closed = False
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+
+    def _lane(self, model: str) -> _Lane:
+        with self._lock:
+            if self._pid != os.getpid():  # forked: the parent's threads did not come along
+                self._lanes, self._pid = {}, os.getpid()
+            lane = self._lanes.get(model)
+            if lane is None:
+                lane = self._lanes[model] = _Lane(self.parallelism)
+                threading.Thread(
+                    target=self._dispatch, args=(model, lane), name=f"mimi3-batch-{model}", daemon=True
+                ).start()
+            return lane
+
+    def _next_batch(self, lane: _Lane) -> list[_Request] | None:
+        """Block for the first request, then collect more until full or ``max_wait``."""
+        with lane.cond:
+            while not lane.queue and not self._closed:
+                lane.cond.wait()
+            if not lane.queue:
+                return None
+            deadline = time.monotonic() + self.max_wait
+            while len(lane.queue) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                lane.cond.wait(remaining)
+            n = min(self.max_batch, len(lane.queue))
+            return [lane.queue.popleft() for _ in range(n)]
+
+    def _dispatch(self, model: str, lane: _Lane) -> None:
+        while True:
+            # The whole batch goes to one host. Requests pile up while that
+            # host is busy and leave together once it has room again.
+            try:
+                host = self.route(model) if self.route is not None else None
+                slots = lane.slots(host)
+            except Exception as exc:
+                # No host to send to: fail the next batch, keep the lane alive.
+                batch = self._next_batch(lane)
+                if batch is None:
+                    break
+                self._fail([r for r in batch if r.future.set_running_or_notify_cancel()], exc)
+                continue
+            slots.free.acquire()
+            batch = self._next_batch(lane)
+            if batch is None:
+                slots.free.release()
+                break
+            batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+            if not batch:
+                slots.free.release()
+                continue
+            with lane.cond:
+                lane.batches += 1
+            for i, request in enumerate(batch):
+                if i:
+                    slots.free.acquire()
+                with lane.cond:
+                    lane.in_flight += 1
+                    lane.requests += 1
+                    lane.wait_seconds += time.perf_counter() - request.queued
+                try:
+                    slots.executor.submit(self._send, model, host, lane, slots, request)
+                except Exception as exc:
+                    with lane.cond:
+                        lane.in_flight -= 1
+                    slots.free.release()
+                    self._fail(batch[i:], exc)
+                    break
+        for slots in list(lane.hosts.values()):
+            slots.executor.shutdown(wait=False)
+
+    @staticmethod
+    def _fail(batch: list[_Request], exc: Exception) -> None:
+        """Resolve requests that will not be sent with ``exc``."""
+        for request in batch:
+            request.future.set_exception(exc)
+
+    def _send(self, model: str, host: str | None, lane: _Lane, slots: _Slots, request: _Request) -> None:
+        try:
+            if host is None:
+                response = self.send(model=model, **request.kwargs)
+            else:
+                response = self.send(model=model, host=host, **request.kwargs)
+        except BaseException as exc:
+            request.future.set_exception(exc)
+        else:
+            request.future.set_result(response)
+        finally:
+            with lane.cond:
+                lane.in_flight -= 1
+            slots.free.release()
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+
+    def submit(self, *, model: str, **kwargs: Any) -> Future:
+        """Queue one request for ``model``; the future resolves to the response."""
+        if self._closed:
+            raise RuntimeError("batcher is closed")
+        lane = self._lane(model)
+        request = _Request(kwargs)
+        with lane.cond:
+            lane.queue.append(request)
+            lane.cond.notify()
+        return request.future
+
+    def __call__(self, *, model: str, **kwargs: Any) -> Any:
+        """Submit and wait, for synchronous callers."""
+        return self.submit(model=model, **kwargs).result()
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """Per-model queue depth, requests in flight and batch sizes."""
+        with self._lock:
+            lanes = dict(self._lanes)
+        out = {}
+        for model, lane in sorted(lanes.items()):
+            with lane.cond:
+                out[model] = {
+                    "queued": len(lane.queue),
+                    "in_flight": lane.in_flight,
+                    "batches": lane.batches,
+                    "requests": lane.requests,
+                    "mean_batch": lane.requests / lane.batches if lane.batches else 0.0,
+                    "mean_wait_seconds": lane.wait_seconds / lane.requests if lane.requests else 0.0,
+                }
+        return out
+
+    def render(self) -> str:
+        """:meth:`metrics` as Prometheus gauges."""
+        from .telemetry import render_gauges
+
+        return render_gauges(self.metrics(), _GAUGES, "model")
+
+    def close(self) -> None:
+        """Send what is queued, then stop the dispatcher threads."""
+        self._closed = True
+        with self._lock:
+            lanes = list(self._lanes.values())
+        for lane in lanes:
+            with lane.cond:
+                lane.cond.notify_all()
@@ -0,0 +1,202 @@
+"""Content-addressed completion cache for LLM calls.
+
+Entries are keyed by a hash of ``(model, prompt, options)``. Tiers share a
+small interface (``get``/``set``/``clear`` plus ``stats``) so they can be
+combined with :class:`TieredCache`, e.g. an in-process LRU in front of the
+database-backed :class:`SQLCache`.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, UTC
+from typing import Any, Callable, Mapping
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from .. import models
+
+def cache_key(model: str, prompt: str, options: Mapping[str, Any] | None = None, *, system: str = "") -> str:
+    """Stable sha256 hex digest of a generation request."""
+    parts: list[Any] = [model, prompt, dict(options or {})]
+    if system:
+        parts.append(system)
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def is_deterministic(options: Mapping[str, Any] | None) -> bool:
+    """Whether repeated calls with ``options`` should produce the same text."""
+    options = options or {}
+    return options.get("temperature") == 0 or options.get("seed") is not None
+
+class CacheStats:
+    """Hit/miss/eviction counters for one cache."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return f"<CacheStats hits={self.hits} misses={self.misses} evictions={self.evictions}>"
+
+class CompletionCache(ABC):
+    """Interface shared by all cache tiers."""
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+
+    @abstractmethod
+    def get(self, key: str) -> str | None: ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, *, model: str = "") -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+class LRUCache(CompletionCache):
+    """Thread-safe in-process LRU with optional TTL (seconds)."""
+
+    def __init__(self, *, max_entries: int = 1024, ttl: float | None = None) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.ttl is not None and time.monotonic() - item[1] > self.ttl:
+                del self._data[key]
+                self.stats.evictions += 1
+                item = None
+            if item is None:
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return item[0]
+
+    def set(self, key: str, value: str, *, model: str = "") -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+class SQLCache(CompletionCache):
+    """Persistent tier stored in the ``completion_cache`` table.
+
+    Works on any database the ORM is configured for. Entries older than
+    ``ttl`` seconds are treated as misses and removed; when
+    ``max_entries`` is set the oldest rows beyond it are deleted every
+    ``trim_every`` writes, so the table may briefly hold up to
+    ``trim_every - 1`` extra rows.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] | None = None,
+        *,
+        max_entries: int | None = 100_000,
+        ttl: float | None = None,
+        trim_every: int = 100,
+    ) -> None:
+        super().__init__()
+        if trim_every < 1:
+            raise ValueError("trim_every must be >= 1")
+        if session_factory is None:
+            from ..database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.trim_every = trim_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _now() -> datetime:
+        # Stored naive (UTC) so comparisons behave the same on SQLite and Postgres.
+        return datetime.now(UTC).replace(tzinfo=None)
+
+    def get(self, key: str) -> str | None:
+        entry_cls = models.CompletionCacheEntry
+        with self.session_factory() as db:
+            entry = db.get(entry_cls, key)
+            if entry is not None and self.ttl is not None and entry.created_at < self._now() - timedelta(seconds=self.ttl):
+                db.delete(entry)
+                db.commit()
+                self.stats.evictions += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            return entry.response
+
+    def set(self, key: str, value: str, *, model: str = "") -> None:
+        entry_cls = models.CompletionCacheEntry
+        with self._lock:
+            self._writes += 1
+            trim = self.max_entries is not None and self._writes % self.trim_every == 0
+        with self.session_factory() as db:
+            db.merge(entry_cls(key=key, model=model, response=value, created_at=self._now()))
+            if trim:  # the ordered scan costs O(n), so it is not paid on every write
+                db.flush()
+                stale = (
+                    select(entry_cls.key)
+                    .order_by(entry_cls.created_at.desc())
+                    .offset(self.max_entries)
+                )
+                result = db.execute(delete(entry_cls).where(entry_cls.key.in_(stale)))
+                self.stats.evictions += result.rowcount or 0
+            db.commit()
+
+    def clear(self) -> None:
+        with self.session_factory() as db:
+            db.execute(delete(models.CompletionCacheEntry))
+            db.commit()
+
+class TieredCache(CompletionCache):
+    """Consult tiers in order; a hit in a slower tier back-fills the faster ones."""
+
+    def __init__(self, *tiers: CompletionCache) -> None:
+        super().__init__()
+        self.tiers = tiers
+
+    def get(self, key: str) -> str | None:
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:i]:
+                    faster.set(key, value)
+                self.stats.hits += 1
+                return value
+        self.stats.misses += 1
+        return None
+
+    def set(self, key: str, value: str, *, model: str = "") -> None:
+        for tier in self.tiers:
+            tier.set(key, value, model=model)
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
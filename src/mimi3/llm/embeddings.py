@@ -0,0 +1,109 @@
+"""Text embeddings for memory search.
+
+An embedder turns a batch of texts into an ``(n, dim)`` float32 matrix of
+L2-normalised rows, so cosine similarity is a dot product.
+:class:`OllamaEmbedder` calls ``/api/embed`` in batches;
+:class:`HashEmbedder` is a deterministic, dependency-free stand-in for
+tests and benchmarks.
+
+:func:`embed_pending` is the pipeline step that embeds memory entries that
+have no ``memory_embeddings`` row yet.
+"""
+from __future__ import annotations
+import hashlib
+import re
+from typing import Any, Protocol, Sequence
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from .. import models
+from ..settings import settings
+
+class Embedder(Protocol):
+    model: str
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray: ...
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def to_blob(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+def from_blob(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f4")
+
+class OllamaEmbedder:
+    """Embed with an Ollama embedding model, ``batch_size`` texts per request."""
+
+    def __init__(self, model: str | None = None, *, client: Any = None, batch_size: int | None = None) -> None:
+        self.model = model or settings.embedding_model
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from ollama import Client
+            self._client = Client(host=settings.ollama_host)
+        return self._client
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        batches = [
+            self.client.embed(model=self.model, input=list(texts[i : i + self.batch_size]))["embeddings"]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        return normalize(np.concatenate([np.asarray(b, dtype=np.float32) for b in batches]))
+
+class HashEmbedder:
+    """Bag-of-words feature hashing; texts sharing words land close together."""
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = dim
+        self.model = f"hash-{dim}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += 1.0 if h >> 63 else -1.0
+        return normalize(out)
+
+def embed_pending(
+    db: Session,
+    embedder: Embedder,
+    *,
+    project_id: int | None = None,
+    batch_size: int = 256,
+) -> int:
+    """Embed memory entries without an embedding; returns how many were added.
+
+    Rows are read and written ``batch_size`` at a time (the embedder may
+    split each batch further into requests).
+    """
+    m, e = models.Memory, models.MemoryEmbedding
+    stmt = select(m.id, m.content).outerjoin(e, e.memory_id == m.id).where(e.id.is_(None)).order_by(m.id)
+    if project_id is not None:
+        stmt = stmt.join(models.Task, models.Task.id == m.task_id).where(models.Task.project_id == project_id)
+    added = 0
+    after = 0
+    while True:
+        rows = db.execute(stmt.where(m.id > after).limit(batch_size)).all()
+        if not rows:
+            return added
+        vectors = embedder.embed([r.content for r in rows])
+        db.execute(
+            insert(e),
+            [
+                {"memory_id": r.id, "model": embedder.model, "dim": len(v), "vector": to_blob(v)}
+                for r, v in zip(rows, vectors)
+            ],
+        )
+        db.commit()
+        added += len(rows)
+        after = rows[-1].id
@@ -0,0 +1,218 @@
+"""Per-model health tracking: circuit breakers, latency and error rates."""
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, UTC
+from typing import Iterable, Iterator, Sequence
+from sqlalchemy.orm import Session
+from .. import models
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitBreaker:
+    """Classic three-state breaker.
+
+    Opens after ``failure_threshold`` consecutive failures, rejects calls for
+    ``reset_timeout`` seconds, then goes half-open and lets a single probe
+    through: a success closes it again, a failure re-opens it. A probe whose
+    outcome is never recorded is given up after another ``reset_timeout``.
+    """
+
+    def __init__(self, *, failure_threshold: int = 3, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing_since: float | None = None
+
+    def ready(self) -> bool:
+        """Whether :meth:`allow` would let a call through, without claiming the probe."""
+        now = time.monotonic()
+        if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            # Only one probe at a time.
+            return self.probing_since is None or now - self.probing_since >= self.reset_timeout
+        return self.state == CLOSED
+
+    def allow(self) -> bool:
+        """Let a call through; while half-open this claims the single probe."""
+        if not self.ready():
+            return False
+        if self.state == HALF_OPEN:
+            self.probing_since = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.probing_since = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probing_since = None
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+class ModelHealth:
+    """Rolling window of call outcomes for one model."""
+
+    def __init__(self, *, window: int = 100, failure_threshold: int = 3, reset_timeout: float = 30.0) -> None:
+        self.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._outcomes: deque[bool] = deque(maxlen=window)
+
+    def _percentile(self, q: float) -> float | None:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def p50(self) -> float | None:
+        return self._percentile(0.50)
+
+    @property
+    def p95(self) -> float | None:
+        return self._percentile(0.95)
+
+    @property
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    @property
+    def samples(self) -> int:
+        return len(self._outcomes)
+
+    def record(self, latency: float | None, ok: bool) -> None:
+        self._outcomes.append(ok)
+        if ok:
+            self._latencies.append(latency or 0.0)
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+class HealthRegistry:
+    """Thread-safe map of model name -> :class:`ModelHealth` plus routing."""
+
+    def __init__(
+        self,
+        *,
+        window: int = 100,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        error_penalty: float = 4.0,
+    ) -> None:
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.error_penalty = error_penalty
+        self._models: dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str) -> ModelHealth:
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = ModelHealth(
+                    window=self.window,
+                    failure_threshold=self.failure_threshold,
+                    reset_timeout=self.reset_timeout,
+                )
+            return self._models[model_name]
+
+    def record(self, model_name: str, *, latency: float | None = None, ok: bool = True) -> None:
+        health = self.get(model_name)
+        with self._lock:
+            health.record(latency, ok)
+
+    def begin(self, model_name: str) -> None:
+        """Note that a call to ``model_name`` starts; it takes a half-open breaker's probe."""
+        health = self.get(model_name)
+        with self._lock:
+            health.breaker.allow()
+
+    @contextmanager
+    def track(self, model_name: str) -> Iterator[None]:
+        """Time the enclosed call (see :meth:`begin`) and record its outcome.
+
+        Cancellation (``BaseException``) is not counted as a failure.
+        """
+        self.begin(model_name)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record(model_name, ok=False)
+            raise
+        self.record(model_name, latency=time.perf_counter() - start)
+
+    def score(self, model_name: str) -> float:
+        """Expected cost of a call: p50 latency inflated by the error rate.
+
+        Models without samples score 0 so they are tried (and measured) early.
+        """
+        health = self.get(model_name)
+        return (health.p50 or 0.0) * (1 + self.error_penalty * health.error_rate)
+
+    def order(self, model_names: Sequence[str]) -> list[str]:
+        """Healthy models sorted by :meth:`score`, ties kept in given order.
+
+        Models with an open breaker (or a half-open one already probing)
+        are dropped; if every breaker is open the original order is returned
+        so the caller still gets an attempt. Ordering does not take a
+        half-open model's probe; the call itself does.
+        """
+        with self._lock:
+            available = [m for m in model_names if self._models.get(m) is None or self._models[m].breaker.ready()]
+        if not available:
+            return list(model_names)
+        return sorted(available, key=self.score)
+
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+
+    def persist(self, db: Session, model_rows: Iterable[models.Model] | None = None) -> int:
+        """Snapshot stats onto ``models.ModelHealthRecord`` rows.
+
+        ``Model`` rows are matched by :attr:`models.Model.tag`.
+        Returns the number of rows written.
+        """
+        rows = list(model_rows) if model_rows is not None else db.query(models.Model).all()
+        written = 0
+        for model in rows:
+            key = model.tag
+            if key not in self._models:
+                continue
+            health = self._models[key]
+            record = model.health or models.ModelHealthRecord(model=model)
+            record.p50_ms = health.p50 * 1000 if health.p50 is not None else None
+            record.p95_ms = health.p95 * 1000 if health.p95 is not None else None
+            record.error_rate = health.error_rate
+            record.samples = health.samples
+            record.breaker_state = health.breaker.state
+            record.updated_at = datetime.now(UTC)
+            db.add(record)
+            written += 1
+        db.commit()
+        return written
+
+    def load(self, db: Session) -> int:
+        """Seed latency priors from persisted records; returns models loaded."""
+        loaded = 0
+        for record in db.query(models.ModelHealthRecord).join(models.Model):
+            if record.p50_ms is None:
+                continue
+            health = self.get(record.model.tag)
+            with self._lock:
+                if not health.samples:
+                    health._latencies.append(record.p50_ms / 1000)
+                    health._outcomes.append(True)
+            loaded += 1
+        return loaded
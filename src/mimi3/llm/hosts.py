@@ -0,0 +1,316 @@
+"""Load balancing over several Ollama hosts.
+
+:class:`HostPool` picks a host for each call among those that are up and
+serve the model (per ``/api/tags``), by fewest outstanding requests or by
+observed latency times queue length. Connection failures and timeouts
+trip a per-host :class:`~mimi3.llm.health.CircuitBreaker` and the call is
+retried on another host; a host answering "model not found" is dropped
+from that model's inventory. Other errors are the model's, not the host's,
+and are raised to the agent's model fallback.
+"""
+from __future__ import annotations
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Literal, Sequence, TypeVar
+from .health import OPEN, CircuitBreaker
+
+Strategy = Literal["least_outstanding", "latency"]
+T = TypeVar("T")
+
+_GAUGES = [
+    ("up", "mimi3_host_up", "1 if the host's breaker lets calls through."),
+    ("outstanding", "mimi3_host_outstanding", "Requests in flight to the host."),
+    ("calls", "mimi3_host_calls", "Calls the host answered."),
+    ("failures", "mimi3_host_failures", "Calls that failed because the host was unreachable."),
+    ("latency", "mimi3_host_latency_seconds", "Smoothed call latency across models."),
+    ("error_rate", "mimi3_host_error_rate", "Smoothed share of calls answered with a model error."),
+]
+
+def _tag(name: str) -> str:
+    return name if ":" in name else f"{name}:latest"
+
+def _missing(exc: BaseException) -> bool:
+    """The host is up but does not have the model."""
+    return getattr(exc, "status_code", None) == 404
+
+def _unreachable(exc: BaseException) -> bool:
+    """The host could not be reached or did not answer in time."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    if getattr(exc, "status_code", None) in (502, 503, 504):
+        return True
+    try:
+        import httpx
+    except ImportError:  # pragma: no cover
+        return False
+    return isinstance(exc, httpx.TransportError)
+
+class Host:
+    """One Ollama server: its client, inventory and load."""
+
+    def __init__(self, url: str, client_factory: Callable[[str], Any], breaker: CircuitBreaker) -> None:
+        self.url = url
+        self.breaker = breaker
+        self.models: set[str] | None = None  # None until the inventory is known
+        self.outstanding = 0
+        self.calls = 0
+        self.failures = 0
+        self.latency: dict[str, float] = {}  # per model, smoothed seconds
+        self.errors: dict[str, float] = {}  # per model, smoothed share of calls that raised a model error
+        self._client_factory = client_factory
+        self._client = None
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = self._client_factory(self.url)
+        return self._client
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or _tag(model) in self.models
+
+    def mean_latency(self) -> float:
+        return sum(self.latency.values()) / len(self.latency) if self.latency else 0.0
+
+    def error_rate(self) -> float:
+        return sum(self.errors.values()) / len(self.errors) if self.errors else 0.0
+
+def _default_client(url: str) -> Any:
+    from ollama import Client  # type: ignore
+    from ..settings import settings
+
+    return Client(host=url, timeout=settings.ollama_timeout)
+
+class HostPool:
+    """Balance calls over ``urls`` with health checks and failover.
+
+    ``strategy="least_outstanding"`` sends each call to the host with the
+    fewest requests in flight; ``"latency"`` weighs that queue by the
+    host's smoothed latency for the model (the pool's mean for hosts not
+    yet measured) and by its smoothed rate of model errors, so a host
+    that keeps failing fast does not look like the fastest one. A
+    background thread started with
+    :meth:`start` refreshes inventories and probes hosts every
+    ``check_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        *,
+        strategy: Strategy = "least_outstanding",
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        check_interval: float = 30.0,
+        smoothing: float = 0.2,
+        client_factory: Callable[[str], Any] = _default_client,
+    ) -> None:
+        breaker = lambda: CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self.hosts = [Host(url.rstrip("/"), client_factory, breaker()) for url in dict.fromkeys(urls)]
+        if not self.hosts:
+            raise ValueError("HostPool needs at least one host")
+        self.strategy = strategy
+        self.check_interval = check_interval
+        self.smoothing = smoothing
+        self._turn = 0  # rotates ties so equal hosts share the load
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ------------------------------------------------------------------ #
+    # Selection
+    # ------------------------------------------------------------------ #
+
+    def _cost(self, host: Host, model: str, default_latency: float) -> float:
+        if self.strategy == "latency":
+            latency = host.latency.get(model, default_latency)
+            return latency * (host.outstanding + 1) / max(1.0 - host.errors.get(model, 0.0), 0.05)
+        return host.outstanding
+
+    def _best(self, model: str, exclude: Sequence[str], prefer: str | None) -> Host:
+        """The host to use next for ``model``; lock held."""
+        others = [h for h in self.hosts if h.url not in exclude]
+        up = [h for h in others if h.breaker.ready()]
+        # Nobody listing the model may mean stale inventories; let a host try.
+        candidates = [h for h in up if h.serves(model)] or up or others
+        if not candidates:
+            raise RuntimeError(f"No Ollama host left to try for {model}")
+        for h in candidates:
+            if h.url == prefer:
+                return h
+        measured = [h.latency[model] for h in self.hosts if model in h.latency]
+        mean = sum(measured) / len(measured) if measured else 0.0
+        self._turn += 1
+        n = len(self.hosts)
+        return min(candidates, key=lambda h: (self._cost(h, model, mean), (self.hosts.index(h) - self._turn) % n))
+
+    def choose(self, model: str, exclude: Sequence[str] = (), prefer: str | None = None) -> Host:
+        """Reserve the best host for ``model`` (``prefer`` if it is a candidate); release it with :meth:`release`."""
+        with self._lock:
+            host = self._best(model, exclude, prefer)
+            host.breaker.allow()  # only the chosen host takes a half-open probe slot
+            host.outstanding += 1
+            return host
+
+    def pick(self, model: str) -> str:
+        """URL of the host :meth:`choose` would take now, without reserving it."""
+        with self._lock:
+            return self._best(model, (), None).url
+
+    def release(
+        self, host: Host, model: str, *, latency: float | None = None, error: BaseException | None = None
+    ) -> None:
+        """Return a host taken with :meth:`choose` and record how the call went."""
+        with self._lock:
+            host.outstanding -= 1
+            if error is None and latency is not None:
+                host.calls += 1
+                host.breaker.record_success()
+                previous = host.latency.get(model)
+                host.latency[model] = latency if previous is None else previous + self.smoothing * (latency - previous)
+                self._smooth_errors(host, model, 0.0)
+                if host.models is not None:
+                    host.models.add(_tag(model))
+            elif error is not None and _missing(error):
+                if host.models is not None:
+                    host.models.discard(_tag(model))
+            elif error is not None and _unreachable(error):
+                host.failures += 1
+                host.breaker.record_failure()
+            elif error is not None:
+                self._smooth_errors(host, model, 1.0)
+
+    def _smooth_errors(self, host: Host, model: str, sample: float) -> None:
+        previous = host.errors.get(model, 0.0)
+        host.errors[model] = previous + self.smoothing * (sample - previous)
+
+    @contextmanager
+    def lease(self, model: str, exclude: Sequence[str] = (), prefer: str | None = None) -> Iterator[Host]:
+        """Hold a host for the enclosed call; cancellation only releases it."""
+        host = self.choose(model, exclude, prefer)
+        start = time.perf_counter()
+        try:
+            yield host
+        except Exception as exc:
+            self.release(host, model, error=exc)
+            raise
+        except BaseException:
+            self.release(host, model)
+            raise
+        self.release(host, model, latency=time.perf_counter() - start)
+
+    # ------------------------------------------------------------------ #
+    # Calls
+    # ------------------------------------------------------------------ #
+
+    def _retry(self, model: str, host: Host, exc: Exception, tried: list[str]) -> bool:
+        if not (_unreachable(exc) or _missing(exc)):
+            return False
+        tried.append(host.url)
+        if len(tried) == len(self.hosts):
+            return False
+        print(f"[hosts] ⚠️  {host.url} failed for {model}: {exc}; trying another host")
+        return True
+
+    def call(self, model: str, fn: Callable[[Host], T], *, prefer: str | None = None) -> T:
+        """``fn(host)`` on the chosen host (``prefer`` while it is up), failing over to the others."""
+        tried: list[str] = []
+        while True:
+            host = None
+            try:
+                with self.lease(model, tried, prefer) as host:
+                    return fn(host)
+            except Exception as exc:
+                if host is None or not self._retry(model, host, exc, tried):
+                    raise
+
+    async def acall(self, model: str, fn: Callable[[Host], Awaitable[T]]) -> T:
+        """Async counterpart of :meth:`call`."""
+        tried: list[str] = []
+        while True:
+            host = None
+            try:
+                with self.lease(model, tried) as host:
+                    return await fn(host)
+            except Exception as exc:
+                if host is None or not self._retry(model, host, exc, tried):
+                    raise
+
+    def stream(self, model: str, open_: Callable[[Host], Iterable[T]]) -> Iterator[T]:
+        """Hold one host while ``open_(host)`` is consumed; streams do not fail over."""
+        with self.lease(model) as host:
+            yield from open_(host)
+
+    async def astream(self, model: str, open_: Callable[[Host], AsyncIterator[T]]) -> AsyncIterator[T]:
+        with self.lease(model) as host:
+            async for chunk in open_(host):
+                yield chunk
+
+    # ------------------------------------------------------------------ #
+    # Health checks
+    # ------------------------------------------------------------------ #
+
+    def refresh(self) -> dict[str, list[str] | None]:
+        """Fetch every host's inventory (``/api/tags``); unreachable hosts map to ``None``."""
+        inventories: dict[str, list[str] | None] = {}
+        for host in self.hosts:
+            try:
+                listed = {_tag(m.model) for m in host.client.list().models if m.model}
+            except Exception as exc:
+                with self._lock:
+                    host.failures += 1
+                    host.breaker.record_failure()
+                print(f"[hosts] ⚠️  {host.url} is unreachable: {exc}")
+                inventories[host.url] = None
+                continue
+            with self._lock:
+                host.models = listed
+                host.breaker.record_success()
+            inventories[host.url] = sorted(listed)
+        return inventories
+
+    def start(self) -> None:
+        """Refresh now and then every ``check_interval`` seconds until :meth:`stop`."""
+        if self._thread and self._thread.is_alive():
+            return
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mimi3-hosts", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            self.refresh()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    # ------------------------------------------------------------------ #
+    # Metrics
+    # ------------------------------------------------------------------ #
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """Per-host breaker state, load and inventory size."""
+        with self._lock:
+            return {
+                h.url: {
+                    "up": int(h.breaker.state != OPEN),
+                    "state": h.breaker.state,
+                    "outstanding": h.outstanding,
+                    "calls": h.calls,
+                    "failures": h.failures,
+                    "latency": h.mean_latency(),
+                    "error_rate": h.error_rate(),
+                    "models": None if h.models is None else len(h.models),
+                }
+                for h in self.hosts
+            }
+
+    def render(self) -> str:
+        from .telemetry import render_gauges
+
+        return render_gauges(self.metrics(), _GAUGES, "host")
@@ -0,0 +1,273 @@
+"""Model lifecycle on Ollama: preloading, keep-alive pings, load timing.
+
+Ollama loads a model into memory on its first request and unloads it
+``keep_alive`` after the last one, so the first call to a cold model (often
+the fallback model, exactly when it is needed) pays the full load time.
+:class:`ModelManager` preloads models with empty-prompt requests, re-pings
+pinned models before they expire, tracks which models are resident, and
+splits each response's timings into load time and inference time. Given
+the hosts of a :class:`~mimi3.llm.hosts.HostPool`, it warms every host
+that serves a model, since any of them may get the next call.
+"""
+from __future__ import annotations
+import re
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Sequence
+from ..settings import settings
+
+if TYPE_CHECKING:
+    from .hosts import Host
+
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+DEFAULT_KEEP_ALIVE = 300.0  # Ollama's own default (5m)
+
+def parse_keep_alive(value: str | float | None) -> float | None:
+    """Seconds a model stays loaded for ``value``; ``None`` means forever."""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        value = value.strip()
+        try:
+            seconds = float(value)
+        except ValueError:
+            parts = re.findall(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)", value)
+            if not parts or "".join(n + u for n, u in parts) != value:
+                raise ValueError(f"Invalid keep_alive duration: {value!r}")
+            seconds = sum(float(n) * _UNITS[u] for n, u in parts)
+    return None if seconds < 0 else seconds
+
+class ModelTiming:
+    """Load vs. inference time observed for one model."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.loads = 0  # calls that found the model cold
+        self.load_seconds = 0.0
+        self.last_load_seconds: float | None = None
+        self.inference_seconds = 0.0  # prompt evaluation + generation
+
+    @property
+    def mean_load_seconds(self) -> float | None:
+        return self.load_seconds / self.loads if self.loads else None
+
+    @property
+    def mean_inference_seconds(self) -> float | None:
+        return self.inference_seconds / self.calls if self.calls else None
+
+class ModelManager:
+    """Preload models, keep them resident and time their loads.
+
+    ``ping_interval`` defaults to half the ``keep_alive`` period; pinned
+    models are pinged from a background thread started with :meth:`start`.
+    A response counts as a cold load when its ``load_duration`` is at least
+    ``cold_threshold`` seconds. With ``hosts`` every call goes to each host
+    serving the model instead of to ``client``; a model is resident while
+    any of them has it loaded.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        *,
+        keep_alive: str | float | None = settings.ollama_keep_alive,
+        ping_interval: float | None = None,
+        cold_threshold: float = 0.1,
+        hosts: Sequence[Host] = (),
+    ) -> None:
+        self._client = client
+        self.hosts = list(hosts)
+        self.keep_alive = keep_alive
+        period = parse_keep_alive(keep_alive)
+        self.ping_interval = ping_interval if ping_interval is not None else (period / 2 if period else None)
+        self.cold_threshold = cold_threshold
+        self.pinned: set[str] = set()
+        self._timings: dict[str, ModelTiming] = {}
+        self._expires: dict[str, datetime | None] = {}  # None: loaded until unloaded
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def client(self) -> Any:
+        """The Ollama client, created on first use unless one was given."""
+        if self._client is None:
+            from ollama import Client  # type: ignore
+
+            self._client = Client(host=settings.ollama_host)
+        return self._client
+
+    def _clients(self, model_name: str | None = None) -> list[tuple[str | None, Any]]:
+        """``(host url, client)`` pairs to send to; the url is ``None`` without hosts."""
+        if not self.hosts:
+            return [(None, self.client)]
+        return [(h.url, h.client) for h in self.hosts if model_name is None or h.serves(model_name)]
+
+    # ------------------------------------------------------------------ #
+    # Observation
+    # ------------------------------------------------------------------ #
+
+    def timing(self, model_name: str) -> ModelTiming:
+        with self._lock:
+            return self._timings.setdefault(model_name, ModelTiming())
+
+    def observe(self, model_name: str, response: Mapping[str, Any], *, inference: bool = True) -> float:
+        """Record the timings Ollama reported for one call; returns load seconds.
+
+        ``inference=False`` is used for preload requests, which generate
+        nothing and are not counted as calls.
+        """
+        load = (response.get("load_duration") or 0) / 1e9
+        timing = self.timing(model_name)
+        period = parse_keep_alive(self.keep_alive)
+        with self._lock:
+            if load >= self.cold_threshold:
+                timing.loads += 1
+                timing.load_seconds += load
+                timing.last_load_seconds = load
+            if inference:
+                timing.calls += 1
+                timing.inference_seconds += (
+                    (response.get("prompt_eval_duration") or 0) + (response.get("eval_duration") or 0)
+                ) / 1e9
+            self._expires[model_name] = None if period is None else datetime.now(UTC) + timedelta(seconds=period)
+        return load
+
+    # ------------------------------------------------------------------ #
+    # Residency
+    # ------------------------------------------------------------------ #
+
+    def refresh(self) -> list[str]:
+        """Replace the residency view with the servers' (``/api/ps``)."""
+        expires: dict[str, datetime | None] = {}
+        for host, client in self._clients():
+            try:
+                running = client.ps().models
+            except Exception as exc:
+                if host is None:
+                    raise
+                print(f"[models] ⚠️  Could not list models on {host}: {exc}")
+                continue
+            for m in running:
+                name = m.model or m.name
+                until = m.expires_at if m.expires_at and m.expires_at.year < 9999 else None
+                if name not in expires or (expires[name] is not None and (until is None or until > expires[name])):
+                    expires[name] = until  # the host that keeps it longest
+        with self._lock:
+            self._expires = expires
+        return self.resident()
+
+    def is_resident(self, model_name: str) -> bool:
+        with self._lock:
+            if model_name not in self._expires:
+                return False
+            expires = self._expires[model_name]
+        return expires is None or expires > datetime.now(UTC)
+
+    def resident(self) -> list[str]:
+        with self._lock:
+            names = list(self._expires)
+        return [m for m in names if self.is_resident(m)]
+
+    # ------------------------------------------------------------------ #
+    # Preloading
+    # ------------------------------------------------------------------ #
+
+    def load(self, model_name: str) -> float:
+        """Load ``model_name`` (no-op if resident); returns load seconds.
+
+        With hosts, the longest load of any host. A host that fails is
+        reported and skipped; the error is raised only if none loaded it.
+        """
+        targets = self._clients(model_name)
+        if not targets:
+            raise LookupError(f"No host serves {model_name}")
+        loads, error = [], None
+        for host, client in targets:
+            start = time.perf_counter()
+            try:
+                response = client.generate(model=model_name, prompt="", keep_alive=self.keep_alive)
+            except Exception as exc:
+                if host is None:
+                    raise
+                print(f"[models] ⚠️  Could not load {model_name} on {host}: {exc}")
+                error = exc
+                continue
+            load = self.observe(model_name, response, inference=False)
+            loads.append(load or time.perf_counter() - start)
+        if not loads:
+            raise error
+        return max(loads)
+
+    def preload(self, model_names: Iterable[str], *, pin: bool = True) -> dict[str, float]:
+        """Load models one at a time; returns load seconds of those that loaded.
+
+        Failures are reported and skipped. Pinned models are kept loaded by
+        the background pinger.
+        """
+        loaded = {}
+        for model_name in dict.fromkeys(model_names):
+            try:
+                loaded[model_name] = self.load(model_name)
+            except Exception as exc:
+                print(f"[models] ⚠️  Could not load {model_name}: {exc}")
+                continue
+            if pin:
+                self.pinned.add(model_name)
+        return loaded
+
+    def ping(self) -> None:
+        """Reset the keep-alive timer of every pinned model."""
+        self.preload(sorted(self.pinned), pin=False)
+
+    def start(self) -> None:
+        """Ping pinned models every ``ping_interval`` seconds until :meth:`stop`."""
+        if self.ping_interval is None or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mimi3-keepalive", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ping_interval):
+            self.ping()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "ModelManager":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------ #
+    # Metrics
+    # ------------------------------------------------------------------ #
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """Per-model load and inference timings plus residency."""
+        with self._lock:
+            names = sorted(set(self._timings) | set(self._expires))
+        out = {}
+        for name in names:
+            t = self.timing(name)
+            out[name] = {
+                "resident": self.is_resident(name),
+                "pinned": name in self.pinned,
+                "calls": t.calls,
+                "loads": t.loads,
+                "load_seconds": t.load_seconds,
+                "last_load_seconds": t.last_load_seconds,
+                "mean_load_seconds": t.mean_load_seconds,
+                "inference_seconds": t.inference_seconds,
+                "mean_inference_seconds": t.mean_inference_seconds,
+            }
+        return out
@@ -0,0 +1,71 @@
+"""Pooled async Ollama clients with bounded per-host concurrency."""
+from __future__ import annotations
+import asyncio
+import weakref
+from typing import TYPE_CHECKING, Any, AsyncIterator
+
+if TYPE_CHECKING:
+    from ollama import AsyncClient  # type: ignore
+
+class AsyncClientPool:
+    """Hand out one ``ollama.AsyncClient`` per host and cap in-flight calls.
+
+    httpx async clients are bound to the event loop that created them, so
+    clients and semaphores are kept per running loop; they are dropped
+    together with the loop.
+    """
+
+    def __init__(self, *, default_host: str, max_concurrency: int = 4, timeout: float | None = None) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        self.default_host = default_host
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._by_loop: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, tuple[AsyncClient, asyncio.Semaphore]]
+        ] = weakref.WeakKeyDictionary()
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+
+    def _slot(self, host: str) -> tuple[AsyncClient, asyncio.Semaphore]:
+        slots = self._by_loop.setdefault(asyncio.get_running_loop(), {})
+        if host not in slots:
+            import httpx
+            from ollama import AsyncClient  # type: ignore
+
+            client = AsyncClient(
+                host=host,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency),
+            )
+            slots[host] = (client, asyncio.Semaphore(self.max_concurrency))
+        return slots[host]
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+
+    def client(self, host: str | None = None) -> AsyncClient:
+        """Return the pooled client for ``host`` on the running loop."""
+        return self._slot(host or self.default_host)[0]
+
+    async def generate(self, *, model: str, prompt: str, host: str | None = None, **kwargs: Any) -> Any:
+        """Non-streaming ``generate`` that waits for a free slot on ``host``."""
+        client, sem = self._slot(host or self.default_host)
+        async with sem:
+            return await client.generate(model=model, prompt=prompt, stream=False, **kwargs)
+
+    async def stream(self, *, model: str, prompt: str, host: str | None = None, **kwargs: Any) -> AsyncIterator[Any]:
+        """Streaming ``generate``; the slot is held until the stream ends."""
+        client, sem = self._slot(host or self.default_host)
+        async with sem:
+            async for chunk in await client.generate(model=model, prompt=prompt, stream=True, **kwargs):
+                yield chunk
+
+    async def aclose(self) -> None:
+        """Close the clients created on the running loop."""
+        slots = self._by_loop.pop(asyncio.get_running_loop(), {})
+        for client, _ in slots.values():
+            await client.close()
@@ -0,0 +1,56 @@
+"""Prompt building for runtime agents.
+
+Each agent renders its persona (role, goal, backstory) into a system
+prompt once, and sends it unchanged as Ollama's ``system`` field on every
+call. A byte-identical prefix lets the server reuse the KV cache it
+already holds for that model instead of re-evaluating the prefix.
+
+Task prompts are memoised per ``(task, inputs)`` so retries, fallbacks
+and repeated runs of the same task do not call ``compile_prompt`` again.
+Tasks are treated as immutable while cached.
+"""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from string import Template
+from typing import Any, Hashable
+
+SYSTEM_TEMPLATE = Template("You are a $role.\nYour goal: $goal\n$backstory")
+
+class PromptBuilder:
+    """Precompiled system prompt plus an LRU of compiled task prompts."""
+
+    def __init__(self, *, role: str, goal: str, backstory: str = "", maxsize: int = 256) -> None:
+        self.system = SYSTEM_TEMPLATE.substitute(role=role, goal=goal, backstory=backstory or "").strip()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # key -> (task, prompt); holding the task keeps its id() from being reused.
+        self._cache: OrderedDict[Hashable, tuple[Any, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(self, task: Any, *args: Any, **kwargs: Any) -> str:
+        """``task.compile_prompt(*args, **kwargs)``, memoised."""
+        try:
+            key = (id(task), args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:  # unhashable inputs: compile every time
+            return task.compile_prompt(*args, **kwargs)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] is task:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        prompt = task.compile_prompt(*args, **kwargs)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = (task, prompt)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return prompt
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,139 @@
+"""Single-flight: coalesce concurrent identical calls into one execution.
+
+The first caller for a key (the leader) runs the call; callers arriving
+while it is in flight wait for its outcome instead of repeating it, and
+receive the same result or exception. Threads and asyncio tasks share one
+registry, so a coroutine can wait on a call led by a thread and vice
+versa. Nothing is kept once a call finishes; this is not a cache.
+"""
+from __future__ import annotations
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+def _consume(fut: asyncio.Future) -> None:
+    # Outcome of a shielded wait whose waiter was cancelled; nobody reads it.
+    if not fut.cancelled():
+        fut.exception()
+
+class _Flight:
+    __slots__ = ("future", "loop", "task", "waiters")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop | None) -> None:
+        self.future: Future = Future()
+        self.loop = loop  # set when an asyncio task leads
+        self.task: asyncio.Task | None = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Registry of in-flight calls keyed by request identity.
+
+    ``leaders`` counts calls actually executed, ``coalesced`` the calls
+    that shared another's result.
+    """
+
+    def __init__(self) -> None:
+        self.leaders = 0
+        self.coalesced = 0
+        self._flights: dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def _land(self, key: Hashable, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _leave(self, flight: _Flight) -> None:
+        """A waiter gave up; stop an async leader nobody waits for any more."""
+        with self._lock:
+            flight.waiters -= 1
+            orphaned = flight.waiters == 0 and flight.task is not None
+        if orphaned and not flight.task.done():
+            flight.loop.call_soon_threadsafe(flight.task.cancel)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> tuple[T, bool]:
+        """``fn()``, or the result of an identical call in flight; returns ``(result, led)``."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight(None)
+                self.leaders += 1
+                lead = True
+            elif flight.loop is not None and flight.loop is _running_loop():
+                # Blocking here would stall the loop the leader runs on.
+                self.leaders += 1
+                flight, lead = None, True
+            else:
+                self.coalesced += 1
+                flight.waiters += 1
+                lead = False
+        if flight is None:
+            return fn(), True
+        if not lead:
+            try:
+                return flight.future.result(), False
+            finally:
+                self._leave(flight)
+        try:
+            result = fn()
+        except BaseException as exc:
+            self._land(key, flight)
+            flight.future.set_exception(exc)
+            raise
+        self._land(key, flight)
+        flight.future.set_result(result)
+        return result, True
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Asyncio variant of :meth:`do`.
+
+        The leading call runs as its own task, so cancelling one waiter
+        does not cancel it for the others; it is cancelled once every
+        waiter has gone.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._flights.get(key)
+            lead = flight is None
+            if lead:
+                flight = self._flights[key] = _Flight(loop)
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+        if lead:
+            flight.task = loop.create_task(self._lead(key, flight, fn))
+        outcome = asyncio.wrap_future(flight.future)
+        try:
+            return await asyncio.shield(outcome), lead
+        except asyncio.CancelledError:
+            outcome.add_done_callback(_consume)
+            raise
+        finally:
+            self._leave(flight)
+
+    async def _lead(self, key: Hashable, flight: _Flight, fn: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._land(key, flight)
+            flight.future.cancel()
+            raise
+        except BaseException as exc:  # handed to the waiters, not raised from the task
+            self._land(key, flight)
+            flight.future.set_exception(exc)
+            return
+        self._land(key, flight)
+        flight.future.set_result(result)
@@ -0,0 +1,160 @@
+"""Token streaming helpers: per-call timing and output sinks."""
+from __future__ import annotations
+import sys
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterator, Mapping, Protocol, TextIO
+
+if TYPE_CHECKING:
+    from ..tools.memory import MemoryTool
+
+# Usage fields Ollama reports on the final chunk.
+USAGE = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration", "prompt_eval_count", "eval_count")
+
+class StreamStats:
+    """Timing of a single streamed completion."""
+
+    def __init__(self) -> None:
+        self.model: str | None = None
+        self.started: float | None = None
+        self.first_token_at: float | None = None
+        self.finished_at: float | None = None
+        self.tokens = 0
+        self.context: list[int] | None = None  # Ollama conversation state from the final chunk
+        self.usage: dict[str, int] = {}  # durations (ns) and token counts from the final chunk
+
+    def start(self, model: str) -> None:
+        self.model = model
+        self.started = time.perf_counter()
+        self.first_token_at = self.finished_at = None
+        self.tokens = 0
+        self.context = None
+        self.usage = {}
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        """Seconds from request to first non-empty chunk."""
+        if self.started is None or self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def tokens_per_sec(self) -> float | None:
+        """Generation rate after the first token."""
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        return self.tokens / elapsed if elapsed > 0 else None
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return f"<StreamStats {self.model} ttft={self.time_to_first_token} tok/s={self.tokens_per_sec}>"
+
+def _observe(chunk: Mapping[str, Any], stats: StreamStats) -> str:
+    text = chunk.get("response") or ""
+    if text:
+        if stats.first_token_at is None:
+            stats.first_token_at = time.perf_counter()
+        stats.tokens += 1
+    if chunk.get("done"):
+        stats.finished_at = time.perf_counter()
+        # Ollama reports the authoritative token count on the final chunk.
+        if chunk.get("eval_count"):
+            stats.tokens = chunk["eval_count"]
+        stats.context = chunk.get("context") or None
+        stats.usage = {k: chunk.get(k) for k in USAGE if chunk.get(k)}
+    return text
+
+def measure(chunks: Iterator[Mapping[str, Any]], stats: StreamStats) -> Iterator[str]:
+    """Yield the text of raw Ollama stream chunks while recording ``stats``."""
+    for chunk in chunks:
+        text = _observe(chunk, stats)
+        if text:
+            yield text
+    if stats.finished_at is None:
+        stats.finished_at = time.perf_counter()
+
+async def ameasure(chunks: AsyncIterator[Mapping[str, Any]], stats: StreamStats) -> AsyncIterator[str]:
+    """Async counterpart of :func:`measure`."""
+    async for chunk in chunks:
+        text = _observe(chunk, stats)
+        if text:
+            yield text
+    if stats.finished_at is None:
+        stats.finished_at = time.perf_counter()
+
+class TokenStream:
+    """Iterable of completion chunks; ``stats`` is filled in as it is consumed."""
+
+    def __init__(self, chunks: Iterator[str], stats: StreamStats) -> None:
+        self._chunks = chunks
+        self.stats = stats
+
+    def __iter__(self) -> Iterator[str]:
+        return self._chunks
+
+class AsyncTokenStream:
+    """Async iterable of completion chunks; ``stats`` is filled in as it is consumed."""
+
+    def __init__(self, chunks: AsyncIterator[str], stats: StreamStats) -> None:
+        self._chunks = chunks
+        self.stats = stats
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._chunks
+
+# ---------- Sinks --------------------------------------------------------
+
+class Sink(Protocol):
+    def write(self, chunk: str) -> None: ...
+    def close(self) -> None: ...
+
+class StdoutSink:
+    """Echo chunks to a text stream (stdout by default) as they arrive."""
+
+    def __init__(self, stream: TextIO | None = None) -> None:
+        self.stream = stream or sys.stdout
+
+    def write(self, chunk: str) -> None:
+        self.stream.write(chunk)
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.write("\n")
+        self.stream.flush()
+
+class FileSink:
+    """Append chunks to a file."""
+
+    def __init__(self, path: str) -> None:
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def write(self, chunk: str) -> None:
+        self._fh.write(chunk)
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+
+class MemorySink:
+    """Persist streamed output to agent memory, one entry per completed line.
+
+    Lines go through a :class:`~mimi3.tools.memory.BufferedMemoryWriter`
+    so a long completion costs a few INSERTs rather than one per token.
+    """
+
+    def __init__(self, tool: MemoryTool, *, agent_id: int, task_id: int, max_size: int = 50) -> None:
+        self.agent_id = agent_id
+        self.task_id = task_id
+        self._writer = tool.buffered(max_size=max_size)
+        self._partial = ""
+
+    def write(self, chunk: str) -> None:
+        *lines, self._partial = (self._partial + chunk).split("\n")
+        for line in lines:
+            if line.strip():
+                self._writer.save(agent_id=self.agent_id, task_id=self.task_id, content=line)
+
+    def close(self) -> None:
+        if self._partial.strip():
+            self._writer.save(agent_id=self.agent_id, task_id=self.task_id, content=self._partial)
+        self._partial = ""
+        self._writer.flush()
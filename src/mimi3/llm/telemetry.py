@@ -0,0 +1,284 @@
+"""Per-call LLM telemetry: which agents and models spend the time and tokens.
+
+Every model call made by a :class:`~mimi3.agents.base.MultiModelAgent` is
+recorded as a :class:`CallRecord` carrying Ollama's latency breakdown
+(load, prompt evaluation, generation) and token counts. :class:`Telemetry`
+keeps running totals per ``(agent, model)`` for the Prometheus endpoint
+and writes records to ``llm_calls`` in batches; :func:`summarize`
+aggregates that table for reports.
+"""
+from __future__ import annotations
+import threading
+from datetime import datetime, timedelta, UTC
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterable, Literal, Mapping, NamedTuple, Sequence
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.orm import Session
+from .. import models
+
+OK, ERROR, CACHED, COALESCED = "ok", "error", "cached", "coalesced"
+GroupBy = Literal["agent", "model", "task"]
+
+class CallRecord(NamedTuple):
+    model: str
+    agent: str
+    task_id: int | None
+    status: str
+    attempt: int  # position in the fallback chain, 1 = first choice
+    latency: float  # seconds, wall clock as seen by the agent
+    load: float | None = None
+    prompt_eval: float | None = None
+    eval: float | None = None
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    error: str | None = None
+    timestamp: datetime | None = None
+
+    def row(self) -> dict[str, Any]:
+        ms = lambda s: None if s is None else s * 1000
+        return {
+            "timestamp": self.timestamp or datetime.now(UTC),
+            "agent": self.agent,
+            "task_id": self.task_id,
+            "model": self.model,
+            "status": self.status,
+            "attempt": self.attempt,
+            "latency_ms": self.latency * 1000,
+            "load_ms": ms(self.load),
+            "prompt_eval_ms": ms(self.prompt_eval),
+            "eval_ms": ms(self.eval),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "error": self.error,
+        }
+
+def call_record(
+    model: str,
+    *,
+    agent: str,
+    task_id: int | None,
+    attempt: int,
+    latency: float,
+    response: Mapping[str, Any] | None = None,
+    error: BaseException | None = None,
+    cached: bool = False,
+    coalesced: bool = False,
+) -> CallRecord:
+    """Build a record from an Ollama response (or final stream chunk).
+
+    ``coalesced`` calls waited for an identical request in flight; the
+    leading request's record carries the timings and tokens.
+    """
+    r = response or {}
+    seconds = lambda key: None if r.get(key) is None else r.get(key) / 1e9
+    status = ERROR if error is not None else CACHED if cached else COALESCED if coalesced else OK
+    return CallRecord(
+        model,
+        agent,
+        task_id,
+        status,
+        attempt,
+        latency,
+        seconds("load_duration"),
+        seconds("prompt_eval_duration"),
+        seconds("eval_duration"),
+        r.get("prompt_eval_count"),
+        r.get("eval_count"),
+        None if error is None else str(error)[:1000],
+        datetime.now(UTC),
+    )
+
+class CallSummary(NamedTuple):
+    group: tuple  # values of the grouping columns
+    calls: int
+    errors: int
+    cached: int
+    coalesced: int  # calls that shared an identical in-flight request
+    fallbacks: int  # calls that were not the first choice
+    latency: float  # seconds
+    load: float
+    inference: float  # prompt evaluation + generation
+    prompt_tokens: int
+    completion_tokens: int
+
+# ---------- Collector ----------------------------------------------------
+
+class Telemetry:
+    """Thread-safe running totals plus batched writes to ``llm_calls``.
+
+    Once ``flush_every`` records have accumulated they are inserted by a
+    background thread, so the call that filled the batch (possibly on an
+    event loop) does not wait for the database. :meth:`flush` writes the
+    rest synchronously. With ``persist=False`` only the totals are kept.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] | None = None,
+        *,
+        persist: bool = True,
+        flush_every: int = 50,
+    ) -> None:
+        self.session_factory = session_factory
+        self.persist = persist
+        self.flush_every = flush_every
+        self._totals: dict[tuple[str, str], list] = {}
+        self._pending: list[CallRecord] = []
+        self._lock = threading.Lock()
+        self._flusher: threading.Thread | None = None
+        self.collectors: list[Callable[[], str]] = []  # extra exposition text appended by render()
+
+    def record(self, rec: CallRecord) -> None:
+        with self._lock:
+            t = self._totals.setdefault((rec.agent, rec.model), [0, 0, 0, 0, 0, 0.0, 0.0, 0.0, 0, 0])
+            t[0] += 1
+            t[1] += rec.status == ERROR
+            t[2] += rec.status == CACHED
+            t[3] += rec.status == COALESCED
+            t[4] += rec.attempt > 1
+            t[5] += rec.latency
+            t[6] += rec.load or 0.0
+            t[7] += (rec.prompt_eval or 0.0) + (rec.eval or 0.0)
+            t[8] += rec.prompt_tokens or 0
+            t[9] += rec.completion_tokens or 0
+            if self.persist:
+                self._pending.append(rec)
+            if len(self._pending) >= self.flush_every and not (self._flusher and self._flusher.is_alive()):
+                self._flusher = threading.Thread(target=self._write, name="mimi3-telemetry", daemon=True)
+                self._flusher.start()
+
+    def flush(self) -> int:
+        """Insert pending records once any background write is done; returns how many were written."""
+        flusher = self._flusher
+        if flusher is not None:
+            flusher.join()
+        return self._write()
+
+    def _write(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        factory = self.session_factory
+        if factory is None:
+            from ..database import SessionLocal as factory
+        try:
+            with factory() as db:
+                db.execute(insert(models.LLMCall), [rec.row() for rec in batch])
+                db.commit()
+        except Exception as exc:
+            print(f"[telemetry] ⚠️  Dropped {len(batch)} call records: {exc}")
+            return 0
+        return len(batch)
+
+    def summaries(self) -> list[CallSummary]:
+        """Totals per ``(agent, model)`` since this process started."""
+        with self._lock:
+            return [CallSummary(key, *t) for key, t in sorted(self._totals.items())]
+
+    def render(self) -> str:
+        text = render_prometheus(self.summaries(), ("agent", "model"))
+        return text + "".join(collect() for collect in self.collectors)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+            self._pending.clear()
+
+# ---------- Reports ------------------------------------------------------
+
+def summarize(
+    db: Session,
+    *,
+    by: Sequence[GroupBy] = ("model",),
+    project_id: int | None = None,
+    since: timedelta | None = None,
+) -> list[CallSummary]:
+    """Aggregate ``llm_calls`` per ``by`` columns, most wall time first."""
+    c = models.LLMCall
+    columns = {"agent": c.agent, "model": c.model, "task": c.task_id}
+    if unknown := [b for b in by if b not in columns]:
+        raise ValueError(f"cannot group by {', '.join(unknown)}; expected one of {', '.join(columns)}")
+    keys = [columns[b] for b in by]
+    latency = func.sum(c.latency_ms) / 1000
+    stmt = select(
+        *keys,
+        func.count(),
+        func.sum(case((c.status == ERROR, 1), else_=0)),
+        func.sum(case((c.status == CACHED, 1), else_=0)),
+        func.sum(case((c.status == COALESCED, 1), else_=0)),
+        func.sum(case((c.attempt > 1, 1), else_=0)),
+        latency,
+        func.coalesce(func.sum(c.load_ms), 0) / 1000,
+        (func.coalesce(func.sum(c.prompt_eval_ms), 0) + func.coalesce(func.sum(c.eval_ms), 0)) / 1000,
+        func.coalesce(func.sum(c.prompt_tokens), 0),
+        func.coalesce(func.sum(c.completion_tokens), 0),
+    ).group_by(*keys)
+    if project_id is not None:
+        stmt = stmt.join(models.Task, models.Task.id == c.task_id).where(models.Task.project_id == project_id)
+    if since is not None:
+        stmt = stmt.where(c.timestamp >= datetime.now(UTC) - since)
+    rows = db.execute(stmt.order_by(latency.desc())).all()
+    n = len(keys)
+    return [CallSummary(tuple(r[:n]), *r[n:]) for r in rows]
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+_METRICS = [
+    ("calls", "mimi3_llm_calls_total", "Model calls."),
+    ("errors", "mimi3_llm_errors_total", "Model calls that failed."),
+    ("cached", "mimi3_llm_cached_total", "Calls answered from the completion cache."),
+    ("coalesced", "mimi3_llm_coalesced_total", "Calls that shared an identical request already in flight."),
+    ("fallbacks", "mimi3_llm_fallbacks_total", "Calls made to a model other than the first choice."),
+    ("latency", "mimi3_llm_latency_seconds_total", "Wall time spent in model calls."),
+    ("load", "mimi3_llm_load_seconds_total", "Time Ollama spent loading models."),
+    ("inference", "mimi3_llm_inference_seconds_total", "Time spent evaluating prompts and generating."),
+    ("prompt_tokens", "mimi3_llm_prompt_tokens_total", "Prompt tokens evaluated."),
+    ("completion_tokens", "mimi3_llm_completion_tokens_total", "Tokens generated."),
+]
+
+def render_prometheus(summaries: Iterable[CallSummary], labels: Sequence[str]) -> str:
+    """Prometheus text exposition of ``summaries``, labelled by group."""
+    summaries = list(summaries)
+    lines = []
+    for field, name, help_ in _METRICS:
+        lines += [f"# HELP {name} {help_}", f"# TYPE {name} counter"]
+        for s in summaries:
+            tags = ",".join(f'{label}="{_escape(v)}"' for label, v in zip(labels, s.group))
+            lines.append(f"{name}{{{tags}}} {getattr(s, field)}")
+    return "\n".join(lines) + "\n"
+
+def render_gauges(
+    snapshot: Mapping[str, Mapping[str, Any]], gauges: Sequence[tuple[str, str, str]], label: str
+) -> str:
+    """Prometheus gauges from ``{label value: {field: value}}``; ``gauges`` are (field, name, help)."""
+    lines = []
+    for field, name, help_ in gauges:
+        lines += [f"# HELP {name} {help_}", f"# TYPE {name} gauge"]
+        for key, values in snapshot.items():
+            lines.append(f'{name}{{{label}="{_escape(key)}"}} {values[field]}')
+    return "\n".join(lines) + "\n"
+
+def serve_metrics(render: Callable[[], str], *, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve ``render()`` at ``/metrics`` from a daemon thread; call ``shutdown()`` to stop."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mimi3-metrics", daemon=True).start()
+    return server
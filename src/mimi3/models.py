@@ -9,6 +9,9 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Table,
+    Index,
+    Float,
+    LargeBinary,
 )
 from sqlalchemy.orm import relationship, declarative_base
 
@@ -30,6 +33,14 @@ task_agent_association = Table(
     Column("agent_id", ForeignKey("agents.id"), primary_key=True),
 )
 
+# ``task_id`` cannot start before ``depends_on_id`` has completed.
+task_dependency_association = Table(
+    "task_dependency_association",
+    Base.metadata,
+    Column("task_id", ForeignKey("tasks.id"), primary_key=True),
+    Column("depends_on_id", ForeignKey("tasks.id"), primary_key=True, index=True),
+)
+
 agent_tool_association = Table(
     "agent_tool_association",
     Base.metadata,
@@ -48,6 +59,12 @@ class Model(Base):
     description = Column(Text)
 
     agents = relationship("Agent", secondary=agent_model_association, back_populates="models")
+    health = relationship("ModelHealthRecord", back_populates="model", uselist=False, cascade="all, delete-orphan")
+
+    @property
+    def tag(self) -> str:
+        """Ollama model reference, e.g. ``llama3:8b``."""
+        return f"{self.name}:{self.version}" if self.version else self.name
 
     def __repr__(self) -> str:  # pragma: no cover
         v = f":{self.version}" if self.version else ""
@@ -117,11 +134,32 @@ class Task(Base):
     status = Column(String(50), default="pending")
     result = Column(Text)
     created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.UTC))
+    # Worker leases (see ``mimi3.worker``); unset for tasks run in-process.
+    lease_owner = Column(String(255))
+    lease_expires_at = Column(DateTime)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
 
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     project = relationship("Project", back_populates="tasks")
 
     agents = relationship("Agent", secondary=task_agent_association, back_populates="tasks")
+    dependencies = relationship(
+        "Task",
+        secondary=task_dependency_association,
+        primaryjoin=lambda: Task.id == task_dependency_association.c.task_id,
+        secondaryjoin=lambda: Task.id == task_dependency_association.c.depends_on_id,
+        back_populates="dependents",
+    )
+    dependents = relationship(
+        "Task",
+        secondary=task_dependency_association,
+        primaryjoin=lambda: Task.id == task_dependency_association.c.depends_on_id,
+        secondaryjoin=lambda: Task.id == task_dependency_association.c.task_id,
+        back_populates="dependencies",
+    )
+
+    # Serves worker claims (by status) and the expired-lease sweep.
+    __table_args__ = (Index("ix_tasks_status_lease", status, lease_expires_at),)
 
     def __repr__(self) -> str:  # pragma: no cover
         return f"<Task {self.title} ({self.status})>"
@@ -135,3 +173,95 @@ class Memory(Base):
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
     timestamp = Column(DateTime, default=lambda: datetime.datetime.now(datetime.UTC))
     content = Column(Text, nullable=False)
+    kind = Column(String(20), nullable=False, default="message", server_default="message")  # or "summary"
+
+    # Serves recall() and keyset pagination; ``id`` breaks timestamp ties.
+    __table_args__ = (
+        Index("ix_memories_agent_task_ts", agent_id, task_id, timestamp.desc(), id.desc()),
+    )
+
+class MemoryEmbedding(Base):
+    """Embedding of a memory entry (see ``mimi3.llm.embeddings``).
+
+    ``vector`` holds ``dim`` little-endian float32 values, L2-normalised.
+    ``id`` grows with every write so indexes can load new rows
+    incrementally.
+    """
+    __tablename__ = "memory_embeddings"
+
+    id = Column(Integer, primary_key=True)
+    memory_id = Column(Integer, ForeignKey("memories.id", ondelete="CASCADE"), nullable=False, unique=True)
+    model = Column(String(255), nullable=False)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)
+
+class MemoryArchive(Base):
+    """Memory rows rolled up into a summary (see ``mimi3.tools.compaction``).
+
+    Kept out of ``memories`` so recall only ever scans live history.
+    """
+    __tablename__ = "memory_archive"
+
+    id = Column(Integer, primary_key=True)
+    memory_id = Column(Integer, nullable=False)  # id the row had in ``memories``
+    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    timestamp = Column(DateTime)
+    content = Column(Text, nullable=False)
+    kind = Column(String(20), nullable=False, default="message")
+    summary_id = Column(Integer)  # the ``memories`` row that replaced it
+    archived_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (Index("ix_memory_archive_agent_task_ts", agent_id, task_id, timestamp),)
+
+class CompletionCacheEntry(Base):
+    """Persistent tier of the LLM completion cache (see ``mimi3.llm.cache``)."""
+    __tablename__ = "completion_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of (model, prompt, options)
+    model = Column(String(255), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+class ModelHealthRecord(Base):
+    """Last persisted routing stats for a model (see ``mimi3.llm.health``)."""
+    __tablename__ = "model_health"
+
+    model_id = Column(Integer, ForeignKey("models.id"), primary_key=True)
+    p50_ms = Column(Float)
+    p95_ms = Column(Float)
+    error_rate = Column(Float, default=0.0)
+    samples = Column(Integer, default=0)
+    breaker_state = Column(String(20), default="closed")
+    updated_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.UTC))
+
+    model = relationship("Model", back_populates="health")
+
+class LLMCall(Base):
+    """One model call made by an agent (see ``mimi3.llm.telemetry``).
+
+    Durations are Ollama's own breakdown of ``latency_ms``; ``attempt`` is
+    the model's position in the fallback chain (1 = first choice).
+    """
+    __tablename__ = "llm_calls"
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, nullable=False)
+    agent = Column(String(255), nullable=False, default="")
+    task_id = Column(Integer)  # not a foreign key: the log outlives deleted tasks
+    model = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False)  # ok, error, cached or coalesced
+    attempt = Column(Integer, nullable=False, default=1)
+    latency_ms = Column(Float, nullable=False)
+    load_ms = Column(Float)
+    prompt_eval_ms = Column(Float)
+    eval_ms = Column(Float)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    error = Column(Text)
+
+    __table_args__ = (
+        Index("ix_llm_calls_timestamp", timestamp),
+        Index("ix_llm_calls_model_agent", model, agent),
+        Index("ix_llm_calls_task", task_id),
+    )
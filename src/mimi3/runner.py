@@ -0,0 +1,370 @@
+"""Native task runner: execute a project's pending tasks concurrently.
+
+Tasks are read from the ``tasks`` table, claimed with a conditional
+``UPDATE`` (``pending`` -> ``running``) so no task runs twice, executed by
+the runtime agents built for their assigned DB agents, and finished with a
+second conditional ``UPDATE`` that writes ``status`` and ``result``
+together. Dependencies are honoured via :mod:`mimi3.scheduler`: a task is
+submitted as soon as its inputs complete, critical path first, and the
+results of its inputs are included in its prompt.
+"""
+from __future__ import annotations
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from multiprocessing.util import Finalize
+from typing import TYPE_CHECKING, Any, Callable, Literal, NamedTuple, get_args
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from . import models
+from .scheduler import ReadyQueue, load_plan
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+PENDING, RUNNING, COMPLETED, FAILED = "pending", "running", "completed", "failed"
+
+Mode = Literal["thread", "process", "async"]
+AgentFactory = Callable[[models.Agent], Any]
+Estimate = Callable[[models.Task], float]
+
+class TaskOutcome(NamedTuple):
+    task_id: int
+    status: str
+    result: str | None
+    elapsed: float
+
+class PromptTask:
+    """Minimal task object accepted by ``MultiModelAgent.run``."""
+
+    def __init__(self, prompt: str, task_id: int | None = None) -> None:
+        self.prompt = prompt
+        self.task_id = task_id  # attributes the agent's model calls in telemetry
+
+    def compile_prompt(self, *args: Any, **kwargs: Any) -> str:
+        return self.prompt
+
+def build_prompt(task: models.Task) -> str:
+    parts = [f"Project goal: {task.project.goal}", f"Task: {task.title}"]
+    if task.description:
+        parts.append(task.description)
+    for dep in task.dependencies:
+        if dep.result:
+            parts.append(f"Input from '{dep.title}':\n{dep.result}")
+    return "\n".join(parts)
+
+def runtime_agent(agent: models.Agent):
+    """Default factory: a ``MultiModelAgent`` configured from a DB agent."""
+    from .agents.base import MultiModelAgent
+
+    return MultiModelAgent(
+        name=agent.name,
+        role=agent.role.name,
+        goal=agent.description or agent.role.description or agent.role.name,
+        backstory=agent.description or "",
+        models=[m.tag for m in agent.models] or None,
+    )
+
+# ---------- Claim / finish ---------------------------------------------
+
+def _claim_stmt(task_id: int):
+    return update(models.Task).where(models.Task.id == task_id, models.Task.status == PENDING).values(status=RUNNING)
+
+def _finish_stmt(task_id: int, status: str, result: str | None, owner: str | None = None):
+    stmt = update(models.Task).where(models.Task.id == task_id, models.Task.status == RUNNING)
+    if owner is not None:  # a requeued lease belongs to someone else now
+        stmt = stmt.where(models.Task.lease_owner == owner)
+    return stmt.values(status=status, result=result, lease_owner=None, lease_expires_at=None)
+
+def _task_stmt(task_id: int):
+    return (
+        select(models.Task)
+        .where(models.Task.id == task_id)
+        .options(
+            joinedload(models.Task.project),
+            selectinload(models.Task.dependencies),
+            selectinload(models.Task.agents).options(joinedload(models.Agent.role), selectinload(models.Agent.models)),
+        )
+    )
+
+def _block_stmt(task_id: int, upstream: int):
+    return (
+        update(models.Task)
+        .where(models.Task.id == task_id, models.Task.status == PENDING)
+        .values(status=FAILED, result=_blocked_result(upstream))
+    )
+
+def _blocked_result(upstream: int) -> str:
+    return f"Not run: dependency {upstream} failed"
+
+def _pending_stmt(project_id: int):
+    return (
+        select(models.Task.id)
+        .where(models.Task.project_id == project_id, models.Task.status == PENDING)
+        .order_by(models.Task.id)
+    )
+
+def claim_task(db: Session, task_id: int) -> bool:
+    """Atomically move a task from ``pending`` to ``running``."""
+    result = db.execute(_claim_stmt(task_id))
+    db.commit()
+    return result.rowcount == 1
+
+def finish_task(db: Session, task_id: int, *, status: str, result: str | None, owner: str | None = None) -> bool:
+    """Write the final status and result of a running task in one statement.
+
+    With ``owner`` the write only happens while that worker holds the
+    lease. Returns whether the row was updated.
+    """
+    updated = db.execute(_finish_stmt(task_id, status, result, owner))
+    db.commit()
+    return updated.rowcount == 1
+
+def _run_agents(task: models.Task, agent_factory: AgentFactory) -> tuple[str, str]:
+    """Try the task's agents in order; returns ``(status, result)``."""
+    if not task.agents:
+        return FAILED, f"Task {task.id} has no assigned agents"
+    prompt_task = PromptTask(build_prompt(task), task.id)
+    errors = []
+    for agent in task.agents:
+        try:
+            return COMPLETED, agent_factory(agent).run(prompt_task)
+        except Exception as exc:
+            errors.append(f"{agent.name}: {exc}")
+    return FAILED, "\n".join(errors)
+
+async def _arun_agents(task: models.Task, agent_factory: AgentFactory) -> tuple[str, str]:
+    if not task.agents:
+        return FAILED, f"Task {task.id} has no assigned agents"
+    prompt_task = PromptTask(build_prompt(task), task.id)
+    errors = []
+    for agent in task.agents:
+        try:
+            return COMPLETED, await agent_factory(agent).arun(prompt_task)
+        except Exception as exc:
+            errors.append(f"{agent.name}: {exc}")
+    return FAILED, "\n".join(errors)
+
+def execute_task(
+    task_id: int,
+    *,
+    agent_factory: AgentFactory = runtime_agent,
+    session_factory: Callable[[], Session] | None = None,
+) -> TaskOutcome:
+    """Claim, run and record a single task.
+
+    Assigned agents are tried in order until one succeeds. Returns a
+    ``skipped`` outcome if the task was no longer pending.
+    """
+    if session_factory is None:
+        from .database import SessionLocal
+        session_factory = SessionLocal
+    with session_factory() as db:
+        if not claim_task(db, task_id):
+            return TaskOutcome(task_id, "skipped", None, 0.0)
+    return run_claimed_task(task_id, agent_factory=agent_factory, session_factory=session_factory)
+
+def run_claimed_task(
+    task_id: int,
+    *,
+    agent_factory: AgentFactory,
+    session_factory: Callable[[], Session],
+    owner: str | None = None,
+) -> TaskOutcome:
+    """Run a task that is already ``running`` and record its outcome.
+
+    Returns a ``skipped`` outcome if ``owner`` lost the lease meanwhile.
+    A task that cannot be loaded, or whose result cannot be written, is
+    failed with the error instead of being left ``running``.
+    """
+    start = time.perf_counter()
+    try:
+        # The connection is released while the agents run; LLM calls can
+        # take far longer than a pool should stay checked out.
+        with session_factory() as db:
+            task = db.scalars(_task_stmt(task_id)).one()
+        status, result = _run_agents(task, agent_factory)
+    except Exception as exc:
+        status, result = FAILED, str(exc)
+    try:
+        with session_factory() as db:
+            finished = finish_task(db, task_id, status=status, result=result, owner=owner)
+    except Exception as exc:
+        status, result = FAILED, f"Could not record the result: {exc}"
+        with session_factory() as db:
+            finished = finish_task(db, task_id, status=status, result=result, owner=owner)
+    if not finished:
+        status = "skipped"
+    return TaskOutcome(task_id, status, result, time.perf_counter() - start)
+
+def _flush_telemetry() -> None:
+    base = sys.modules.get("mimi3.agents.base")
+    if base is not None:
+        base._telemetry.flush()
+
+def _process_worker_init() -> None:
+    # Forked children must not reuse the parent's pooled connections.
+    from .database import reset_engine
+    reset_engine(close=False)
+    # ... nor re-send call records the parent still holds; and atexit does
+    # not run in pool children, so flush theirs from a multiprocessing finalizer.
+    if (base := sys.modules.get("mimi3.agents.base")) is not None:
+        base._telemetry.reset()
+    Finalize(None, _flush_telemetry, exitpriority=10)
+
+class TaskRunner:
+    """Run all pending tasks of a project with bounded concurrency.
+
+    ``mode="thread"`` and ``"process"`` run :func:`execute_task` on an
+    executor (process mode needs a picklable, module-level
+    ``agent_factory`` and always uses the default session factory);
+    ``mode="async"`` runs tasks as asyncio workers using ``arun`` and
+    ``async_session_factory`` (the async session layer by default; it is
+    required alongside a custom ``session_factory`` so both point at the
+    same database). ``estimate`` gives a task's expected duration for
+    critical-path ranking (every task counts as 1 by default).
+
+    Tasks whose inputs fail are marked ``failed`` without running; tasks
+    waiting on work outside this run stay ``pending``.
+    """
+
+    def __init__(
+        self,
+        *,
+        agent_factory: AgentFactory = runtime_agent,
+        session_factory: Callable[[], Session] | None = None,
+        async_session_factory: Callable[[], AsyncSession] | None = None,
+        concurrency: int = 4,
+        mode: Mode = "thread",
+        estimate: Estimate | None = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        if mode not in get_args(Mode):
+            raise ValueError(f"unknown mode {mode!r}; expected one of {', '.join(get_args(Mode))}")
+        if mode == "async" and session_factory is not None and async_session_factory is None:
+            raise ValueError("mode='async' with a custom session_factory also needs async_session_factory")
+        if session_factory is None:
+            from .database import SessionLocal
+            session_factory = SessionLocal
+        self.agent_factory = agent_factory
+        self.session_factory = session_factory
+        self.async_session_factory = async_session_factory
+        self.concurrency = concurrency
+        self.mode = mode
+        self.estimate = estimate
+        self._agents: dict[int, Any] = {}
+        self._agents_lock = threading.Lock()
+
+    def _cached_agent(self, agent: models.Agent):
+        # Runtime agents are reused across tasks within one runner.
+        with self._agents_lock:
+            if agent.id not in self._agents:
+                self._agents[agent.id] = self.agent_factory(agent)
+            return self._agents[agent.id]
+
+    def pending_task_ids(self, project_id: int) -> list[int]:
+        with self.session_factory() as db:
+            return list(db.scalars(_pending_stmt(project_id)))
+
+    def _plan(self, project_id: int) -> tuple[ReadyQueue, dict[int, TaskOutcome]]:
+        with self.session_factory() as db:
+            plan = load_plan(db, project_id, estimate=self.estimate)
+        outcomes = {}
+        for task_id, upstream in plan.blocked.items():
+            outcomes[task_id] = self._block(task_id, upstream)
+        return ReadyQueue(plan.graph), outcomes
+
+    def _block(self, task_id: int, upstream: int) -> TaskOutcome:
+        with self.session_factory() as db:
+            db.execute(_block_stmt(task_id, upstream))
+            db.commit()
+        return TaskOutcome(task_id, FAILED, _blocked_result(upstream), 0.0)
+
+    def _settle(self, queue: ReadyQueue, outcome: TaskOutcome, outcomes: dict[int, TaskOutcome]) -> None:
+        outcomes[outcome.task_id] = outcome
+        if outcome.status == COMPLETED:
+            queue.complete(outcome.task_id)
+        elif outcome.status == FAILED:
+            for task_id in queue.fail(outcome.task_id):
+                outcomes[task_id] = self._block(task_id, outcome.task_id)
+        else:  # claimed elsewhere; its dependents wait for a later run
+            queue.fail(outcome.task_id)
+
+    def run_project(self, project_id: int) -> list[TaskOutcome]:
+        """Execute every runnable pending task of ``project_id``; blocks until done.
+
+        Outcomes are returned in task id order.
+        """
+        if self.mode == "async":
+            return asyncio.run(self._arun_and_dispose(project_id))
+        queue, outcomes = self._plan(project_id)
+        executor: Executor
+        if self.mode == "process":
+            executor = ProcessPoolExecutor(max_workers=self.concurrency, initializer=_process_worker_init)
+            kwargs: dict[str, Any] = {"agent_factory": self.agent_factory}
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="mimi3-task")
+            kwargs = {"agent_factory": self._cached_agent, "session_factory": self.session_factory}
+        running: dict[Future[TaskOutcome], int] = {}
+        with executor:
+            while queue or running:
+                while queue and len(running) < self.concurrency:
+                    task_id = queue.pop()
+                    running[executor.submit(execute_task, task_id, **kwargs)] = task_id
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    self._settle(queue, future.result(), outcomes)
+        return [outcomes[task_id] for task_id in sorted(outcomes)]
+
+    async def _arun_and_dispose(self, project_id: int) -> list[TaskOutcome]:
+        from .database import dispose_async_engine
+        try:
+            return await self.arun_project(project_id)
+        finally:
+            await dispose_async_engine()
+
+    async def arun_project(self, project_id: int) -> list[TaskOutcome]:
+        """Asyncio variant of :meth:`run_project`."""
+        session_factory = self.async_session_factory
+        if session_factory is None:
+            from .database import AsyncSessionLocal as session_factory
+
+        queue, outcomes = await asyncio.to_thread(self._plan, project_id)
+        running: set[asyncio.Task[TaskOutcome]] = set()
+        while queue or running:
+            while queue and len(running) < self.concurrency:
+                running.add(asyncio.create_task(self._aexecute(queue.pop(), session_factory)))
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                await asyncio.to_thread(self._settle, queue, task.result(), outcomes)
+        return [outcomes[task_id] for task_id in sorted(outcomes)]
+
+    async def _aexecute(self, task_id: int, session_factory) -> TaskOutcome:
+        start = time.perf_counter()
+        async with session_factory() as db:
+            claimed = await db.execute(_claim_stmt(task_id))
+            await db.commit()
+            if claimed.rowcount != 1:
+                return TaskOutcome(task_id, "skipped", None, 0.0)
+        try:
+            async with session_factory() as db:
+                task = (await db.scalars(_task_stmt(task_id))).one()
+            status, result = await _arun_agents(task, self._cached_agent)
+        except Exception as exc:
+            status, result = FAILED, str(exc)
+        try:
+            await self._afinish(session_factory, task_id, status, result)
+        except Exception as exc:
+            status, result = FAILED, f"Could not record the result: {exc}"
+            await self._afinish(session_factory, task_id, status, result)
+        return TaskOutcome(task_id, status, result, time.perf_counter() - start)
+
+    @staticmethod
+    async def _afinish(session_factory, task_id: int, status: str, result: str | None) -> None:
+        async with session_factory() as db:
+            await db.execute(_finish_stmt(task_id, status, result))
+            await db.commit()
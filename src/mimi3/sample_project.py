@@ -64,6 +64,7 @@ def run() -> None:
             title="Review hello world program",
             description="Review for best practices and style",
             agents=[reviewer, builder],  # both agents can chime in
+            depends_on=[task_build],
         )
 
         # -----------------------------------------------------------------
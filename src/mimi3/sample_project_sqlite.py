@@ -13,6 +13,7 @@ from .crud import (
     create_agent,
     create_project,
     create_task,
+    get_project_tree,
 )
 from .tools.memory import MemoryTool
 
@@ -83,11 +84,12 @@ def run():
         task1.status = "completed"
         db.commit()
         
-        # Print project summary
+        # Print project summary (eager-loaded: fixed number of queries)
+        tree = get_project_tree(db, project.id)
         print("\nProject Summary:")
-        print(f"Project: {project.name} - {project.goal}")
+        print(f"Project: {tree.name} - {tree.goal}")
         print(f"Tasks:")
-        for task in project.tasks:
+        for task in tree.tasks:
             print(f"- {task.title} ({task.status})")
             print(f"  Assigned to: {', '.join([a.name for a in task.agents])}")
 
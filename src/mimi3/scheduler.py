@@ -0,0 +1,171 @@
+"""Task dependency graph and critical-path ordering.
+
+:class:`TaskGraph` is a plain DAG over task ids. Each task gets an upward
+rank: its own estimated duration plus the longest chain of dependents
+behind it. :class:`ReadyQueue` releases a task as soon as all its inputs
+have finished and, among ready tasks, always hands out the highest rank
+first, so the critical path never waits behind short side branches.
+"""
+from __future__ import annotations
+import heapq
+from typing import Callable, Iterable, Mapping, NamedTuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models
+
+class CycleError(ValueError):
+    """Raised when task dependencies do not form a DAG."""
+
+class TaskGraph:
+    """Dependency DAG; an edge ``(task, dep)`` means ``task`` waits for ``dep``.
+
+    Edges touching ids outside ``tasks`` are ignored.
+    """
+
+    def __init__(
+        self,
+        tasks: Iterable[int],
+        edges: Iterable[tuple[int, int]] = (),
+        weights: Mapping[int, float] | None = None,
+    ) -> None:
+        self.tasks = list(dict.fromkeys(tasks))
+        self.weights = {t: (weights or {}).get(t, 1.0) for t in self.tasks}
+        self.deps: dict[int, set[int]] = {t: set() for t in self.tasks}
+        self.dependents: dict[int, set[int]] = {t: set() for t in self.tasks}
+        for task, dep in edges:
+            if task in self.deps and dep in self.deps:
+                self.deps[task].add(dep)
+                self.dependents[dep].add(task)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def topological_order(self) -> list[int]:
+        """Kahn's algorithm, ties broken by task id."""
+        remaining = {t: len(d) for t, d in self.deps.items()}
+        ready = [t for t, n in remaining.items() if n == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            task = heapq.heappop(ready)
+            order.append(task)
+            for child in self.dependents[task]:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    heapq.heappush(ready, child)
+        if len(order) != len(self.tasks):
+            cyclic = sorted(t for t, n in remaining.items() if n)
+            raise CycleError(f"Task dependencies contain a cycle through tasks {cyclic}")
+        return order
+
+    def ranks(self) -> dict[int, float]:
+        """Upward rank: weight plus the heaviest chain of dependents."""
+        rank: dict[int, float] = {}
+        for task in reversed(self.topological_order()):
+            rank[task] = self.weights[task] + max((rank[c] for c in self.dependents[task]), default=0.0)
+        return rank
+
+    def critical_path(self) -> list[int]:
+        """The heaviest dependency chain, first task first."""
+        rank = self.ranks()
+        if not rank:
+            return []
+        task = max((t for t in self.tasks if not self.deps[t]), key=lambda t: (rank[t], -t))
+        path = [task]
+        while self.dependents[task]:
+            task = max(self.dependents[task], key=lambda t: (rank[t], -t))
+            path.append(task)
+        return path
+
+    def descendants(self, task: int) -> set[int]:
+        seen: set[int] = set()
+        stack = list(self.dependents[task])
+        while stack:
+            t = stack.pop()
+            if t not in seen:
+                seen.add(t)
+                stack.extend(self.dependents[t])
+        return seen
+
+class ReadyQueue:
+    """Incremental scheduling state over a :class:`TaskGraph`.
+
+    ``pop`` returns the ready task with the highest rank; ``complete``
+    releases dependents whose inputs are all done; ``fail`` drops every
+    downstream task and returns them.
+    """
+
+    def __init__(self, graph: TaskGraph) -> None:
+        self.graph = graph
+        self.rank = graph.ranks()
+        self._waiting = {t: len(d) for t, d in graph.deps.items()}
+        self._dropped: set[int] = set()
+        self._heap = [(-self.rank[t], t) for t, n in self._waiting.items() if n == 0]
+        heapq.heapify(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+    def pop(self) -> int:
+        return heapq.heappop(self._heap)[1]
+
+    def complete(self, task: int) -> list[int]:
+        released = []
+        for child in self.graph.dependents[task]:
+            self._waiting[child] -= 1
+            if self._waiting[child] == 0 and child not in self._dropped:
+                heapq.heappush(self._heap, (-self.rank[child], child))
+                released.append(child)
+        return released
+
+    def fail(self, task: int) -> list[int]:
+        dropped = sorted(self.graph.descendants(task) - self._dropped)
+        self._dropped.update(dropped)
+        return dropped
+
+# ---------- Loading from the DB ------------------------------------------
+
+class ProjectPlan(NamedTuple):
+    graph: TaskGraph  # pending tasks that can run in this pass
+    blocked: dict[int, int]  # pending task -> failed upstream task
+    deferred: list[int]  # pending tasks waiting on work outside this pass
+
+def load_plan(
+    db: Session,
+    project_id: int,
+    *,
+    estimate: Callable[[models.Task], float] | None = None,
+) -> ProjectPlan:
+    """Build the schedulable graph of a project's pending tasks.
+
+    Dependencies that already completed are satisfied. A failed upstream
+    task blocks everything below it. Any other upstream task outside this
+    project's pending set (``running`` in another worker, or ``pending`` in
+    another project) defers the dependent tasks to a later pass.
+    """
+    t, dep = models.Task, models.task_dependency_association
+    pending = {
+        task.id: task
+        for task in db.scalars(select(t).where(t.project_id == project_id, t.status == "pending").order_by(t.id))
+    }
+    edges = db.execute(
+        select(dep.c.task_id, dep.c.depends_on_id, t.status)
+        .join(t, t.id == dep.c.depends_on_id)
+        .where(dep.c.task_id.in_(list(pending)))
+    ).all()
+    full = TaskGraph(pending, [(e.task_id, e.depends_on_id) for e in edges])
+    full.topological_order()  # reject cycles before anything is claimed
+
+    blocked: dict[int, int] = {}
+    deferred: set[int] = set()
+    for e in edges:
+        if e.status == "failed":
+            for task in [e.task_id, *full.descendants(e.task_id)]:
+                blocked.setdefault(task, e.depends_on_id)
+        elif e.status != "completed" and e.depends_on_id not in pending:
+            deferred.update([e.task_id, *full.descendants(e.task_id)])
+    deferred -= blocked.keys()
+    runnable = [i for i in pending if i not in blocked and i not in deferred]
+    weights = {i: estimate(pending[i]) for i in runnable} if estimate else None
+    graph = TaskGraph(runnable, [(e.task_id, e.depends_on_id) for e in edges], weights)
+    return ProjectPlan(graph, blocked, sorted(deferred))
@@ -0,0 +1,142 @@
+"""Full-text search over memory entries and task results.
+
+Postgres uses GIN indexes on ``to_tsvector`` expressions, which the server
+keeps current on every write. SQLite uses FTS5 external-content tables
+kept in sync by triggers. :func:`install_fts` creates whichever applies
+and is run by :func:`mimi3.database.init_db`. Other backends fall back to
+an unranked ``LIKE`` scan.
+
+Queries are plain text: every word must match (prefixes are not
+expanded). Results come back best first, or newest first with
+``order="recent"``; ranking must score every match, so for very common
+words the recency order (which can stop at ``limit``) is much cheaper.
+"""
+from __future__ import annotations
+import re
+from typing import Literal, NamedTuple
+from sqlalchemy import column, func, inspect, literal, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+from . import models
+
+Order = Literal["rank", "recent"]
+
+TS_CONFIG = "english"
+
+# Postgres: the query must repeat these expressions verbatim to use the index.
+_PG_MEMORY_VECTOR = f"to_tsvector('{TS_CONFIG}', content)"
+_PG_TASK_VECTOR = f"to_tsvector('{TS_CONFIG}', coalesce(title, '') || ' ' || coalesce(result, ''))"
+
+_PG_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_memories_content_fts ON memories USING gin ({_PG_MEMORY_VECTOR})",
+    f"CREATE INDEX IF NOT EXISTS ix_tasks_text_fts ON tasks USING gin ({_PG_TASK_VECTOR})",
+]
+
+def _sqlite_ddl(source: str, columns: list[str]) -> list[str]:
+    fts = f"{source}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{source}', content_rowid='id')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        # Index rows that existed before the table was added.
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+_SQLITE_SOURCES = {"memories": ["content"], "tasks": ["title", "result"]}
+
+def install_fts(conn) -> None:
+    """Create full-text indexes for the connection's dialect (idempotent)."""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for ddl in _PG_DDL:
+            conn.execute(text(ddl))
+    elif dialect == "sqlite":
+        existing = set(inspect(conn).get_table_names())
+        for source, columns in _SQLITE_SOURCES.items():
+            if f"{source}_fts" not in existing:
+                for ddl in _sqlite_ddl(source, columns):
+                    conn.execute(text(ddl))
+
+# ---------- Queries ------------------------------------------------------
+
+class SearchHit(NamedTuple):
+    kind: Literal["memory", "task"]
+    id: int
+    task_id: int
+    text: str
+    rank: float  # higher is better; only comparable within one kind
+
+def _words(query: str) -> list[str]:
+    return re.findall(r"\w+", query)
+
+def _fts5_query(words: list[str]) -> str:
+    return " ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+def _matching(db: Session, source: str, words: list[str], pg_vector: str, columns, like_columns):
+    """``(select, rank, recency)`` for rows of ``source`` matching all ``words``."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        tsquery = func.plainto_tsquery(TS_CONFIG, " ".join(words))
+        vector = literal_column(pg_vector)
+        rank = func.ts_rank_cd(vector, tsquery)
+        return select(*columns, rank).where(vector.op("@@")(tsquery)), rank, columns[0]
+    if dialect == "sqlite":
+        fts = table(f"{source}_fts", column("rowid"))
+        rank = -func.bm25(literal_column(fts.name))
+        stmt = (
+            select(*columns, rank)
+            .join(fts, fts.c.rowid == columns[0])
+            .where(literal_column(fts.name).op("MATCH")(_fts5_query(words)))
+        )
+        return stmt, rank, fts.c.rowid  # FTS5 walks its doclists in rowid order
+    rank = literal(0.0)
+    matches = [or_(*(c.ilike(f"%{w}%") for c in like_columns)) for w in words]
+    return select(*columns, rank).where(*matches), rank, columns[0]
+
+def search_memories(
+    db: Session,
+    query: str,
+    *,
+    limit: int = 20,
+    project_id: int | None = None,
+    task_id: int | None = None,
+    agent_id: int | None = None,
+    order: Order = "rank",
+) -> list[SearchHit]:
+    """Memory entries matching every word of ``query``."""
+    words = _words(query)
+    if not words:
+        return []
+    m = models.Memory
+    stmt, rank, recency = _matching(db, "memories", words, _PG_MEMORY_VECTOR, [m.id, m.task_id, m.content], [m.content])
+    if task_id is not None:
+        stmt = stmt.where(m.task_id == task_id)
+    if agent_id is not None:
+        stmt = stmt.where(m.agent_id == agent_id)
+    if project_id is not None:
+        stmt = stmt.join(models.Task, models.Task.id == m.task_id).where(models.Task.project_id == project_id)
+    rows = db.execute(stmt.order_by((rank if order == "rank" else recency).desc()).limit(limit)).all()
+    return [SearchHit("memory", r[0], r[1], r[2], float(r[3])) for r in rows]
+
+def search_tasks(
+    db: Session, query: str, *, limit: int = 20, project_id: int | None = None, order: Order = "rank"
+) -> list[SearchHit]:
+    """Tasks whose title or result match every word of ``query``."""
+    words = _words(query)
+    if not words:
+        return []
+    t = models.Task
+    stmt, rank, recency = _matching(
+        db, "tasks", words, _PG_TASK_VECTOR, [t.id, t.title, func.coalesce(t.result, "")], [t.title, t.result]
+    )
+    if project_id is not None:
+        stmt = stmt.where(t.project_id == project_id)
+    rows = db.execute(stmt.order_by((rank if order == "rank" else recency).desc()).limit(limit)).all()
+    return [SearchHit("task", r[0], r[0], f"{r[1]}: {r[2]}" if r[2] else r[1], float(r[3])) for r in rows]
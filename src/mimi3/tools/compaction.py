@@ -0,0 +1,147 @@
+"""Roll old memory entries up into summaries and archive the originals.
+
+:func:`compact` keeps the newest ``keep_last`` entries of an agent/task
+history, asks a summariser to condense everything older into one entry,
+and moves the condensed rows to ``memory_archive`` in one transaction.
+The summary takes over the ``(timestamp, id)`` of the newest row it
+replaces, so it sits exactly where that history was in recall and keyset
+order. Earlier summaries are older than the kept entries and are
+themselves rolled into the next one.
+
+:class:`MemoryCompactor` runs this periodically for a
+:class:`~mimi3.tools.memory.MemoryTool` once a history grows past
+``max_entries``.
+"""
+from __future__ import annotations
+from collections import Counter
+from datetime import datetime, UTC
+from typing import Any, Callable, Iterable, NamedTuple
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+from .. import models
+
+Summarizer = Callable[[list[str]], str]
+
+_CHUNK = 500  # ids per IN (...) clause
+
+class CompactionResult(NamedTuple):
+    summary_id: int
+    archived: int
+
+def agent_summarizer(agent: Any, *, max_words: int = 200) -> Summarizer:
+    """Summarise with a runtime agent (anything with ``run(task)``)."""
+    from ..runner import PromptTask
+
+    def summarize(entries: list[str]) -> str:
+        history = "\n".join(f"- {e}" for e in entries)
+        prompt = (
+            f"Summarise the following agent memory, oldest first, in at most {max_words} words. "
+            f"Keep decisions, facts and open questions; drop chatter.\n\n{history}"
+        )
+        return agent.run(PromptTask(prompt))
+
+    return summarize
+
+def compact(
+    db: Session,
+    *,
+    agent_id: int,
+    task_id: int,
+    summarize: Summarizer,
+    keep_last: int = 50,
+) -> CompactionResult | None:
+    """Summarise and archive all but the newest ``keep_last`` entries.
+
+    The rows are read and the transaction is committed before the
+    (slow) summariser runs, so no transaction is held across the LLM
+    call. Archiving then happens in a fresh transaction that only goes
+    ahead if every summarised row is still there.
+
+    Returns ``None`` when there is nothing to roll up (at most one old
+    entry, e.g. a previous summary) or when a concurrent compaction
+    archived the rows first.
+    """
+    m = models.Memory
+    rows = db.execute(
+        select(m.id, m.content, m.timestamp)
+        .where(m.agent_id == agent_id, m.task_id == task_id)
+        .order_by(m.timestamp.desc(), m.id.desc())
+        .offset(keep_last)
+    ).all()
+    db.commit()
+    if len(rows) < 2:
+        return None
+    rows.reverse()  # oldest first for the summariser
+    summary = summarize([r.content for r in rows])
+    newest = rows[-1]
+    archived_at = datetime.now(UTC)
+    ids = [r.id for r in rows]
+    for start in range(0, len(ids), _CHUNK):
+        chunk = ids[start : start + _CHUNK]
+        db.execute(
+            insert(models.MemoryArchive).from_select(
+                ["memory_id", "agent_id", "task_id", "timestamp", "content", "kind", "summary_id", "archived_at"],
+                select(
+                    m.id, m.agent_id, m.task_id, m.timestamp, m.content, m.kind, literal(newest.id), literal(archived_at)
+                ).where(m.id.in_(chunk)),
+            )
+        )
+        db.execute(delete(models.MemoryEmbedding).where(models.MemoryEmbedding.memory_id.in_(chunk)))
+        if db.execute(delete(m).where(m.id.in_(chunk))).rowcount != len(chunk):
+            db.rollback()  # someone else compacted (some of) these rows
+            return None
+    db.execute(
+        insert(m).values(
+            id=newest.id,
+            agent_id=agent_id,
+            task_id=task_id,
+            timestamp=newest.timestamp,
+            content=summary,
+            kind="summary",
+        )
+    )
+    db.commit()
+    return CompactionResult(newest.id, len(ids))
+
+def live_count(db: Session, *, agent_id: int, task_id: int) -> int:
+    m = models.Memory
+    return db.scalar(select(func.count()).where(m.agent_id == agent_id, m.task_id == task_id))
+
+class MemoryCompactor:
+    """Compact a history once it holds more than ``max_entries`` live rows.
+
+    Size is checked every ``check_every`` writes per agent/task rather than
+    on each write, so the steady-state cost is one ``COUNT`` per batch.
+    """
+
+    def __init__(
+        self,
+        summarize: Summarizer,
+        *,
+        max_entries: int = 200,
+        keep_last: int = 50,
+        check_every: int = 20,
+    ) -> None:
+        if not 0 <= keep_last < max_entries:
+            raise ValueError("keep_last must be smaller than max_entries")
+        self.summarize = summarize
+        self.max_entries = max_entries
+        self.keep_last = keep_last
+        self.check_every = check_every
+        self._writes: Counter[tuple[int, int]] = Counter()
+
+    def observe(self, db: Session, keys: Iterable[tuple[int, int]]) -> list[CompactionResult]:
+        """Record writes for ``(agent_id, task_id)`` keys; compact where due."""
+        results = []
+        for key, n in Counter(keys).items():
+            self._writes[key] += n
+            if self._writes[key] >= self.check_every:
+                self._writes[key] = 0
+                if (result := self.maybe_compact(db, agent_id=key[0], task_id=key[1])) is not None:
+                    results.append(result)
+        return results
+
+    def maybe_compact(self, db: Session, *, agent_id: int, task_id: int) -> CompactionResult | None:
+        if live_count(db, agent_id=agent_id, task_id=task_id) <= self.max_entries:
+            return None
+        return compact(db, agent_id=agent_id, task_id=task_id, summarize=self.summarize, keep_last=self.keep_last)
@@ -1,13 +1,44 @@
 """Simple persistent memory tool for agents."""
+from __future__ import annotations
+import time
 from datetime import datetime, UTC
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Mapping
+from sqlalchemy import insert, select, tuple_
 from sqlalchemy.orm import Session
 from .. import models
 
+if TYPE_CHECKING:
+    from .compaction import MemoryCompactor
+    from .vector_index import MemoryIndex
+
+# Keyset cursor: (timestamp, id) of the oldest entry already returned.
+Cursor = tuple[datetime, int]
+
+TokenCounter = Callable[[str], int]
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for BPE vocabularies)."""
+    return max(1, (len(text) + 3) // 4)
+
 class MemoryTool:
-    """Store and retrieve per‑task conversation memory."""
+    """Store and retrieve per‑task conversation memory.
 
-    def __init__(self, db: Session) -> None:
+    With a ``compactor`` (see :mod:`mimi3.tools.compaction`), writes
+    periodically roll old history up into a summary entry. :meth:`search`
+    uses ``index`` (see :mod:`mimi3.tools.vector_index`), by default an
+    exact index over Ollama embeddings.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        *,
+        compactor: "MemoryCompactor | None" = None,
+        index: "MemoryIndex | None" = None,
+    ) -> None:
         self.db = db
+        self.compactor = compactor
+        self.index = index
 
     # ------------------------------------------------------------------ #
     # Public API
@@ -17,12 +48,160 @@ class MemoryTool:
         entry = models.Memory(agent_id=agent_id, task_id=task_id, content=content, timestamp=datetime.now(UTC))
         self.db.add(entry)
         self.db.commit()
+        if self.compactor is not None:
+            self.compactor.observe(self.db, [(agent_id, task_id)])
+
+    def save_many(self, entries: Iterable[Mapping[str, object]]) -> int:
+        """Insert many entries in a single transaction.
+
+        Each entry is a mapping with ``agent_id``, ``task_id`` and ``content``
+        (and optionally ``timestamp``). Rows go through one executemany
+        INSERT and one commit instead of one round-trip per message.
+        Returns the number of rows written.
+        """
+        now = datetime.now(UTC)
+        rows = [
+            {
+                "agent_id": e["agent_id"],
+                "task_id": e["task_id"],
+                "content": e["content"],
+                "timestamp": e.get("timestamp") or now,
+            }
+            for e in entries
+        ]
+        if not rows:
+            return 0
+        self.db.execute(insert(models.Memory), rows)
+        self.db.commit()
+        if self.compactor is not None:
+            self.compactor.observe(self.db, [(r["agent_id"], r["task_id"]) for r in rows])
+        return len(rows)
+
+    def buffered(self, *, max_size: int = 500, flush_interval: float = 1.0) -> "BufferedMemoryWriter":
+        """Return an auto-flushing writer bound to this tool's session."""
+        return BufferedMemoryWriter(self, max_size=max_size, flush_interval=flush_interval)
 
     def recall(self, *, agent_id: int, task_id: int, limit: int = 20) -> list[str]:
         q = (
             self.db.query(models.Memory)
             .filter_by(agent_id=agent_id, task_id=task_id)
-            .order_by(models.Memory.timestamp.desc())
+            .order_by(models.Memory.timestamp.desc(), models.Memory.id.desc())
             .limit(limit)
         )
         return [m.content for m in q]
+
+    def search(self, query: str, k: int = 5, *, project_id: int | None = None) -> list[str]:
+        """Entries most similar to ``query`` across tasks, best first.
+
+        ``project_id`` limits the search to memory of that project's tasks.
+        """
+        if self.index is None:
+            from ..llm.embeddings import OllamaEmbedder
+            from .vector_index import MemoryIndex
+            self.index = MemoryIndex(OllamaEmbedder())
+        return [mem.content for mem, _ in self.index.search(self.db, query, k, project_id=project_id)]
+
+    def recall_page(
+        self,
+        *,
+        agent_id: int,
+        task_id: int,
+        limit: int = 20,
+        before: Cursor | None = None,
+    ) -> tuple[list[str], Cursor | None]:
+        """Return one page of entries (newest first) and the cursor for the next.
+
+        Pagination is keyset-based on ``(timestamp, id)`` so fetching deep
+        history costs the same as the first page. The returned cursor is
+        ``None`` once history is exhausted.
+        """
+        m = models.Memory
+        stmt = (
+            select(m.content, m.timestamp, m.id)
+            .where(m.agent_id == agent_id, m.task_id == task_id)
+            .order_by(m.timestamp.desc(), m.id.desc())
+            .limit(limit)
+        )
+        if before is not None:
+            stmt = stmt.where(tuple_(m.timestamp, m.id) < tuple_(*before))
+        rows = self.db.execute(stmt).all()
+        cursor = (rows[-1].timestamp, rows[-1].id) if len(rows) == limit else None
+        return [r.content for r in rows], cursor
+
+    def recall_budget(
+        self,
+        *,
+        agent_id: int,
+        task_id: int,
+        max_tokens: int,
+        count_tokens: TokenCounter = estimate_tokens,
+        page_size: int = 50,
+    ) -> list[str]:
+        """Newest entries (newest first) whose combined size fits ``max_tokens``.
+
+        Stops at the first entry that would overflow the budget, so the
+        result is always a contiguous run of recent history. Only as many
+        pages are read as the budget needs.
+        """
+        entries: list[str] = []
+        used = 0
+        for content in self.recall_iter(agent_id=agent_id, task_id=task_id, page_size=page_size):
+            used += count_tokens(content)
+            if used > max_tokens:
+                break
+            entries.append(content)
+        return entries
+
+    def recall_iter(self, *, agent_id: int, task_id: int, page_size: int = 500) -> Iterator[str]:
+        """Stream the full history (newest first) page by page."""
+        before: Cursor | None = None
+        while True:
+            page, before = self.recall_page(agent_id=agent_id, task_id=task_id, limit=page_size, before=before)
+            yield from page
+            if before is None:
+                return
+
+class BufferedMemoryWriter:
+    """Accumulate memory entries and write them with :meth:`MemoryTool.save_many`.
+
+    The buffer is flushed when it holds ``max_size`` entries, when more than
+    ``flush_interval`` seconds have passed since the last flush (checked on
+    each :meth:`save`), and when the context manager exits. The writer is
+    tied to a single ``Session`` and is therefore not thread-safe.
+    """
+
+    def __init__(self, tool: MemoryTool, *, max_size: int = 500, flush_interval: float = 1.0) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.tool = tool
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._buffer: list[dict[str, object]] = []
+        self._last_flush = time.monotonic()
+
+    def __enter__(self) -> "BufferedMemoryWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.flush()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def save(self, *, agent_id: int, task_id: int, content: str) -> None:
+        # Stamp at enqueue time so recall order matches call order.
+        self._buffer.append(
+            {"agent_id": agent_id, "task_id": task_id, "content": content, "timestamp": datetime.now(UTC)}
+        )
+        if len(self._buffer) >= self.max_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write out all buffered entries; returns the number written.
+
+        If the write fails the entries stay buffered for the next flush.
+        """
+        written = self.tool.save_many(self._buffer)
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        return written
@@ -0,0 +1,104 @@
+"""Asyncio variant of :class:`mimi3.tools.memory.MemoryTool`."""
+from __future__ import annotations
+from datetime import datetime, UTC
+from typing import AsyncIterator, Iterable, Mapping
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+from .memory import Cursor, TokenCounter, estimate_tokens
+
+class AsyncMemoryTool:
+    """Store and retrieve per‑task conversation memory on an ``AsyncSession``."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+
+    async def save(self, *, agent_id: int, task_id: int, content: str) -> None:
+        entry = models.Memory(agent_id=agent_id, task_id=task_id, content=content, timestamp=datetime.now(UTC))
+        self.db.add(entry)
+        await self.db.commit()
+
+    async def save_many(self, entries: Iterable[Mapping[str, object]]) -> int:
+        """Insert many entries with one executemany INSERT and one commit."""
+        now = datetime.now(UTC)
+        rows = [
+            {
+                "agent_id": e["agent_id"],
+                "task_id": e["task_id"],
+                "content": e["content"],
+                "timestamp": e.get("timestamp") or now,
+            }
+            for e in entries
+        ]
+        if not rows:
+            return 0
+        await self.db.execute(insert(models.Memory), rows)
+        await self.db.commit()
+        return len(rows)
+
+    async def recall(self, *, agent_id: int, task_id: int, limit: int = 20) -> list[str]:
+        m = models.Memory
+        stmt = (
+            select(m.content)
+            .where(m.agent_id == agent_id, m.task_id == task_id)
+            .order_by(m.timestamp.desc(), m.id.desc())
+            .limit(limit)
+        )
+        return list((await self.db.scalars(stmt)).all())
+
+    async def recall_page(
+        self,
+        *,
+        agent_id: int,
+        task_id: int,
+        limit: int = 20,
+        before: Cursor | None = None,
+    ) -> tuple[list[str], Cursor | None]:
+        """Keyset-paginated recall; see :meth:`MemoryTool.recall_page`."""
+        m = models.Memory
+        stmt = (
+            select(m.content, m.timestamp, m.id)
+            .where(m.agent_id == agent_id, m.task_id == task_id)
+            .order_by(m.timestamp.desc(), m.id.desc())
+            .limit(limit)
+        )
+        if before is not None:
+            stmt = stmt.where(tuple_(m.timestamp, m.id) < tuple_(*before))
+        rows = (await self.db.execute(stmt)).all()
+        cursor = (rows[-1].timestamp, rows[-1].id) if len(rows) == limit else None
+        return [r.content for r in rows], cursor
+
+    async def recall_budget(
+        self,
+        *,
+        agent_id: int,
+        task_id: int,
+        max_tokens: int,
+        count_tokens: TokenCounter = estimate_tokens,
+        page_size: int = 50,
+    ) -> list[str]:
+        """Token-budgeted recall; see :meth:`MemoryTool.recall_budget`."""
+        entries: list[str] = []
+        used = 0
+        async for content in self.recall_iter(agent_id=agent_id, task_id=task_id, page_size=page_size):
+            used += count_tokens(content)
+            if used > max_tokens:
+                break
+            entries.append(content)
+        return entries
+
+    async def recall_iter(self, *, agent_id: int, task_id: int, page_size: int = 500) -> AsyncIterator[str]:
+        """Stream the full history (newest first) page by page."""
+        before: Cursor | None = None
+        while True:
+            page, before = await self.recall_page(
+                agent_id=agent_id, task_id=task_id, limit=page_size, before=before
+            )
+            for content in page:
+                yield content
+            if before is None:
+                return
@@ -0,0 +1,208 @@
+"""In-memory nearest-neighbour indexes over memory embeddings.
+
+:class:`BruteForceIndex` scores every vector with one matrix product and
+is exact. :class:`IVFIndex` clusters vectors with k-means and only scans
+the ``n_probe`` clusters closest to the query, trading a little recall
+for latency on large stores. Both take L2-normalised vectors and rank by
+cosine similarity. Each vector can carry an integer ``group`` (the
+project id for memories) to restrict a search.
+
+:class:`MemoryIndex` keeps one of them in sync with ``memory_embeddings``.
+"""
+from __future__ import annotations
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .. import models
+from ..llm.embeddings import Embedder, embed_pending, from_blob
+
+class BruteForceIndex:
+    """Exact search. Adding an existing id replaces its vector."""
+
+    def __init__(self, dim: int | None = None) -> None:
+        self.dim = dim
+        self._vectors = np.empty((0, dim or 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._groups = np.empty(0, dtype=np.int64)
+        self._pos: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, ids, vectors, groups=None) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        if not len(ids):
+            return
+        if self.dim is None or not len(self._ids):
+            self.dim = vectors.shape[1]
+            self._vectors = self._vectors.reshape(0, self.dim)
+        groups = np.full(len(ids), -1) if groups is None else np.asarray(groups)
+        new = []
+        for i, id_ in enumerate(ids):
+            if (pos := self._pos.get(int(id_))) is not None:
+                self._vectors[pos], self._groups[pos] = vectors[i], groups[i]
+                self._replaced(pos)
+            else:
+                new.append(i)
+        if new:
+            start = len(self._ids)
+            self._vectors = np.concatenate([self._vectors, vectors[new]])
+            self._ids = np.concatenate([self._ids, np.asarray(ids, dtype=np.int64)[new]])
+            self._groups = np.concatenate([self._groups, groups[new].astype(np.int64)])
+            for offset, i in enumerate(new):
+                self._pos[int(ids[i])] = start + offset
+            self._appended(start)
+
+    def _replaced(self, pos: int) -> None:
+        pass
+
+    def _appended(self, start: int) -> None:
+        pass
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray | None:
+        """Row positions worth scoring, or ``None`` for all of them."""
+        return None
+
+    def search(self, query, k: int = 5, *, group: int | None = None) -> list[tuple[int, float]]:
+        """Top ``k`` ``(id, similarity)`` pairs, best first."""
+        if not len(self._ids) or k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        rows = self._candidates(query)
+        if group is not None:
+            mask = self._groups == group if rows is None else self._groups[rows] == group
+            rows = np.flatnonzero(mask) if rows is None else rows[mask]
+        vectors = self._vectors if rows is None else self._vectors[rows]
+        if not len(vectors):
+            return []
+        scores = vectors @ query
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        positions = top if rows is None else rows[top]
+        return [(int(self._ids[p]), float(scores[t])) for p, t in zip(positions, top)]
+
+class IVFIndex(BruteForceIndex):
+    """Inverted-file index: k-means cells, probe the closest ``n_probe``.
+
+    Cells are trained on the first ``train_size`` vectors added (exact
+    search is used until then) and re-trained when the index has grown
+    fourfold since, so cells stay balanced.
+    """
+
+    def __init__(
+        self,
+        dim: int | None = None,
+        *,
+        n_lists: int | None = None,
+        n_probe: int = 8,
+        train_size: int = 4096,
+        iterations: int = 10,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(dim)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size
+        self.iterations = iterations
+        self._rng = np.random.default_rng(seed)
+        self._centroids: np.ndarray | None = None
+        self._assign = np.empty(0, dtype=np.int64)
+        self._lists: list[np.ndarray] = []
+        self._trained_at = 0
+
+    def train(self) -> None:
+        n = len(self._ids)
+        lists = self.n_lists or max(1, int(np.sqrt(n)))
+        sample = self._vectors[self._rng.choice(n, size=min(n, max(self.train_size, 64 * lists)), replace=False)]
+        centroids = sample[self._rng.choice(len(sample), size=min(lists, len(sample)), replace=False)]
+        for _ in range(self.iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids = centroids / np.where(norms == 0, 1, norms)
+        self._centroids = centroids
+        self._trained_at = n
+        self._assign = np.argmax(self._vectors @ centroids.T, axis=1)
+        self._rebuild_lists()
+
+    def _rebuild_lists(self) -> None:
+        order = np.argsort(self._assign, kind="stable")
+        bounds = np.searchsorted(self._assign[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[c] : bounds[c + 1]] for c in range(len(self._centroids))]
+
+    def _replaced(self, pos: int) -> None:
+        if self._centroids is not None:
+            self._assign[pos] = int(np.argmax(self._centroids @ self._vectors[pos]))
+            self._rebuild_lists()
+
+    def _appended(self, start: int) -> None:
+        n = len(self._ids)
+        if n >= self.train_size and (self._centroids is None or n >= 4 * self._trained_at):
+            self.train()
+        elif self._centroids is not None:
+            added = np.argmax(self._vectors[start:] @ self._centroids.T, axis=1)
+            self._assign = np.concatenate([self._assign, added])
+            self._rebuild_lists()
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray | None:
+        if self._centroids is None:
+            return None
+        probe = np.argsort(-(self._centroids @ query))[: self.n_probe]
+        return np.concatenate([self._lists[c] for c in probe])
+
+class MemoryIndex:
+    """Vector index over ``memory_embeddings`` for one embedding model.
+
+    :meth:`refresh` embeds entries that have none yet and loads embedding
+    rows written since the last refresh, so repeated searches only pay for
+    what changed. Entries removed from ``memories`` (e.g. by compaction)
+    are skipped when results are resolved.
+    """
+
+    def __init__(self, embedder: Embedder, *, approximate: bool = False, **ivf_options) -> None:
+        self.embedder = embedder
+        self.index: BruteForceIndex = IVFIndex(**ivf_options) if approximate else BruteForceIndex()
+        self._last_embedding_id = 0
+
+    def refresh(self, db: Session, *, project_id: int | None = None) -> int:
+        """Embed and load new entries; returns the number of vectors loaded."""
+        embed_pending(db, self.embedder, project_id=project_id)
+        e, m, t = models.MemoryEmbedding, models.Memory, models.Task
+        rows = db.execute(
+            select(e.id, e.memory_id, e.vector, t.project_id)
+            .join(m, m.id == e.memory_id)
+            .join(t, t.id == m.task_id)
+            .where(e.id > self._last_embedding_id, e.model == self.embedder.model)
+            .order_by(e.id)
+        ).all()
+        if rows:
+            self.index.add(
+                [r.memory_id for r in rows],
+                np.stack([from_blob(r.vector) for r in rows]),
+                [r.project_id for r in rows],
+            )
+            self._last_embedding_id = rows[-1].id
+        return len(rows)
+
+    def search(
+        self, db: Session, query: str, k: int = 5, *, project_id: int | None = None
+    ) -> list[tuple[models.Memory, float]]:
+        """Top ``k`` live memory entries for ``query`` with their similarity."""
+        self.refresh(db, project_id=project_id)
+        (vector,) = self.embedder.embed([query])
+        m = models.Memory
+        found: dict[int, models.Memory] = {}
+        checked: set[int] = set()
+        want = 2 * k + 10  # slack for removed entries
+        while True:
+            hits = self.index.search(vector, want, group=project_id)
+            new = [i for i, _ in hits if i not in checked]
+            checked.update(new)
+            found.update((mem.id, mem) for mem in db.scalars(select(m).where(m.id.in_(new))))
+            live = [(found[i], score) for i, score in hits if i in found]
+            if len(live) >= k or len(hits) < want:  # enough, or the index is exhausted
+                return live[:k]
+            want *= 4
@@ -0,0 +1,311 @@
+"""Distributed task worker sharing the ``tasks`` table with other workers.
+
+Each worker claims one ``pending`` task at a time whose dependencies have
+all completed. On Postgres the candidate row is locked with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent workers never queue
+behind each other. SQLite ignores the lock clause; there a conditional
+``UPDATE`` (``WHERE status = 'pending'``) decides which worker wins. The
+same code path serves both backends.
+
+A claimed task carries a lease (``lease_owner``, ``lease_expires_at``) that
+a background thread renews while the task runs. Any worker requeues tasks
+whose lease expired (their worker died) or fails them once
+``max_attempts`` is reached. Pending tasks downstream of a failed task are
+failed too, as :class:`~mimi3.runner.TaskRunner` does, so they do not wait
+forever.
+"""
+from __future__ import annotations
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, UTC
+from typing import Callable
+from sqlalchemy import exists, select, update
+from sqlalchemy.orm import Session
+from . import models
+from .runner import COMPLETED, FAILED, PENDING, RUNNING, AgentFactory, _block_stmt, runtime_agent, run_claimed_task
+from .scheduler import CycleError, load_plan
+from .settings import settings
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+@dataclass
+class WorkerStats:
+    completed: int = 0
+    failed: int = 0
+    lost: int = 0  # lease expired and the task was requeued under us
+    requeued: int = 0  # expired leases this worker returned to the queue
+    blocked: int = 0  # pending tasks this worker failed because an input failed
+    started: float = field(default_factory=time.perf_counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, status: str) -> None:
+        with self._lock:
+            if status == COMPLETED:
+                self.completed += 1
+            elif status == FAILED:
+                self.failed += 1
+            else:
+                self.lost += 1
+
+    @property
+    def processed(self) -> int:
+        return self.completed + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Finished tasks per second since the worker started."""
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.processed} tasks ({self.completed} completed, {self.failed} failed) "
+            f"in {self.elapsed:.1f}s, {self.throughput:.2f} tasks/s; "
+            f"requeued {self.requeued}, blocked {self.blocked}, lost {self.lost}"
+        )
+
+# ---------- Queue operations ---------------------------------------------
+
+def _ready_filter():
+    """No dependency of the task is still unfinished."""
+    t, dep = models.Task, models.task_dependency_association
+    upstream = models.Task.__table__.alias("upstream")
+    return ~exists().where(
+        dep.c.task_id == t.id,
+        dep.c.depends_on_id == upstream.c.id,
+        upstream.c.status != COMPLETED,
+    )
+
+def claim_next(
+    db: Session,
+    owner: str,
+    *,
+    lease_seconds: float,
+    project_id: int | None = None,
+    retries: int = 5,
+) -> int | None:
+    """Lease the oldest ready task to ``owner``; ``None`` if there is none."""
+    t = models.Task
+    stmt = select(t.id).where(t.status == PENDING, _ready_filter()).order_by(t.id).limit(1)
+    if project_id is not None:
+        stmt = stmt.where(t.project_id == project_id)
+    stmt = stmt.with_for_update(skip_locked=True)
+    for _ in range(retries):
+        task_id = db.scalar(stmt)
+        if task_id is None:
+            db.rollback()
+            return None
+        claimed = db.execute(
+            update(t)
+            .where(t.id == task_id, t.status == PENDING)
+            .values(
+                status=RUNNING,
+                lease_owner=owner,
+                lease_expires_at=datetime.now(UTC) + timedelta(seconds=lease_seconds),
+                attempts=t.attempts + 1,
+            )
+        )
+        db.commit()
+        if claimed.rowcount == 1:
+            return task_id
+    return None
+
+def fail_blocked(db: Session, *, project_id: int | None = None) -> int:
+    """Fail pending tasks that depend, directly or not, on a failed task.
+
+    Uses the ``blocked`` map of :func:`~mimi3.scheduler.load_plan` for every
+    project with such a task. Returns the number of tasks failed.
+    """
+    t, dep = models.Task, models.task_dependency_association
+    upstream = models.Task.__table__.alias("upstream")
+    stmt = select(t.project_id).distinct().where(
+        t.status == PENDING,
+        exists().where(dep.c.task_id == t.id, dep.c.depends_on_id == upstream.c.id, upstream.c.status == FAILED),
+    )
+    if project_id is not None:
+        stmt = stmt.where(t.project_id == project_id)
+    failed = 0
+    for pid in db.scalars(stmt).all():
+        try:
+            blocked = load_plan(db, pid).blocked
+        except CycleError as exc:
+            print(f"[worker] ⚠️  Project {pid}: {exc}")
+            continue
+        for task_id, failed_upstream in blocked.items():
+            failed += db.execute(_block_stmt(task_id, failed_upstream)).rowcount
+    db.commit()
+    return failed
+
+def renew_leases(db: Session, owner: str, task_ids: list[int], *, lease_seconds: float) -> int:
+    """Extend the leases ``owner`` still holds on ``task_ids``."""
+    if not task_ids:
+        return 0
+    t = models.Task
+    renewed = db.execute(
+        update(t)
+        .where(t.id.in_(task_ids), t.status == RUNNING, t.lease_owner == owner)
+        .values(lease_expires_at=datetime.now(UTC) + timedelta(seconds=lease_seconds))
+    )
+    db.commit()
+    return renewed.rowcount
+
+def requeue_expired(db: Session, *, max_attempts: int) -> tuple[int, int]:
+    """Return tasks with expired leases to ``pending``.
+
+    Tasks that already used ``max_attempts`` are failed instead. Returns
+    ``(requeued, failed)``.
+    """
+    t = models.Task
+    expired = (t.status == RUNNING, t.lease_expires_at.is_not(None), t.lease_expires_at < datetime.now(UTC))
+    release = {"lease_owner": None, "lease_expires_at": None}
+    failed = db.execute(
+        update(t)
+        .where(*expired, t.attempts >= max_attempts)
+        .values(status=FAILED, result=f"Lease expired {max_attempts} times", **release)
+    ).rowcount
+    requeued = db.execute(update(t).where(*expired).values(status=PENDING, **release)).rowcount
+    db.commit()
+    return requeued, failed
+
+# ---------- Worker -------------------------------------------------------
+
+class Worker:
+    """Pull tasks from the shared queue until stopped or idle.
+
+    ``concurrency`` tasks run at once on threads of this process; start
+    more processes (or hosts) against the same database to scale out.
+    """
+
+    def __init__(
+        self,
+        *,
+        worker_id: str | None = None,
+        agent_factory: AgentFactory = runtime_agent,
+        session_factory: Callable[[], Session] | None = None,
+        concurrency: int = 1,
+        project_id: int | None = None,
+        lease_seconds: float | None = None,
+        poll_interval: float | None = None,
+        max_attempts: int | None = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        if session_factory is None:
+            from .database import SessionLocal
+            session_factory = SessionLocal
+        self.worker_id = worker_id or default_worker_id()
+        self.agent_factory = agent_factory
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.project_id = project_id
+        self.lease_seconds = lease_seconds or settings.worker_lease_seconds
+        self.poll_interval = settings.worker_poll_interval if poll_interval is None else poll_interval
+        self.max_attempts = max_attempts or settings.worker_max_attempts
+        self.stats = WorkerStats()
+        self._active: set[int] = set()
+        self._active_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(
+        self,
+        *,
+        max_tasks: int | None = None,
+        exit_when_idle: bool = False,
+        report: Callable[[WorkerStats], None] | None = None,
+        report_interval: float = 10.0,
+    ) -> WorkerStats:
+        """Process tasks until :meth:`stop`, ``max_tasks`` or, optionally, an empty queue."""
+        self._stop.clear()
+        self.stats = WorkerStats()
+        self._sweep()
+        budget = threading.Semaphore(max_tasks) if max_tasks is not None else None
+        heartbeat = threading.Thread(target=self._heartbeat, args=(report, report_interval), daemon=True)
+        heartbeat.start()
+        try:
+            with ThreadPoolExecutor(self.concurrency, thread_name_prefix="mimi3-worker") as pool:
+                loops = [pool.submit(self._loop, budget, exit_when_idle) for _ in range(self.concurrency)]
+            for loop in loops:
+                loop.result()
+        finally:
+            self._stop.set()
+            heartbeat.join()
+        if report:
+            report(self.stats)
+        return self.stats
+
+    def _loop(self, budget: threading.Semaphore | None, exit_when_idle: bool) -> None:
+        try:
+            self._claim_and_run(budget, exit_when_idle)
+        except BaseException:
+            self._stop.set()  # a broken loop (e.g. lost DB) stops its siblings too
+            raise
+
+    def _claim_and_run(self, budget: threading.Semaphore | None, exit_when_idle: bool) -> None:
+        while not self._stop.is_set():
+            if budget is not None and not budget.acquire(blocking=False):
+                return
+            with self.session_factory() as db:
+                task_id = claim_next(db, self.worker_id, lease_seconds=self.lease_seconds, project_id=self.project_id)
+            if task_id is None:
+                if budget is not None:
+                    budget.release()
+                if exit_when_idle and not self._active:
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            with self._active_lock:
+                self._active.add(task_id)
+            try:
+                outcome = run_claimed_task(
+                    task_id,
+                    agent_factory=self.agent_factory,
+                    session_factory=self.session_factory,
+                    owner=self.worker_id,
+                )
+            finally:
+                with self._active_lock:
+                    self._active.discard(task_id)
+            self.stats.add(outcome.status)
+            if outcome.status == FAILED:
+                with self.session_factory() as db:
+                    self.stats.blocked += fail_blocked(db, project_id=self.project_id)
+
+    def _sweep(self) -> None:
+        with self.session_factory() as db:
+            self.stats.requeued += requeue_expired(db, max_attempts=self.max_attempts)[0]
+            self.stats.blocked += fail_blocked(db, project_id=self.project_id)
+
+    def _heartbeat(self, report: Callable[[WorkerStats], None] | None, report_interval: float) -> None:
+        # Renew our leases and sweep expired ones well within a lease period.
+        interval = self.lease_seconds / 3
+        tick = min(interval, report_interval) if report else interval
+        last_beat = last_report = time.perf_counter()
+        while not self._stop.wait(tick):
+            now = time.perf_counter()
+            if now - last_beat >= interval:
+                with self._active_lock:
+                    active = list(self._active)
+                # One failed beat (e.g. a dropped connection) must not end the
+                # thread, or our leases lapse while the tasks are still running.
+                try:
+                    with self.session_factory() as db:
+                        renew_leases(db, self.worker_id, active, lease_seconds=self.lease_seconds)
+                    self._sweep()
+                except Exception as exc:
+                    print(f"[worker] ⚠️  Heartbeat failed: {exc}")
+                last_beat = now
+            if report and now - last_report >= report_interval:
+                report(self.stats)
+                last_report = now
@@ -0,0 +1,39 @@
+"""Shared fixtures: fresh ``mimi3.agents.base`` state and a fake Ollama server."""
+import pytest
+from ollama import Client as OllamaClient
+from mimi3.agents import base
+from mimi3.llm.health import HealthRegistry
+from mimi3.llm.lifecycle import ModelManager
+from mimi3.llm.pool import AsyncClientPool
+from mimi3.llm.singleflight import SingleFlight
+from mimi3.llm.telemetry import Telemetry
+from mimi3.settings import settings
+from .fake_ollama import FakeOllama
+
+@pytest.fixture
+def llm_state(monkeypatch):
+    """Replace every module-level LLM global of ``base`` with a fresh one; optional features are off."""
+    monkeypatch.setattr(base, "_ollama", None)
+    monkeypatch.setattr(base, "_async_pool", AsyncClientPool(default_host=settings.ollama_host))
+    monkeypatch.setattr(base, "_health", HealthRegistry())
+    monkeypatch.setattr(base, "_models", ModelManager())
+    monkeypatch.setattr(base, "_telemetry", Telemetry(persist=False))
+    monkeypatch.setattr(base, "_flights", SingleFlight())
+    monkeypatch.setattr(base, "_hosts", None)
+    monkeypatch.setattr(base, "_admission", None)
+    monkeypatch.setattr(base, "_batcher", None)
+
+@pytest.fixture
+def behaviours() -> dict[str, dict]:
+    """Per-model FakeOllama behaviours; override this fixture in a module or parametrise it."""
+    return {}
+
+@pytest.fixture
+def fake(llm_state, behaviours, monkeypatch):
+    """A FakeOllama server that every ``base`` call goes to."""
+    with FakeOllama(behaviours) as server:
+        client = OllamaClient(host=server.url)
+        monkeypatch.setattr(base, "_ollama", client)
+        monkeypatch.setattr(base, "_models", ModelManager(client))
+        monkeypatch.setattr(base, "_async_pool", AsyncClientPool(default_host=server.url, max_concurrency=8))
+        yield server
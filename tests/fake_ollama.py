@@ -0,0 +1,119 @@
+"""Minimal in-process stand-in for the Ollama HTTP API used by the tests."""
+from __future__ import annotations
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def dead_url() -> str:
+    """URL of a local port nothing listens on."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+class FakeOllama:
+    """Serve ``/api/generate``, ``/api/embed``, ``/api/ps`` and ``/api/tags`` from a background thread.
+
+    ``behaviours`` maps a model name to ``{"delay": seconds, "fail": bool,
+    "response": str, "token_delay": seconds, "load_delay": seconds}``;
+    unknown models answer immediately with ``"<model>: ok"``. A model
+    pays ``load_delay`` on its first request (reported as ``load_duration``)
+    and is then listed by ``/api/ps``; an empty prompt only loads it.
+    Streaming requests receive the response as NDJSON, one
+    whitespace-separated token per line. Embedding requests get
+    ``[len(text), 1.0]`` per input. Non-streamed completions return a
+    ``context`` extending the request's with the request number.
+    Every request body is appended to ``requests``. If ``models`` is
+    given, only those are listed by ``/api/tags`` and other models answer
+    404.
+    """
+
+    def __init__(self, behaviours: dict[str, dict] | None = None, models: list[str] | None = None) -> None:
+        self.behaviours = behaviours or {}
+        self.models = models
+        self.requests: list[dict] = []
+        self.loaded: set[str] = set()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path == "/api/tags":
+                    names = fake.models if fake.models is not None else sorted(fake.behaviours)
+                    self._send(200, {"models": [{"name": m, "model": m, "size": 0} for m in names]})
+                    return
+                running = [{"name": m, "model": m, "size": 0, "size_vram": 0} for m in sorted(fake.loaded)]
+                self._send(200, {"models": running})
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+                fake.requests.append(body)
+                model = body.get("model", "")
+                spec = fake.behaviours.get(model, {})
+                if fake.models is not None and model not in fake.models:
+                    self._send(404, {"error": f"model '{model}' not found"})
+                    return
+                if spec.get("fail"):
+                    time.sleep(spec.get("delay", 0))
+                    self._send(500, {"error": f"{model} unavailable"})
+                    return
+                load = 0.0 if model in fake.loaded else spec.get("load_delay", 0.0)
+                time.sleep(load)
+                fake.loaded.add(model)
+                timings = {"load_duration": int(load * 1e9) + 1000}
+                if self.path == "/api/generate" and body.get("prompt") == "":
+                    self._send(200, {"model": model, "response": "", "done": True, "done_reason": "load", **timings})
+                    return
+                time.sleep(spec.get("delay", 0))
+                timings["eval_duration"] = int(spec.get("delay", 0) * 1e9) + 1000
+                if self.path == "/api/embed":
+                    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+                    self._send(200, {"model": model, "embeddings": [[float(len(t)), 1.0] for t in inputs]})
+                    return
+                text = spec.get("response", f"{model}: ok")
+                if body.get("stream"):
+                    self._stream(model, text, spec.get("token_delay", 0), timings)
+                    return
+                context = body.get("context", []) + [len(fake.requests)]
+                self._send(200, {"model": model, "response": text, "done": True, "context": context, **timings})
+
+            def _stream(self, model: str, text: str, token_delay: float, timings: dict) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                tokens = text.split(" ")
+                for i, token in enumerate(tokens):
+                    piece = token if i == 0 else " " + token
+                    self.wfile.write(json.dumps({"model": model, "response": piece, "done": False}).encode() + b"\n")
+                    self.wfile.flush()
+                    time.sleep(token_delay)
+                final = {"model": model, "response": "", "done": True, "eval_count": len(tokens), **timings}
+                self.wfile.write(json.dumps(final).encode() + b"\n")
+
+            def _send(self, status: int, payload: dict) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeOllama":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,104 @@
+"""Admission control: concurrency limits, token budgets and priority classes."""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from pydantic import ValidationError
+from mimi3.agents import base
+from mimi3.agents.base import MultiModelAgent
+from mimi3.llm.admission import AdmissionController, Overloaded
+from mimi3.settings import Settings, settings
+
+def _wait_for(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def test_higher_priority_is_admitted_first():
+    control = AdmissionController(model_concurrency=1)
+    held = control.acquire("m", "h")
+    order = []
+
+    def call(priority):
+        with control.slot("m", "h", priority=priority):
+            order.append(priority)
+
+    threads = []
+    for priority in ("low", "normal", "high"):
+        threads.append(threading.Thread(target=call, args=(priority,)))
+        threads[-1].start()
+        _wait_for(lambda: control.metrics()["model:m"]["waiting"] == len(threads))
+    # Another model is not held back by the queue for "m".
+    with control.slot("other", "h"):
+        pass
+    control.release(held)
+    for t in threads:
+        t.join()
+    assert order == ["high", "normal", "low"]
+    with pytest.raises(ValueError):
+        control.acquire("m", "h", priority="urgent")
+
+def test_timeout_raises_overloaded_for_the_blocking_scope():
+    control = AdmissionController(host_concurrency=1, timeout=0.05)
+    held = control.acquire("a", "gpu1")
+    with pytest.raises(Overloaded) as info:
+        control.acquire("b", "gpu1")
+    assert info.value.scope == "host:gpu1" and info.value.host
+    control.acquire("b", "gpu2")  # other hosts are unaffected
+    control.release(held)
+    stats = control.metrics()
+    assert stats["host:gpu1"]["rejected"] == 1 and stats["host:gpu1"]["active"] == 0
+    assert 'mimi3_admission_rejected{scope="host:gpu1"} 1' in control.render()
+
+def test_token_bucket_paces_calls_and_settles_actual_usage():
+    control = AdmissionController(token_rate=100, token_burst=100)
+    first = control.acquire("m", "h", tokens=100)
+    first.settle({"prompt_eval_count": 10, "eval_count": 10})
+    control.release(first)  # 80 tokens refunded
+    control.release(control.acquire("m", "h", tokens=150))  # admitted on credit: level is now about -70
+    start = time.perf_counter()
+    control.release(control.acquire("m", "h", tokens=1))
+    assert 0.5 < time.perf_counter() - start < 1.2
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    control = AdmissionController(model_concurrency=1)
+
+    async def main():
+        async with control.aslot("m", "h"):
+            waiter = asyncio.ensure_future(control.aacquire("m", "h"))
+            await asyncio.sleep(0.02)
+            assert control.metrics()["model:m"]["waiting"] == 1
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            assert control.metrics()["model:m"]["waiting"] == 0
+        async with control.aslot("m", "h", priority="high"):
+            pass
+
+    asyncio.run(main())
+    assert control.metrics()["model:m"]["active"] == 0
+
+@pytest.fixture
+def behaviours():
+    return {"slow": {"delay": 0.3}}
+
+def test_saturated_host_stops_the_fallback_chain(fake, monkeypatch):
+    monkeypatch.setattr(base, "_admission", AdmissionController(host_concurrency=1, timeout=0.1))
+    monkeypatch.setattr(settings, "llm_priorities", {"Reviewer": "low"})
+    builder = MultiModelAgent(name="B", role="Builder", goal="g", backstory="b", models=["slow"])
+    reviewer = MultiModelAgent(name="R", role="Reviewer", goal="g", backstory="b", models=["slow", "other"])
+    assert builder.priority_class == "normal" and reviewer.priority_class == "low"
+    with pytest.raises(ValidationError):
+        MultiModelAgent(name="U", role="r", goal="g", backstory="b", models=["slow"], priority="urgent")
+    with pytest.raises(ValidationError):
+        Settings(llm_priorities={"Reviewer": "urgent"})
+
+    busy = threading.Thread(target=builder.run, args=(SimpleNamespace(compile_prompt=lambda *a, **k: "build"),))
+    busy.start()
+    _wait_for(lambda: base._admission.metrics().get(f"host:{settings.ollama_host}", {}).get("active") == 1)
+    with pytest.raises(Overloaded):
+        reviewer.run(SimpleNamespace(compile_prompt=lambda *a, **k: "review"))
+    busy.join()
+    assert [r["prompt"] for r in fake.requests] == ["build"]  # "other" was never tried
+    assert base._health.get("slow").error_rate == 0
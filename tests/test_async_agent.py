@@ -0,0 +1,46 @@
+"""MultiModelAgent.arun against a fake Ollama server."""
+import asyncio
+import time
+from types import SimpleNamespace
+import pytest
+from mimi3.agents import base
+from mimi3.agents.base import MultiModelAgent
+from mimi3.llm.pool import AsyncClientPool
+
+TASK = SimpleNamespace(compile_prompt=lambda *args, **kwargs: "Say hi")
+
+@pytest.fixture
+def fake(fake, monkeypatch):
+    monkeypatch.setattr(base, "_async_pool", AsyncClientPool(default_host=fake.url, max_concurrency=2))
+    return fake
+
+def _agent(*models):
+    return MultiModelAgent(name="Async", role="tester", goal="test", backstory="none", models=list(models))
+
+def test_arun_falls_back_to_next_model(fake):
+    fake.behaviours = {"broken": {"fail": True}, "good": {"response": "hello"}}
+    assert asyncio.run(_agent("broken", "good").arun(TASK)) == "hello"
+    assert [r["model"] for r in fake.requests] == ["broken", "good"]
+
+def test_arun_race_returns_first_success(fake):
+    fake.behaviours = {"slow": {"delay": 1.0}, "broken": {"fail": True}, "fast": {"delay": 0.05}}
+    start = time.perf_counter()
+    result = asyncio.run(_agent("slow", "broken", "fast").arun(TASK, policy="race"))
+    assert result == "fast: ok"
+    assert time.perf_counter() - start < 0.9
+
+def test_arun_race_all_fail(fake):
+    fake.behaviours = {"a": {"fail": True}, "b": {"fail": True}}
+    with pytest.raises(RuntimeError):
+        asyncio.run(_agent("a", "b").arun(TASK, policy="race"))
+
+def test_pool_bounds_concurrency_per_host(fake):
+    fake.behaviours = {"m": {"delay": 0.2}}
+
+    async def fan_out():
+        return await asyncio.gather(*(base._async_pool.generate(model="m", prompt="x") for _ in range(4)))
+
+    start = time.perf_counter()
+    assert len(asyncio.run(fan_out())) == 4
+    # Two slots for four 0.2s requests means at least two rounds.
+    assert time.perf_counter() - start >= 0.4
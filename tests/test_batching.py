@@ -0,0 +1,130 @@
+"""Per-model request batching shared by all agents."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+from mimi3.agents import base
+from mimi3.agents.base import MultiModelAgent
+from mimi3.llm.batching import Batcher
+
+class Recorder:
+    """``send`` that sleeps and remembers how many calls overlapped."""
+
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.sent: list[str] = []
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, *, model: str, prompt: str) -> dict:
+        with self.lock:
+            self.sent.append(prompt)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        self.gate.wait()
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if prompt == "bad":
+            raise ValueError("bad prompt")
+        return {"response": f"{model}:{prompt}"}
+
+def test_requests_are_batched_up_to_parallelism():
+    send = Recorder()
+    batcher = Batcher(send, max_batch=4, max_wait=0.02, parallelism=2)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: batcher(model="m", prompt=str(i)), range(8)))
+    assert results == [{"response": f"m:{i}"} for i in range(8)]
+    assert send.peak == 2
+    stats = batcher.metrics()["m"]
+    assert stats["requests"] == 8 and stats["mean_batch"] > 1 and stats["in_flight"] == 0
+    assert "mimi3_batch_mean_size" in batcher.render()
+    with pytest.raises(ValueError):
+        batcher(model="m", prompt="bad")
+    batcher.close()
+
+def test_full_batch_does_not_wait_for_the_window():
+    batcher = Batcher(Recorder(delay=0), max_batch=3, max_wait=1.0, parallelism=3)
+    start = time.perf_counter()
+    futures = [batcher.submit(model="m", prompt=str(i)) for i in range(3)]
+    assert [f.result(timeout=2)["response"] for f in futures] == ["m:0", "m:1", "m:2"]
+    assert time.perf_counter() - start < 0.5
+
+def test_cancelled_requests_are_not_sent():
+    send = Recorder(delay=0)
+    send.gate.clear()
+    batcher = Batcher(send, max_batch=1, max_wait=0, parallelism=1)
+    first = batcher.submit(model="m", prompt="first")
+    time.sleep(0.05)  # first holds the only slot
+    second = batcher.submit(model="m", prompt="second")
+    assert second.cancel()
+    send.gate.set()
+    assert first.result(timeout=2)["response"] == "m:first"
+    time.sleep(0.05)
+    assert send.sent == ["first"]
+
+@pytest.fixture
+def behaviours():
+    return {"slow": {"delay": 0.1}, "broken": {"fail": True}}
+
+@pytest.fixture
+def fake(fake, monkeypatch):
+    batcher = Batcher(base._send, max_batch=4, max_wait=0.01, parallelism=4)
+    monkeypatch.setattr(base, "_batcher", batcher)
+    yield fake
+    batcher.close()
+
+def test_agents_share_the_model_queue(fake):
+    agents = [
+        MultiModelAgent(name=f"Batch {i}", role="r", goal="g", backstory="b", models=["broken", "slow"], routing="static")
+        for i in range(4)
+    ]
+    tasks = [SimpleNamespace(compile_prompt=lambda *a, i=i, **k: f"prompt {i}") for i in range(4)]
+
+    async def main():
+        return await asyncio.gather(*(a.arun(t) for a, t in zip(agents, tasks)))
+
+    start = time.perf_counter()
+    assert asyncio.run(main()) == ["slow: ok"] * 4
+    assert time.perf_counter() - start < 0.35  # four 0.1 s calls sent together
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(lambda p: p[0].run(p[1]), zip(agents, tasks))) == ["slow: ok"] * 4
+
+    stats = base._batcher.metrics()
+    assert stats["slow"]["requests"] == 8 and stats["broken"]["requests"] == 8
+
+def test_batches_are_routed_and_limited_per_host():
+    send = Recorder(delay=0.05)
+    hosts = iter(["a", "b"] * 10)
+    routed: list[tuple[str, str]] = []
+
+    def send_to(*, model, host, prompt):
+        routed.append((host, prompt))
+        return send(model=model, prompt=prompt)
+
+    batcher = Batcher(send_to, max_batch=2, max_wait=0.02, parallelism=2, route=lambda model: next(hosts))
+    futures = [batcher.submit(model="m", prompt=str(i)) for i in range(4)]
+    assert [f.result(timeout=2)["response"] for f in futures] == [f"m:{i}" for i in range(4)]
+    assert send.peak == 4  # two requests in flight on each host
+    assert sorted(h for h, _ in routed) == ["a", "a", "b", "b"]
+    batcher.close()
+
+def test_routing_error_fails_the_batch_not_the_lane():
+    calls = iter([RuntimeError("no healthy host"), "a", "a", "a"])
+
+    def route(model):
+        host = next(calls)
+        if isinstance(host, Exception):
+            raise host
+        return host
+
+    batcher = Batcher(lambda *, model, host, prompt: {"response": f"{host}:{prompt}"}, max_wait=0.01, route=route)
+    first = batcher.submit(model="m", prompt="lost")
+    with pytest.raises(RuntimeError, match="no healthy host"):
+        first.result(timeout=2)
+    assert batcher(model="m", prompt="next")["response"] == "a:next"
+    batcher.close()
@@ -0,0 +1,36 @@
+"""Async CRUD helpers and AsyncMemoryTool on aiosqlite."""
+import asyncio
+import uuid
+from mimi3 import database
+from mimi3.crud_async import create_role, create_model, create_agent, create_project, create_task
+from mimi3.database import AsyncSessionLocal, dispose_async_engine, init_db_async
+from mimi3.tools.memory_async import AsyncMemoryTool
+
+def test_async_crud_and_memory_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.settings, "test_database_url", f"sqlite:///{tmp_path / 'async.db'}")
+
+    async def scenario():
+        await init_db_async()
+        try:
+            async with AsyncSessionLocal() as db:
+                unique_id = str(uuid.uuid4())[:8]
+                role = await create_role(db, name=f"AsyncRole-{unique_id}")
+                models = [await create_model(db, name=f"model{i}-{unique_id}") for i in range(2)]
+                agent = await create_agent(db, name=f"AsyncAgent-{unique_id}", role=role, models_=models)
+                project = await create_project(db, name=f"AsyncProject-{unique_id}", goal="Testing")
+                task = await create_task(db, project=project, title=f"AsyncTask-{unique_id}", agents=[agent])
+                assert agent.id and task.id
+                assert len(agent.models) == 2
+                assert agent in task.agents
+
+                mem = AsyncMemoryTool(db)
+                await mem.save(agent_id=agent.id, task_id=task.id, content="first")
+                await mem.save_many({"agent_id": agent.id, "task_id": task.id, "content": f"bulk-{i}"} for i in range(3))
+                recall = await mem.recall(agent_id=agent.id, task_id=task.id, limit=2)
+                assert recall == ["bulk-2", "bulk-1"]
+                streamed = [c async for c in mem.recall_iter(agent_id=agent.id, task_id=task.id, page_size=3)]
+                assert streamed == ["bulk-2", "bulk-1", "bulk-0", "first"]
+        finally:
+            await dispose_async_engine()
+
+    asyncio.run(scenario())
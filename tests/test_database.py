@@ -0,0 +1,30 @@
+"""Engine factory, lazy engine creation and pool metrics."""
+from sqlalchemy import text
+from mimi3 import database
+from mimi3.database import make_engine, pool_status
+from mimi3.settings import Settings
+
+def test_sqlite_engine_uses_wal_and_instrumented_pool(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'wal.db'}", cfg=Settings(db_pool_size=2, db_max_overflow=1))
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert engine.pool.checkedout() == 1
+    assert engine.pool.size() == 2
+    assert engine.pool.metrics.checkouts == 1
+    engine.dispose()
+
+def test_engine_is_created_lazily_and_reports_pool_status(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.settings, "test_database_url", f"sqlite:///{tmp_path / 'lazy.db'}")
+    database.reset_engine()
+    try:
+        assert database._engine is None
+        with database.SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+        assert str(database.engine.url).endswith("lazy.db")
+        status = pool_status()
+        assert status["checkouts"] >= 1
+        assert status["checked_out"] == 0
+    finally:
+        monkeypatch.undo()
+        database.reset_engine()
@@ -0,0 +1,115 @@
+"""Balancing MultiModelAgent calls over several Ollama hosts."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from types import SimpleNamespace
+import pytest
+from mimi3.agents import base
+from mimi3.agents.base import MultiModelAgent
+from mimi3.llm.batching import Batcher
+from mimi3.llm.hosts import HostPool
+from mimi3.llm.pool import AsyncClientPool
+from .fake_ollama import FakeOllama, dead_url
+
+TASK = SimpleNamespace(compile_prompt=lambda *args, **kwargs: "Balance me")
+
+@pytest.fixture
+def servers(llm_state, monkeypatch):
+    with ExitStack() as stack:
+        fakes = [stack.enter_context(FakeOllama({"m": {"delay": 0.1}})) for _ in range(3)]
+        monkeypatch.setattr(base, "_async_pool", AsyncClientPool(default_host=fakes[0].url, max_concurrency=4))
+        yield fakes
+
+def _use(monkeypatch, urls, **kwargs) -> HostPool:
+    pool = HostPool(urls, **kwargs)
+    monkeypatch.setattr(base, "_hosts", pool)
+    return pool
+
+def _agent(*models: str, **kwargs) -> MultiModelAgent:
+    return MultiModelAgent(
+        name="Balanced", role="r", goal="g", backstory="b", models=list(models), routing="static", **kwargs
+    )
+
+def test_least_outstanding_spreads_concurrent_calls(servers, monkeypatch):
+    _use(monkeypatch, [s.url for s in servers])
+    agent = _agent("m", single_flight=False)  # identical prompts would otherwise share one call
+    with ThreadPoolExecutor(6) as pool:
+        assert list(pool.map(lambda _: agent.run(TASK), range(6))) == ["m: ok"] * 6
+    assert [len(s.requests) for s in servers] == [2, 2, 2]
+
+    async def main():
+        return await asyncio.gather(*(agent.arun(TASK) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["m: ok"] * 3
+    assert [len(s.requests) for s in servers] == [3, 3, 3]
+    assert "".join(agent.stream(TASK)) == "m: ok"
+    assert all(h["outstanding"] == 0 for h in base._hosts.metrics().values())
+
+def test_unreachable_host_fails_over_and_is_skipped(servers, monkeypatch):
+    dead = dead_url()
+    pool = _use(monkeypatch, [dead, servers[0].url], failure_threshold=2)
+    agent = _agent("m")
+    for _ in range(4):
+        assert agent.run(TASK) == "m: ok"
+    stats = pool.metrics()
+    assert stats[dead]["up"] == 0 and stats[dead]["failures"] == 2
+    assert stats[servers[0].url]["calls"] == 4
+    assert 'mimi3_host_up{host="' + dead + '"} 0' in pool.render()
+    assert pool.refresh()[dead] is None
+
+def test_batches_go_to_one_host_each(servers, monkeypatch):
+    pool = _use(monkeypatch, [s.url for s in servers[:2]])
+    batcher = Batcher(base._send, max_batch=2, max_wait=0.05, parallelism=2, route=pool.pick)
+    monkeypatch.setattr(base, "_batcher", batcher)
+    agent = _agent("m", single_flight=False)
+    with ThreadPoolExecutor(4) as executor:
+        assert list(executor.map(lambda _: agent.run(TASK), range(4))) == ["m: ok"] * 4
+    batcher.close()
+    assert [len(s.requests) for s in servers] == [2, 2, 0]
+    assert batcher.metrics()["m"]["batches"] == 2
+
+def test_inventory_routes_models_to_hosts_that_have_them(llm_state, monkeypatch):
+    with FakeOllama(models=["small"]) as a, FakeOllama(models=["small", "big:7b"]) as b:
+        pool = _use(monkeypatch, [a.url, b.url])
+        # Before the inventory is known a 404 moves the call to the other host.
+        assert _agent("big:7b").run(TASK) == "big:7b: ok"
+        assert pool.refresh() == {a.url: ["small:latest"], b.url: ["big:7b", "small:latest"]}
+        a.requests.clear()
+        for _ in range(3):
+            _agent("big:7b").run(TASK)
+        assert a.requests == [] and len(b.requests) == 4
+
+def test_latency_strategy_prefers_the_faster_host(llm_state, monkeypatch):
+    with FakeOllama({"m": {"delay": 0.15}}) as slow, FakeOllama({"m": {"delay": 0.0}}) as fast:
+        _use(monkeypatch, [slow.url, fast.url], strategy="latency")
+        agent = _agent("m")
+        for _ in range(6):
+            agent.run(TASK)
+        assert len(slow.requests) == 1 and len(fast.requests) == 5
+
+def test_latency_strategy_costs_unmeasured_and_failing_hosts():
+    pool = HostPool(["http://a", "http://b", "http://c"], strategy="latency", client_factory=lambda url: url)
+    a, b, c = pool.hosts
+    pool.release(pool.choose("m", exclude=[b.url, c.url]), "m", latency=0.1)
+    # Unmeasured hosts cost the pool's mean, not nothing, and take turns with the measured one.
+    assert {pool.choose("m").url for _ in range(3)} == {a.url, b.url, c.url}
+    for h in pool.hosts:
+        h.outstanding = 0
+    # A host that fails fast with a model error stops winning.
+    for _ in range(5):
+        pool.release(pool.choose("m", exclude=[a.url, c.url]), "m", error=RuntimeError("500 internal error"))
+    assert b.url not in {pool.choose("m").url for _ in range(4)}
+    assert pool.metrics()[b.url]["error_rate"] > 0.5
+
+def test_choose_claims_a_half_open_probe_only_on_the_chosen_host():
+    pool = HostPool(["http://a", "http://b"], failure_threshold=1, reset_timeout=0.05, client_factory=lambda url: url)
+    a, b = pool.hosts
+    a.breaker.record_failure()
+    time.sleep(0.06)  # a is half-open now
+    a.outstanding = 5
+    assert pool.choose("m") is b
+    assert a.breaker.ready()  # looking at a did not use up its probe
+    a.outstanding = 0
+    assert pool.choose("m") is a
+    assert not a.breaker.ready()
@@ -0,0 +1,56 @@
+"""Import-time regression checks (``python -X importtime``).
+
+Each import runs in a fresh interpreter so modules already loaded by the
+test session do not hide a regression.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+HEAVY = {"crewai", "ollama", "sqlalchemy", "numpy", "httpx"}
+
+def _imported(statement: str) -> dict[str, int]:
+    """Top-level package -> cumulative microseconds of its slowest import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(SRC)},
+        check=True,
+    )
+    found: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            package = name.strip().split(".")[0]
+            found[package] = max(found.get(package, 0), int(cumulative))
+    return found
+
+@pytest.mark.parametrize("statement", ["import mimi3", "import ma_framework", "import mimi3.cli"])
+def test_entry_points_do_not_import_heavy_dependencies(statement):
+    assert not HEAVY & set(_imported(statement))
+
+def test_cli_imports_quickly():
+    # Measured at ~60 ms; the eager version took ~700 ms before CrewAI.
+    assert _imported("import mimi3.cli")["mimi3"] < 400_000
+
+def test_agents_defer_the_ollama_client():
+    imported = _imported("import mimi3.agents.base")
+    assert "crewai" in imported and "ollama" not in imported
+
+def test_legacy_alias_resolves_lazily():
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, ma_framework, mimi3; assert 'mimi3.models' not in sys.modules; "
+            "import ma_framework.models, ma_framework.tools.memory; "
+            "assert ma_framework.models is mimi3.models and ma_framework.crud is mimi3.crud; "
+            "assert ma_framework.tools.memory is sys.modules['mimi3.tools.memory']",
+        ],
+        env={**os.environ, "PYTHONPATH": str(SRC)},
+        check=True,
+    )
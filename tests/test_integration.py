@@ -2,12 +2,17 @@
 import uuid
 import pytest
 from mimi3.database import init_db, SessionLocal
+from mimi3 import models
 from mimi3.crud import (
     create_role,
     create_model,
     create_agent,
     create_project,
     create_task,
+    create_agents_bulk,
+    create_tasks_bulk,
+    assign_agents_bulk,
+    unit_of_work,
 )
 
 @pytest.mark.parametrize("llm_count", [1, 2])
@@ -26,3 +31,39 @@ def test_agent_multimodel(llm_count):
         task = create_task(db, project=project, title=f"DemoTask-{llm_count}-{unique_id}", agents=[agent])
 
         assert agent in task.agents
+
+def test_bulk_seeding_in_one_unit_of_work():
+    init_db()
+    with SessionLocal() as db:
+        unique_id = str(uuid.uuid4())[:8]
+        with unit_of_work(db):
+            role = create_role(db, name=f"BulkRole-{unique_id}")
+            model = create_model(db, name=f"bulk-model-{unique_id}")
+            agents = create_agents_bulk(
+                db,
+                [{"name": f"BulkAgent-{i}-{unique_id}", "role": role, "models_": [model]} for i in range(3)],
+            )
+            project = create_project(db, name=f"BulkProject-{unique_id}", goal="Seed")
+            tasks = create_tasks_bulk(
+                db,
+                project=project,
+                tasks=[{"title": f"BulkTask-{i}-{unique_id}", "agents": agents[:1]} for i in range(5)],
+            )
+            assert [t.title for t in tasks] == [f"BulkTask-{i}-{unique_id}" for i in range(5)]
+            assign_agents_bulk(db, [(tasks[0], agents[1]), (tasks[0].id, agents[2].id)])
+
+        assert all(a.id for a in agents)
+        assert tasks[0].status == "pending"
+        assert {a.name for a in tasks[0].agents} == {a.name for a in agents}
+        assert agents[0].models == [model]
+        assert len(project.tasks) == 5
+
+def test_unit_of_work_rolls_back_on_error():
+    init_db()
+    with SessionLocal() as db:
+        unique_id = str(uuid.uuid4())[:8]
+        with pytest.raises(RuntimeError):
+            with unit_of_work(db):
+                create_role(db, name=f"Doomed-{unique_id}")
+                raise RuntimeError("boom")
+        assert db.query(models.Role).filter_by(name=f"Doomed-{unique_id}").count() == 0
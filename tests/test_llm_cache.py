@@ -0,0 +1,65 @@
+"""Completion cache tiers and MultiModelAgent wiring."""
+import time
+from types import SimpleNamespace
+import pytest
+from mimi3.agents.base import MultiModelAgent
+from mimi3.database import init_db, SessionLocal
+from mimi3.llm.cache import CompletionCache, LRUCache, SQLCache, TieredCache, cache_key
+
+TASK = SimpleNamespace(compile_prompt=lambda *args, **kwargs: "Review this")
+
+def test_cache_key_is_stable_and_option_sensitive():
+    assert cache_key("m", "p", {"a": 1, "b": 2}) == cache_key("m", "p", {"b": 2, "a": 1})
+    assert cache_key("m", "p", {"temperature": 0}) != cache_key("m", "p", {"temperature": 0.5})
+    assert cache_key("m", "p") != cache_key("n", "p")
+
+def test_lru_size_and_ttl_eviction():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # "a" is now most recently used
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.stats.evictions == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    short = LRUCache(ttl=0.01)
+    short.set("k", "v")
+    time.sleep(0.02)
+    assert short.get("k") is None
+
+def test_sql_cache_and_tiering():
+    init_db()
+    sql = SQLCache(SessionLocal, max_entries=2, trim_every=3)
+    sql.clear()
+    for key in ("k1", "k2", "k3"):
+        sql.set(key, f"value-{key}", model="m")
+        time.sleep(0.001)
+    assert sql.get("k1") is None  # trimmed on the third write
+    assert sql.get("k3") == "value-k3"
+    sql.set("k4", "value-k4", model="m")
+    assert sql.get("k2") == "value-k2"  # over the limit until the next trim
+
+    lru = LRUCache()
+    tiered = TieredCache(lru, sql)
+    assert tiered.get("k2") == "value-k2"
+    assert lru.get("k2") == "value-k2"  # back-filled from the SQL tier
+    sql.clear()
+    with pytest.raises(TypeError):
+        CompletionCache()
+
+def test_agent_skips_model_for_cached_deterministic_calls(fake):
+    cache = LRUCache()
+    agent = MultiModelAgent(
+        name="Cached", role="reviewer", goal="review", backstory="none",
+        models=["m"], options={"temperature": 0}, completion_cache=cache,
+    )
+    assert agent.run(TASK) == "m: ok"
+    assert agent.run(TASK) == "m: ok"
+    assert len(fake.requests) == 1
+    assert cache.stats.hits == 1
+
+    agent.options = {"temperature": 0.7}
+    agent.run(TASK)
+    agent.run(TASK)
+    assert len(fake.requests) == 3
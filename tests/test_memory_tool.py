@@ -1,8 +1,12 @@
 """MemoryTool round‑trip tests."""
 import uuid
+import pytest
+from sqlalchemy import select
+from mimi3 import models
 from mimi3.database import init_db, SessionLocal
 from mimi3.crud import create_role, create_agent, create_model, create_project, create_task
 from mimi3.tools.memory import MemoryTool
+from mimi3.tools.compaction import MemoryCompactor, compact
 
 def test_memory_tool_roundtrip():
     init_db()
@@ -21,3 +25,154 @@ def test_memory_tool_roundtrip():
         recall = mem.recall(agent_id=agent.id, task_id=task.id)
         assert recall[0] == "Second message"
         assert recall[-1] == "Hello memory!"
+
+def test_memory_tool_save_many_and_buffered():
+    init_db()
+    with SessionLocal() as db:
+        unique_id = str(uuid.uuid4())[:8]
+        role = create_role(db, name=f"BulkRole-{unique_id}")
+        model = create_model(db, name=f"llama3-{unique_id}")
+        agent = create_agent(db, name=f"BulkAgent-{unique_id}", role=role, models_=[model])
+        project = create_project(db, name=f"BulkProject-{unique_id}", goal="Testing")
+        task = create_task(db, project=project, title=f"BulkTask-{unique_id}")
+
+        mem = MemoryTool(db)
+        written = mem.save_many(
+            {"agent_id": agent.id, "task_id": task.id, "content": f"bulk-{i}"} for i in range(5)
+        )
+        assert written == 5
+        assert mem.save_many([]) == 0
+
+        with mem.buffered(max_size=3, flush_interval=60) as writer:
+            for i in range(4):
+                writer.save(agent_id=agent.id, task_id=task.id, content=f"buffered-{i}")
+            # Size threshold flushed the first three, one is still pending.
+            assert len(writer) == 1
+
+        recall = mem.recall(agent_id=agent.id, task_id=task.id, limit=100)
+        assert len(recall) == 9
+        assert recall[0] == "buffered-3"
+
+class FlakyMemoryTool(MemoryTool):
+    """Fails its first ``save_many`` as a lost connection would."""
+
+    failed = False
+
+    def save_many(self, entries) -> int:
+        if not self.failed:
+            self.failed = True
+            self.db.rollback()
+            raise ConnectionError("database went away")
+        return super().save_many(entries)
+
+def test_buffered_writer_keeps_entries_when_a_flush_fails():
+    init_db()
+    with SessionLocal() as db:
+        agent, task = _memory_fixture(db, "Flaky")
+        tool = FlakyMemoryTool(db)
+        writer = tool.buffered(max_size=10, flush_interval=60)
+        writer.save(agent_id=agent.id, task_id=task.id, content="first")
+        writer.save(agent_id=agent.id, task_id=task.id, content="second")
+        with pytest.raises(ConnectionError):
+            writer.flush()
+        assert len(writer) == 2
+        assert writer.flush() == 2 and len(writer) == 0
+        assert tool.recall(agent_id=agent.id, task_id=task.id, limit=10) == ["second", "first"]
+
+def test_memory_tool_keyset_pagination():
+    init_db()
+    with SessionLocal() as db:
+        unique_id = str(uuid.uuid4())[:8]
+        role = create_role(db, name=f"PageRole-{unique_id}")
+        model = create_model(db, name=f"llama3-{unique_id}")
+        agent = create_agent(db, name=f"PageAgent-{unique_id}", role=role, models_=[model])
+        project = create_project(db, name=f"PageProject-{unique_id}", goal="Testing")
+        task = create_task(db, project=project, title=f"PageTask-{unique_id}")
+
+        mem = MemoryTool(db)
+        # Identical timestamps force the id tie-breaker to do its job.
+        mem.save_many({"agent_id": agent.id, "task_id": task.id, "content": f"m{i}"} for i in range(7))
+
+        page, cursor = mem.recall_page(agent_id=agent.id, task_id=task.id, limit=3)
+        assert page == ["m6", "m5", "m4"]
+        page, cursor = mem.recall_page(agent_id=agent.id, task_id=task.id, limit=3, before=cursor)
+        assert page == ["m3", "m2", "m1"]
+        page, cursor = mem.recall_page(agent_id=agent.id, task_id=task.id, limit=3, before=cursor)
+        assert page == ["m0"]
+        assert cursor is None
+
+        streamed = list(mem.recall_iter(agent_id=agent.id, task_id=task.id, page_size=2))
+        assert streamed == [f"m{i}" for i in reversed(range(7))]
+
+def _memory_fixture(db, prefix: str):
+    unique_id = str(uuid.uuid4())[:8]
+    role = create_role(db, name=f"{prefix}Role-{unique_id}")
+    model = create_model(db, name=f"llama3-{unique_id}")
+    agent = create_agent(db, name=f"{prefix}Agent-{unique_id}", role=role, models_=[model])
+    project = create_project(db, name=f"{prefix}Project-{unique_id}", goal="Testing")
+    task = create_task(db, project=project, title=f"{prefix}Task-{unique_id}")
+    return agent, task
+
+def test_memory_tool_recall_budget():
+    init_db()
+    with SessionLocal() as db:
+        agent, task = _memory_fixture(db, "Budget")
+        mem = MemoryTool(db)
+        # 40 characters is 10 estimated tokens per entry.
+        mem.save_many({"agent_id": agent.id, "task_id": task.id, "content": f"{i:02d}" * 20} for i in range(30))
+
+        recall = mem.recall_budget(agent_id=agent.id, task_id=task.id, max_tokens=35, page_size=2)
+        assert recall == ["29" * 20, "28" * 20, "27" * 20]
+        assert mem.recall_budget(agent_id=agent.id, task_id=task.id, max_tokens=5) == []
+        assert len(mem.recall_budget(agent_id=agent.id, task_id=task.id, max_tokens=10_000)) == 30
+
+def test_memory_compaction_summarises_and_archives():
+    init_db()
+    with SessionLocal() as db:
+        agent, task = _memory_fixture(db, "Compact")
+        seen: list[list[str]] = []
+
+        def summarize(entries):
+            seen.append(entries)
+            return f"summary of {len(entries)}"
+
+        mem = MemoryTool(db, compactor=MemoryCompactor(summarize, max_entries=10, keep_last=4, check_every=5))
+        for i in range(10):
+            mem.save(agent_id=agent.id, task_id=task.id, content=f"m{i}")
+        assert seen == []  # 10 live rows is not over the limit yet
+
+        for i in range(10, 15):
+            mem.save(agent_id=agent.id, task_id=task.id, content=f"m{i}")
+        assert seen == [[f"m{i}" for i in range(11)]]
+        assert mem.recall(agent_id=agent.id, task_id=task.id, limit=100) == [
+            "m14", "m13", "m12", "m11", "summary of 11"
+        ]
+        archived = db.scalars(
+            select(models.MemoryArchive.content).where(models.MemoryArchive.task_id == task.id)
+        ).all()
+        assert sorted(archived) == sorted(f"m{i}" for i in range(11))
+
+        # The next compaction rolls the previous summary in, oldest first.
+        result = compact(db, agent_id=agent.id, task_id=task.id, summarize=summarize, keep_last=1)
+        assert result.archived == 4
+        assert seen[-1] == ["summary of 11", "m11", "m12", "m13"]
+        page, _ = mem.recall_page(agent_id=agent.id, task_id=task.id, limit=10)
+        assert page == ["m14", "summary of 4"]
+        assert compact(db, agent_id=agent.id, task_id=task.id, summarize=summarize, keep_last=1) is None
+
+def test_concurrent_compaction_archives_rows_once():
+    init_db()
+    with SessionLocal() as db:
+        agent, task = _memory_fixture(db, "CompactRace")
+        MemoryTool(db).save_many({"agent_id": agent.id, "task_id": task.id, "content": f"m{i}"} for i in range(6))
+
+        def summarize(entries):
+            # Another worker compacts the same history while this one waits on the LLM.
+            with SessionLocal() as other:
+                assert compact(other, agent_id=agent.id, task_id=task.id, summarize=lambda e: "theirs", keep_last=2)
+            return "ours"
+
+        assert compact(db, agent_id=agent.id, task_id=task.id, summarize=summarize, keep_last=2) is None
+        archived = db.scalars(select(models.MemoryArchive.content).where(models.MemoryArchive.task_id == task.id)).all()
+        assert sorted(archived) == ["m0", "m1", "m2", "m3"]
+        assert MemoryTool(db).recall(agent_id=agent.id, task_id=task.id, limit=10) == ["m5", "m4", "theirs"]
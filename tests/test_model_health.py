@@ -0,0 +1,84 @@
+"""Circuit breakers and health-based model routing."""
+import time
+import uuid
+from types import SimpleNamespace
+import pytest
+from mimi3.agents import base
+from mimi3.agents.base import MultiModelAgent
+from mimi3.crud import create_model
+from mimi3.database import init_db, SessionLocal
+from mimi3.llm.health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, HealthRegistry
+
+TASK = SimpleNamespace(compile_prompt=lambda *args, **kwargs: "Route me")
+
+def test_circuit_breaker_transitions():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.01)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    time.sleep(0.02)
+    assert breaker.ready() and breaker.ready()  # looking does not claim the probe
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # a single probe while half-open
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(0.02)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+def test_registry_orders_by_latency_and_drops_open_breakers():
+    registry = HealthRegistry(failure_threshold=1, reset_timeout=60)
+    for _ in range(5):
+        registry.record("slow", latency=2.0)
+        registry.record("fast", latency=0.1)
+    assert registry.order(["slow", "fast", "new"]) == ["new", "fast", "slow"]
+    assert registry.get("fast").p95 == pytest.approx(0.1)
+
+    registry.record("fast", ok=False)
+    assert registry.order(["slow", "fast"]) == ["slow"]
+    registry.record("slow", ok=False)
+    assert registry.order(["slow", "fast"]) == ["slow", "fast"]
+
+def test_ordering_leaves_the_half_open_probe_to_the_call():
+    registry = HealthRegistry(failure_threshold=1, reset_timeout=0.01)
+    registry.record("flaky", ok=False)
+    time.sleep(0.02)
+    assert registry.order(["flaky", "steady"]) == ["flaky", "steady"]
+    assert registry.order(["flaky", "steady"]) == ["flaky", "steady"]  # still there: nothing was called
+    with registry.track("flaky"):
+        assert registry.order(["flaky", "steady"]) == ["steady"]  # probing
+    assert registry.get("flaky").breaker.state == CLOSED
+
+def test_registry_persists_against_model_rows():
+    init_db()
+    with SessionLocal() as db:
+        unique_id = str(uuid.uuid4())[:8]
+        model = create_model(db, name=f"llama3-{unique_id}", version="8b")
+        registry = HealthRegistry()
+        registry.record(f"llama3-{unique_id}:8b", latency=0.25)
+        assert registry.persist(db, [model]) == 1
+        db.refresh(model)
+        assert model.health.p50_ms == pytest.approx(250)
+
+        fresh = HealthRegistry()
+        assert fresh.load(db) >= 1
+        assert fresh.get(f"llama3-{unique_id}:8b").p50 == pytest.approx(0.25)
+
+@pytest.fixture
+def fake(fake, monkeypatch):
+    monkeypatch.setattr(base, "_health", HealthRegistry(failure_threshold=1, reset_timeout=60))
+    return fake
+
+def test_agent_skips_failing_model_and_prefers_faster(fake):
+    fake.behaviours = {"broken": {"fail": True}, "slow": {"delay": 0.1}, "fast": {}}
+    agent = MultiModelAgent(name="Router", role="r", goal="g", backstory="b", models=["broken", "slow", "fast"])
+    agent.run(TASK)  # broken fails, slow answers
+    agent.run(TASK)  # broken is open; untried fast now beats slow
+    agent.run(TASK)
+    assert [r["model"] for r in fake.requests] == ["broken", "slow", "fast", "fast"]
+
+    agent.routing = "static"
+    agent.run(TASK)
+    assert fake.requests[-1]["model"] == "slow"  # broken still hit first, then fails over
@@ -0,0 +1,81 @@
+"""Model preloading, keep-alive pings and load vs. inference timing."""
+import time
+from types import SimpleNamespace
+import pytest
+from ollama import Client as OllamaClient
+from mimi3.agents import base
+from mimi3.agents.base import MultiModelAgent
+from mimi3.llm.hosts import HostPool
+from mimi3.llm.lifecycle import ModelManager, parse_keep_alive
+from .fake_ollama import FakeOllama, dead_url
+
+TASK = SimpleNamespace(compile_prompt=lambda *args, **kwargs: "Warm me")
+
+def test_parse_keep_alive():
+    assert parse_keep_alive("30m") == 1800
+    assert parse_keep_alive("1h30m") == 5400
+    assert parse_keep_alive("500ms") == 0.5
+    assert parse_keep_alive(90) == 90
+    assert parse_keep_alive("-1") is None and parse_keep_alive(-1) is None
+    assert parse_keep_alive(None) == 300
+    with pytest.raises(ValueError):
+        parse_keep_alive("soon")
+
+@pytest.fixture
+def behaviours():
+    return {"big": {"load_delay": 0.2}, "small": {"load_delay": 0.15}}
+
+@pytest.fixture
+def fake(fake, monkeypatch):
+    monkeypatch.setattr(base, "_models", ModelManager(base._ollama, keep_alive="5m"))
+    return fake
+
+def test_preload_makes_fallback_model_warm(fake):
+    fake.behaviours["small"]["fail"] = True  # primary fails, fallback must be warm already
+    agent = MultiModelAgent(name="Warm", role="r", goal="g", backstory="b", models=["small", "big"], routing="static")
+    loaded = agent.warm_up()
+    assert set(loaded) == {"big"} and loaded["big"] >= 0.2
+    assert base._models.pinned == {"big"} and base._models.is_resident("big")
+
+    start = time.perf_counter()
+    assert agent.run(TASK) == "big: ok"
+    assert time.perf_counter() - start < 0.2  # no load on the critical path
+    stats = base._models.metrics()["big"]
+    assert stats["loads"] == 1 and stats["calls"] == 1  # the preload was not a call
+    assert stats["load_seconds"] == pytest.approx(0.2, abs=0.05)
+    assert stats["inference_seconds"] < stats["load_seconds"]
+
+def test_cold_call_is_timed_as_load(fake):
+    agent = MultiModelAgent(name="Cold", role="r", goal="g", backstory="b", models=["big"])
+    agent.run(TASK)
+    agent.run(TASK)
+    "".join(agent.stream(TASK))
+    stats = base._models.metrics()["big"]
+    assert stats["calls"] == 3 and stats["loads"] == 1
+    assert stats["last_load_seconds"] == pytest.approx(0.2, abs=0.05)
+
+def test_pinger_keeps_pinned_models_loaded_and_refresh_reads_server(fake):
+    manager = ModelManager(OllamaClient(host=fake.url), keep_alive="5m", ping_interval=0.05)
+    manager.preload(["small"])
+    with manager:
+        time.sleep(0.2)
+    pings = [r for r in fake.requests if r.get("model") == "small" and r.get("prompt") == ""]
+    assert len(pings) >= 3 and all(r["keep_alive"] == "5m" for r in pings)
+
+    fake.loaded.add("other")
+    assert manager.refresh() == ["other", "small"]
+    assert not manager.is_resident("big")
+
+def test_preload_warms_every_pool_host():
+    with FakeOllama({"big": {"load_delay": 0.1}}) as a, FakeOllama({"big": {"load_delay": 0.2}}) as b:
+        pool = HostPool([a.url, b.url, dead_url()])
+        manager = ModelManager(keep_alive="5m", hosts=pool.hosts)
+        loaded = manager.preload(["big"])
+        assert loaded["big"] == pytest.approx(0.2, abs=0.05)  # the slowest host
+        assert a.loaded == b.loaded == {"big"} and manager.pinned == {"big"}
+
+        b.loaded.clear()
+        a.loaded.add("other")
+        assert manager.refresh() == ["big", "other"]
+        manager.ping()
+        assert b.loaded == {"big"}
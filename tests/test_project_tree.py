@@ -0,0 +1,62 @@
+"""Eager-loaded project serialisation issues a constant number of queries."""
+import uuid
+from sqlalchemy import event
+from mimi3.crud import (
+    create_role,
+    create_model,
+    create_tool,
+    create_agents_bulk,
+    create_project,
+    create_tasks_bulk,
+    get_project_tree,
+    unit_of_work,
+)
+from mimi3.database import init_db, SessionLocal, get_engine
+
+def _seed(task_count: int) -> int:
+    with SessionLocal() as db, unit_of_work(db):
+        unique_id = str(uuid.uuid4())[:8]
+        role = create_role(db, name=f"TreeRole-{task_count}-{unique_id}")
+        model = create_model(db, name=f"tree-model-{unique_id}")
+        tool = create_tool(db, name=f"TreeTool-{unique_id}", type_="memory")
+        agents = create_agents_bulk(
+            db,
+            [
+                {"name": f"TreeAgent-{i}-{unique_id}", "role": role, "models_": [model], "tools": [tool]}
+                for i in range(3)
+            ],
+        )
+        project = create_project(db, name=f"TreeProject-{unique_id}", goal="Serialise")
+        create_tasks_bulk(db, project=project, tasks=[{"title": f"T{i}", "agents": agents} for i in range(task_count)])
+        return project.id
+
+def _count_queries(project_id: int):
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        with SessionLocal() as db:
+            tree = get_project_tree(db, project_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    return tree, len(statements)
+
+def test_project_tree_query_count_is_constant():
+    init_db()
+    small, small_queries = _count_queries(_seed(2))
+    large, large_queries = _count_queries(_seed(20))
+
+    assert len(small.tasks) == 2 and len(large.tasks) == 20
+    agent = large.tasks[-1].agents[0]
+    assert agent.role.name.startswith("TreeRole-20")
+    assert len(agent.models) == 1 and len(agent.tools) == 1
+    assert small_queries == large_queries == 5
+
+def test_project_tree_missing_project():
+    init_db()
+    with SessionLocal() as db:
+        assert get_project_tree(db, -1) is None
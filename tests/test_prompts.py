@@ -0,0 +1,50 @@
+"""Prompt precompilation, memoisation and Ollama KV reuse fields."""
+from mimi3.agents.base import MultiModelAgent
+from mimi3.llm.prompts import PromptBuilder
+
+class CountingTask:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.compiled = 0
+
+    def compile_prompt(self, *args, **kwargs) -> str:
+        self.compiled += 1
+        return f"{self.text} {kwargs.get('suffix', '')}".strip()
+
+def _agent(*models, **kwargs):
+    return MultiModelAgent(
+        name="Prompt", role="reviewer", goal="review code", backstory="Strict.", models=list(models), **kwargs
+    )
+
+def test_builder_memoises_per_task_and_inputs():
+    builder = PromptBuilder(role="builder", goal="write code", backstory="Loves tests.", maxsize=2)
+    assert builder.system == "You are a builder.\nYour goal: write code\nLoves tests."
+    task, other = CountingTask("a"), CountingTask("b")
+    assert builder.compile(task) == builder.compile(task) == "a"
+    assert builder.compile(task, suffix="x") == "a x"
+    assert task.compiled == 2 and builder.hits == 1
+    builder.compile(other)  # evicts the least recently used entry
+    builder.compile(task)
+    assert task.compiled == 3
+    # Unhashable inputs are compiled every time rather than failing.
+    builder.compile(task, suffix=["x"])
+    builder.compile(task, suffix=["x"])
+    assert task.compiled == 5
+
+def test_run_sends_stable_system_prefix_and_keep_alive(fake):
+    fake.behaviours = {"broken": {"fail": True}}
+    agent = _agent("broken", "good", keep_alive="1h", routing="static")
+    task = CountingTask("Review this")
+    assert agent.run(task) == "good: ok"
+    assert agent.run(task) == "good: ok"
+    assert task.compiled == 1
+    systems = {r["system"] for r in fake.requests}
+    assert systems == {agent.prompts.system}
+    assert all(r["keep_alive"] == "1h" and r["prompt"] == "Review this" for r in fake.requests)
+    assert all("context" not in r for r in fake.requests)
+
+def test_reuse_context_continues_per_model(fake):
+    agent = _agent("good", reuse_context=True)
+    agent.run(CountingTask("first"))
+    agent.run(CountingTask("second"))
+    assert fake.requests[1]["context"] == [1]
@@ -0,0 +1,125 @@
+"""TaskRunner claims pending tasks, runs them concurrently and records results."""
+import asyncio
+import time
+import uuid
+from typing import get_args
+import pytest
+from typer.testing import CliRunner
+from mimi3.cli import RunMode, app
+from mimi3.crud import create_role, create_model, create_agents_bulk, create_project, create_tasks_bulk, unit_of_work
+from mimi3.database import init_db, SessionLocal
+from mimi3.runner import Mode, TaskRunner, execute_task, COMPLETED, FAILED
+from mimi3 import models
+
+class SleepyAgent:
+    def __init__(self, name: str, delay: float = 0.1, fail: bool = False) -> None:
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+
+    def run(self, task) -> str:
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        return f"{self.name}: {task.compile_prompt().splitlines()[1]}"
+
+    async def arun(self, task) -> str:
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        return f"{self.name}: {task.compile_prompt().splitlines()[1]}"
+
+def _seed(task_count: int, agent_count: int = 1) -> tuple[int, list[str]]:
+    init_db()
+    with SessionLocal() as db, unit_of_work(db):
+        unique_id = str(uuid.uuid4())[:8]
+        role = create_role(db, name=f"RunnerRole-{unique_id}")
+        model = create_model(db, name=f"runner-model-{unique_id}")
+        agents = create_agents_bulk(
+            db, [{"name": f"RunnerAgent-{i}-{unique_id}", "role": role, "models_": [model]} for i in range(agent_count)]
+        )
+        project = create_project(db, name=f"RunnerProject-{unique_id}", goal="Run in parallel")
+        create_tasks_bulk(db, project=project, tasks=[{"title": f"T{i}", "agents": agents} for i in range(task_count)])
+        return project.id, [a.name for a in agents]
+
+def _tasks(project_id: int) -> list[models.Task]:
+    with SessionLocal() as db:
+        return list(db.query(models.Task).filter_by(project_id=project_id).order_by(models.Task.id))
+
+def test_thread_runner_bounded_by_concurrency():
+    project_id, _ = _seed(8)
+    runner = TaskRunner(agent_factory=lambda a: SleepyAgent(a.name), concurrency=4)
+    start = time.perf_counter()
+    outcomes = runner.run_project(project_id)
+    elapsed = time.perf_counter() - start
+
+    assert [o.status for o in outcomes] == [COMPLETED] * 8
+    assert elapsed < 0.8 * 8 * 0.1  # serial execution would take >= 0.8s
+    tasks = _tasks(project_id)
+    assert all(t.status == COMPLETED for t in tasks)
+    assert tasks[0].result.endswith("Task: T0")
+
+    # Nothing is pending any more, so a second run is a no-op.
+    assert runner.run_project(project_id) == []
+
+def test_runner_falls_back_across_agents_and_records_failure():
+    project_id, names = _seed(2, agent_count=2)
+    runner = TaskRunner(agent_factory=lambda a: SleepyAgent(a.name, delay=0, fail=a.name == names[0]))
+    outcomes = runner.run_project(project_id)
+    assert [o.status for o in outcomes] == [COMPLETED, COMPLETED]
+    assert all(o.result.startswith(names[1]) for o in outcomes)
+
+    project_id, _ = _seed(1)
+    (outcome,) = TaskRunner(agent_factory=lambda a: SleepyAgent(a.name, delay=0, fail=True)).run_project(project_id)
+    assert outcome.status == FAILED
+    (task,) = _tasks(project_id)
+    assert task.status == FAILED and "boom" in task.result
+
+def test_execute_task_skips_claimed_task():
+    project_id, _ = _seed(1)
+    (task,) = _tasks(project_id)
+    assert execute_task(task.id, agent_factory=lambda a: SleepyAgent(a.name, delay=0)).status == COMPLETED
+    assert execute_task(task.id, agent_factory=lambda a: SleepyAgent(a.name, delay=0)).status == "skipped"
+
+def test_async_runner():
+    project_id, _ = _seed(6)
+    runner = TaskRunner(agent_factory=lambda a: SleepyAgent(a.name), concurrency=6, mode="async")
+    start = time.perf_counter()
+    outcomes = runner.run_project(project_id)
+    assert time.perf_counter() - start < 0.5
+    assert [o.status for o in outcomes] == [COMPLETED] * 6
+    assert all(t.status == COMPLETED for t in _tasks(project_id))
+
+def test_unknown_mode_is_rejected():
+    assert [m.value for m in RunMode] == list(get_args(Mode))
+    with pytest.raises(ValueError):
+        TaskRunner(mode="threads")
+    result = CliRunner().invoke(app, ["run", "1", "--mode", "threads"])
+    assert result.exit_code == 2 and "threads" in result.output
+
+class UnstorableAgent:
+    """Returns a result the ``tasks.result`` column cannot hold."""
+
+    def run(self, task):
+        return object()
+
+    async def arun(self, task):
+        return object()
+
+def test_unwritable_result_fails_the_task_instead_of_leaving_it_running():
+    from mimi3.database import AsyncSessionLocal
+
+    for mode in ("thread", "async"):
+        project_id, _ = _seed(1)
+        runner = TaskRunner(
+            agent_factory=lambda a: UnstorableAgent(),
+            session_factory=SessionLocal,
+            async_session_factory=AsyncSessionLocal,
+            mode=mode,
+        )
+        (outcome,) = runner.run_project(project_id)
+        (task,) = _tasks(project_id)
+        assert outcome.status == FAILED and task.status == FAILED
+        assert task.result.startswith("Could not record the result")
+    with pytest.raises(ValueError):
+        TaskRunner(session_factory=SessionLocal, mode="async")
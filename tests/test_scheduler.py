@@ -0,0 +1,108 @@
+"""TaskGraph ordering, critical-path ranks and dependency-aware runs."""
+import threading
+import time
+import uuid
+import pytest
+from mimi3.crud import create_role, create_model, create_agent, create_project, create_tasks_bulk, unit_of_work
+from mimi3.database import init_db, SessionLocal
+from mimi3.runner import TaskRunner, COMPLETED, FAILED
+from mimi3.scheduler import TaskGraph, ReadyQueue, CycleError, load_plan
+from mimi3 import models
+
+def test_graph_order_ranks_and_critical_path():
+    #   1 -> 2 -> 3 -> 4   (long chain)
+    #   5                  (independent)
+    #   6 -> 4
+    graph = TaskGraph([1, 2, 3, 4, 5, 6], [(2, 1), (3, 2), (4, 3), (4, 6)])
+    order = graph.topological_order()
+    assert order.index(1) < order.index(2) < order.index(3) < order.index(4)
+    assert order.index(6) < order.index(4)
+    assert graph.ranks() == {1: 4.0, 2: 3.0, 3: 2.0, 4: 1.0, 5: 1.0, 6: 2.0}
+    assert graph.critical_path() == [1, 2, 3, 4]
+
+    queue = ReadyQueue(graph)
+    assert queue.pop() == 1  # critical path first
+    assert queue.complete(1) == [2]
+    assert queue.fail(6) == [4]
+    assert sorted([queue.pop(), queue.pop(), queue.pop()]) == [2, 5, 6]
+    assert queue.complete(2) == [3]
+    queue.pop()
+    assert queue.complete(3) == []  # 4 was dropped
+    assert not queue
+
+def test_cycle_is_rejected():
+    with pytest.raises(CycleError):
+        TaskGraph([1, 2, 3], [(1, 2), (2, 3), (3, 1)]).topological_order()
+
+class RecordingAgent:
+    def __init__(self, name: str, log: list, fail_titles=()) -> None:
+        self.name = name
+        self.log = log
+        self.fail_titles = fail_titles
+        self.lock = threading.Lock()
+
+    def run(self, task) -> str:
+        prompt = task.compile_prompt()
+        title = prompt.splitlines()[1].removeprefix("Task: ")
+        with self.lock:
+            self.log.append(("start", title, time.perf_counter()))
+        time.sleep(0.05 if title != "slow" else 0.2)
+        with self.lock:
+            self.log.append(("end", title, time.perf_counter()))
+        if title in self.fail_titles:
+            raise RuntimeError("boom")
+        return f"{title} done ({prompt.count('Input from')} inputs)"
+
+def _seed(edges: dict[str, list[str]]) -> tuple[int, dict[str, int]]:
+    init_db()
+    with SessionLocal() as db, unit_of_work(db):
+        unique_id = str(uuid.uuid4())[:8]
+        role = create_role(db, name=f"DagRole-{unique_id}")
+        agent = create_agent(
+            db, name=f"DagAgent-{unique_id}", role=role, models_=[create_model(db, name=f"dag-{unique_id}")]
+        )
+        project = create_project(db, name=f"DagProject-{unique_id}", goal="Respect dependencies")
+        ids: dict[str, int] = {}
+        for title, deps in edges.items():  # parents are listed before children
+            (task,) = create_tasks_bulk(
+                db, project=project, tasks=[{"title": title, "agents": [agent], "depends_on": [ids[d] for d in deps]}]
+            )
+            ids[title] = task.id
+        return project.id, ids
+
+def test_runner_starts_dependents_as_soon_as_inputs_finish():
+    # "fast" needs only "a"; it must not wait for the unrelated "slow".
+    project_id, ids = _seed({"a": [], "slow": [], "fast": ["a"], "join": ["fast", "slow"]})
+    log: list = []
+    agent = RecordingAgent("dag", log)
+    outcomes = TaskRunner(agent_factory=lambda a: agent, concurrency=4).run_project(project_id)
+    assert [o.status for o in outcomes] == [COMPLETED] * 4
+
+    at = {(kind, title): t for kind, title, t in log}
+    assert at[("start", "fast")] >= at[("end", "a")]
+    assert at[("start", "fast")] < at[("end", "slow")]
+    assert at[("start", "join")] >= max(at[("end", "fast")], at[("end", "slow")])
+    with SessionLocal() as db:
+        assert db.get(models.Task, ids["join"]).result == "join done (2 inputs)"
+
+def test_failed_input_blocks_downstream_tasks():
+    project_id, ids = _seed({"a": [], "b": ["a"], "c": ["b"], "d": []})
+    agent = RecordingAgent("dag", [], fail_titles={"a"})
+    outcomes = {o.task_id: o for o in TaskRunner(agent_factory=lambda a: agent).run_project(project_id)}
+    assert outcomes[ids["a"]].status == FAILED
+    assert outcomes[ids["d"]].status == COMPLETED
+    with SessionLocal() as db:
+        for title in ("b", "c"):
+            task = db.get(models.Task, ids[title])
+            assert task.status == FAILED and task.result.startswith("Not run")
+
+def test_pending_input_in_another_project_defers_the_task():
+    upstream, up_ids = _seed({"elsewhere": []})
+    project_id, ids = _seed({"a": [], "b": ["a"]})
+    with SessionLocal() as db, unit_of_work(db):
+        task = db.get(models.Task, ids["a"])
+        task.dependencies.append(db.get(models.Task, up_ids["elsewhere"]))
+    with SessionLocal() as db:
+        plan = load_plan(db, project_id)
+    assert plan.deferred == [ids["a"], ids["b"]] and len(plan.graph) == 0
+    assert TaskRunner(agent_factory=lambda a: RecordingAgent("dag", [])).run_project(project_id) == []
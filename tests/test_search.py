@@ -0,0 +1,58 @@
+"""Full-text search over memories and task results (SQLite FTS5 path)."""
+import uuid
+from typer.testing import CliRunner
+from mimi3 import models
+from mimi3.cli import app
+from mimi3.crud import create_role, create_model, create_agent, create_project, create_task
+from mimi3.database import init_db, SessionLocal
+from mimi3.search import search_memories, search_tasks
+from mimi3.tools.memory import MemoryTool
+
+def _project(db):
+    unique_id = str(uuid.uuid4())[:8]
+    role = create_role(db, name=f"FtsRole-{unique_id}")
+    agent = create_agent(db, name=f"FtsAgent-{unique_id}", role=role, models_=[create_model(db, name="m")])
+    project = create_project(db, name=f"FtsProject-{unique_id}", goal="Search")
+    return agent, project, unique_id
+
+def test_memory_search_ranks_and_tracks_writes():
+    init_db()
+    with SessionLocal() as db:
+        agent, project, uid = _project(db)
+        task = create_task(db, project=project, title=f"FtsTask-{uid}")
+        mem = MemoryTool(db)
+        mem.save(agent_id=agent.id, task_id=task.id, content=f"zebra{uid} migration notes")
+        mem.save_many(
+            [
+                {"agent_id": agent.id, "task_id": task.id, "content": f"zebra{uid} zebra{uid} migration migration"},
+                {"agent_id": agent.id, "task_id": task.id, "content": "unrelated chatter"},
+            ]
+        )
+        hits = search_memories(db, f"migration zebra{uid}", project_id=project.id)
+        assert [h.text for h in hits] == [f"zebra{uid} zebra{uid} migration migration", f"zebra{uid} migration notes"]
+        assert hits[0].rank >= hits[1].rank
+        recent = search_memories(db, f"zebra{uid}", order="recent")
+        assert [h.text for h in recent][-1] == f"zebra{uid} migration notes"
+        assert search_memories(db, f"zebra{uid} absentword") == []
+        assert search_memories(db, "  ") == []
+
+        # Deletes are reflected too.
+        db.query(models.Memory).filter(models.Memory.id == hits[0].id).delete()
+        db.commit()
+        assert [h.id for h in search_memories(db, f"zebra{uid}")] == [hits[1].id]
+
+def test_task_search_sees_result_updates_and_cli():
+    init_db()
+    with SessionLocal() as db:
+        _, project, uid = _project(db)
+        task = create_task(db, project=project, title=f"Deploy okapi{uid}")
+        assert [h.id for h in search_tasks(db, f"okapi{uid}")] == [task.id]
+        assert search_tasks(db, f"flamingo{uid}") == []
+        task.result = f"rolled back because flamingo{uid} failed"
+        db.commit()
+        (hit,) = search_tasks(db, f"flamingo{uid}", project_id=project.id)
+        assert hit.id == task.id and "rolled back" in hit.text
+
+    result = CliRunner().invoke(app, ["search", f"flamingo{uid}"])
+    assert result.exit_code == 0
+    assert f"[task {task.id}]" in result.output
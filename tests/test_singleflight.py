@@ -0,0 +1,86 @@
+"""Coalescing of identical in-flight LLM calls across threads and tasks."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+from mimi3.agents import base
+from mimi3.agents.base import MultiModelAgent
+from mimi3.llm.singleflight import SingleFlight
+
+def _task(prompt: str) -> SimpleNamespace:
+    return SimpleNamespace(compile_prompt=lambda *args, **kwargs: prompt)
+
+@pytest.fixture
+def behaviours():
+    return {"slow": {"delay": 0.2}}
+
+def _agent(name: str = "Flight", **kwargs) -> MultiModelAgent:
+    return MultiModelAgent(name=name, role="r", goal="g", backstory="b", models=["slow"], **kwargs)
+
+def test_threads_share_one_request(fake):
+    agents = [_agent(f"Flight {i}") for i in range(4)]  # same persona, different agents
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda a: a.run(_task("same")), agents))
+    assert results == ["slow: ok"] * 4
+    assert len(fake.requests) == 1
+    assert base._flights.leaders == 1 and base._flights.coalesced == 3 and len(base._flights) == 0
+    assert sum(s.coalesced for s in base._telemetry.summaries()) == 3
+
+    _agent(single_flight=False).run(_task("same"))
+    assert len(fake.requests) == 2
+
+def test_async_tasks_share_one_request_but_not_different_prompts(fake):
+    agent = _agent()
+
+    async def main():
+        return await asyncio.gather(*(agent.arun(_task(p)) for p in ["a", "a", "a", "b"]))
+
+    start = time.perf_counter()
+    assert asyncio.run(main()) == ["slow: ok"] * 4
+    assert time.perf_counter() - start < 0.35
+    assert sorted(r["prompt"] for r in fake.requests) == ["a", "b"]
+
+def test_errors_reach_every_waiter(fake):
+    fake.behaviours["slow"]["fail"] = True
+    barrier, errors = threading.Barrier(3), []
+
+    def call():
+        barrier.wait()
+        try:
+            _agent().run(_task("doomed"))
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(errors) == 3 and len(fake.requests) == 1 and len(base._flights) == 0
+
+def test_cancelling_one_waiter_keeps_the_call_for_the_others():
+    flights, calls = SingleFlight(), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flights.ado("k", fetch))
+        second = asyncio.ensure_future(flights.ado("k", fetch))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        assert await second == ("done", False)
+        assert first.cancelled()
+
+        lonely = asyncio.ensure_future(flights.ado("k2", fetch))
+        await asyncio.sleep(0.02)
+        lonely.cancel()
+        await asyncio.sleep(0.01)
+        assert len(flights) == 0  # the orphaned leader was stopped
+
+    asyncio.run(main())
+    assert len(calls) == 2
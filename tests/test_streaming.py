@@ -0,0 +1,60 @@
+"""Streaming output from MultiModelAgent and sinks."""
+import asyncio
+import io
+import uuid
+from types import SimpleNamespace
+from mimi3.agents.builder_agent import BuilderAgent
+from mimi3.crud import create_role, create_agent, create_model, create_project, create_task
+from mimi3.database import init_db, SessionLocal
+from mimi3.llm.streaming import MemorySink, StdoutSink
+from mimi3.tools.memory import MemoryTool
+
+TASK = SimpleNamespace(compile_prompt=lambda *args, **kwargs: "Write code")
+
+def _builder(*models):
+    return BuilderAgent(name="Streamer", role="builder", goal="build", backstory="none", models=list(models))
+
+def test_stream_yields_tokens_and_stats(fake):
+    fake.behaviours = {"m": {"response": "print ( 'hi' )", "token_delay": 0.01}}
+    stream = _builder("m").stream(TASK)
+    assert list(stream) == ["print", " (", " 'hi'", " )"]
+    assert stream.stats.model == "m"
+    assert stream.stats.tokens == 4
+    assert stream.stats.time_to_first_token is not None
+    assert stream.stats.tokens_per_sec > 0
+
+def test_stream_falls_back_before_first_token(fake):
+    fake.behaviours = {"broken": {"fail": True}, "good": {"response": "a b"}}
+    stream = _builder("broken", "good").stream(TASK)
+    assert "".join(stream) == "a b"
+    assert stream.stats.model == "good"
+
+def test_astream(fake):
+    fake.behaviours = {"m": {"response": "x y z"}}
+
+    async def collect():
+        stream = _builder("m").astream(TASK)
+        return [chunk async for chunk in stream], stream.stats
+
+    chunks, stats = asyncio.run(collect())
+    assert "".join(chunks) == "x y z"
+    assert stats.tokens == 3
+
+def test_build_forwards_to_sinks(fake):
+    fake.behaviours = {"m": {"response": "line one\nline two"}}
+    out = io.StringIO()
+    assert _builder("m").build(TASK, sink=StdoutSink(out)) == "line one\nline two"
+    assert out.getvalue() == "line one\nline two\n"
+
+    init_db()
+    with SessionLocal() as db:
+        unique_id = str(uuid.uuid4())[:8]
+        role = create_role(db, name=f"SinkRole-{unique_id}")
+        model = create_model(db, name=f"m-{unique_id}")
+        agent = create_agent(db, name=f"SinkAgent-{unique_id}", role=role, models_=[model])
+        project = create_project(db, name=f"SinkProject-{unique_id}", goal="Testing")
+        task = create_task(db, project=project, title=f"SinkTask-{unique_id}")
+
+        mem = MemoryTool(db)
+        _builder("m").build(TASK, sink=MemorySink(mem, agent_id=agent.id, task_id=task.id))
+        assert mem.recall(agent_id=agent.id, task_id=task.id) == ["line two", "line one"]
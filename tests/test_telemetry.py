@@ -0,0 +1,106 @@
+"""Per-call LLM telemetry, reports and the Prometheus endpoint."""
+import threading
+import time
+import urllib.request
+import uuid
+import pytest
+from typer.testing import CliRunner
+from mimi3.agents import base
+from mimi3.agents.base import MultiModelAgent
+from mimi3.cli import app
+from mimi3.crud import create_project, create_task
+from mimi3.database import init_db, SessionLocal
+from mimi3.llm.telemetry import OK, CallRecord, Telemetry, render_prometheus, serve_metrics, summarize
+from mimi3.runner import PromptTask
+
+@pytest.fixture
+def behaviours():
+    return {"broken": {"fail": True}, "good": {"delay": 0.05, "load_delay": 0.1}}
+
+@pytest.fixture
+def fake(fake, monkeypatch):
+    init_db()
+    monkeypatch.setattr(base, "_telemetry", Telemetry(SessionLocal, flush_every=1000))
+    return fake
+
+def _agent(name: str) -> MultiModelAgent:
+    return MultiModelAgent(name=name, role="r", goal="g", backstory="b", models=["broken", "good"], routing="static")
+
+def test_calls_are_recorded_with_breakdown_and_fallbacks(fake):
+    name = f"Tele-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        project = create_project(db, name=f"TeleProject-{name}", goal="Measure")
+        task = create_task(db, project=project, title="Measured")
+        project_id, task_id = project.id, task.id
+
+    agent = _agent(name)
+    agent.run(PromptTask("hello", task_id))
+    assert "".join(agent.stream(PromptTask("stream these tokens", task_id))) == "good: ok"
+
+    (agent_totals,) = [s for s in base._telemetry.summaries() if s.group == (name, "good")]
+    assert agent_totals.calls == 2 and agent_totals.fallbacks == 2 and agent_totals.completion_tokens == 2
+    assert agent_totals.load == pytest.approx(0.1, abs=0.05)  # the first call paid the load
+    assert agent_totals.inference == pytest.approx(0.1, abs=0.05)
+    assert base._telemetry.flush() == 4
+
+    with SessionLocal() as db:
+        rows = {r.group: r for r in summarize(db, by=["agent", "model"], project_id=project_id)}
+        assert set(rows) == {(name, "broken"), (name, "good")}
+        assert rows[(name, "broken")].errors == 2 and rows[(name, "broken")].calls == 2
+        good = rows[(name, "good")]
+        assert good.fallbacks == 2 and good.latency >= 0.2 and good.load == pytest.approx(0.1, abs=0.05)
+        (by_task,) = summarize(db, by=["task"], project_id=project_id)
+        assert by_task.group == (task_id,) and by_task.calls == 4
+
+def test_prometheus_text_and_endpoint(fake):
+    name = f'Prom "{uuid.uuid4().hex[:6]}"'
+    _agent(name).run(PromptTask("hello"))
+    text = base._telemetry.render()
+    escaped = name.replace('"', '\\"')
+    assert "# TYPE mimi3_llm_calls_total counter" in text
+    assert f'mimi3_llm_errors_total{{agent="{escaped}",model="broken"}} 1' in text
+    assert f'mimi3_llm_fallbacks_total{{agent="{escaped}",model="good"}} 1' in text
+
+    server = serve_metrics(base._telemetry.render, port=0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain")
+            assert resp.read().decode() == base._telemetry.render()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert render_prometheus([], ["model"]).count("# TYPE") == 10
+
+def test_full_batch_is_written_in_the_background():
+    gate = threading.Event()
+
+    class SlowSession:
+        def __enter__(self):
+            gate.wait()
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, stmt, rows):
+            written.extend(rows)
+
+        def commit(self):
+            pass
+
+    written: list = []
+    telemetry = Telemetry(SlowSession, flush_every=2)
+    start = time.perf_counter()
+    for _ in range(3):
+        telemetry.record(CallRecord("m", "a", None, OK, 1, 0.1))
+    assert time.perf_counter() - start < 0.1 and written == []  # the caller did not wait for the insert
+    gate.set()
+    telemetry.flush()
+    assert len(written) == 3
+
+def test_report_rejects_unknown_grouping():
+    result = CliRunner().invoke(app, ["report", "--by", "agnet"])
+    assert result.exit_code == 2 and "agnet" in result.output
+    with SessionLocal() as db, pytest.raises(ValueError):
+        summarize(db, by=["agnet"])
@@ -0,0 +1,88 @@
+"""Embedding pipeline, vector indexes and MemoryTool.search."""
+import uuid
+import numpy as np
+from ollama import Client
+from mimi3.crud import create_role, create_model, create_agent, create_project, create_task
+from mimi3.database import init_db, SessionLocal
+from mimi3.llm.embeddings import HashEmbedder, OllamaEmbedder
+from mimi3.tools.compaction import compact
+from mimi3.tools.memory import MemoryTool
+from mimi3.tools.vector_index import BruteForceIndex, IVFIndex, MemoryIndex
+from tests.fake_ollama import FakeOllama
+
+def _clustered(n: int, dim: int = 32, clusters: int = 20, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    points = centres[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+
+def test_ivf_recall_close_to_brute_force():
+    vectors = _clustered(5000)
+    ids = np.arange(5000)
+    exact, approx = BruteForceIndex(), IVFIndex(n_lists=40, n_probe=6, train_size=2000)
+    exact.add(ids, vectors)
+    approx.add(ids[:2500], vectors[:2500])  # trains on the first batch
+    approx.add(ids[2500:], vectors[2500:])  # later vectors join existing cells
+
+    queries = _clustered(50, seed=2)
+    overlap = [
+        len({i for i, _ in exact.search(q, 10)} & {i for i, _ in approx.search(q, 10)}) / 10 for q in queries
+    ]
+    assert np.mean(overlap) >= 0.8
+
+    # Re-adding an id replaces its vector.
+    exact.add([7], [queries[0]])
+    assert exact.search(queries[0], 1)[0][0] == 7
+    assert len(exact) == 5000
+
+def test_group_filter():
+    index = BruteForceIndex()
+    index.add([1, 2, 3], np.eye(3, dtype=np.float32), groups=[10, 20, 10])
+    assert {i for i, _ in index.search([0, 1, 0], 3, group=10)} == {1, 3}
+
+def test_ollama_embedder_batches_requests():
+    with FakeOllama() as fake:
+        embedder = OllamaEmbedder("embed-model", client=Client(host=fake.url), batch_size=2)
+        vectors = embedder.embed(["a", "bbb", "cc", "d", "eeee"])
+    assert len(fake.requests) == 3
+    assert vectors.shape == (5, 2)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+
+def test_memory_search_across_tasks_in_project():
+    init_db()
+    with SessionLocal() as db:
+        unique_id = str(uuid.uuid4())[:8]
+        role = create_role(db, name=f"SearchRole-{unique_id}")
+        agent = create_agent(db, name=f"SearchAgent-{unique_id}", role=role, models_=[create_model(db, name="m")])
+        project = create_project(db, name=f"SearchProject-{unique_id}", goal="Find things")
+        other = create_project(db, name=f"OtherProject-{unique_id}", goal="Noise")
+        task_a = create_task(db, project=project, title="A")
+        task_b = create_task(db, project=project, title="B")
+        task_c = create_task(db, project=other, title="C")
+
+        mem = MemoryTool(db, index=MemoryIndex(HashEmbedder(dim=512)))
+        mem.save(agent_id=agent.id, task_id=task_a.id, content="the database schema uses postgres tables")
+        mem.save(agent_id=agent.id, task_id=task_a.id, content="lunch was pizza")
+        mem.save(agent_id=agent.id, task_id=task_b.id, content="rust compiler error in the borrow checker")
+        mem.save(agent_id=agent.id, task_id=task_c.id, content="postgres tables for the database schema")
+
+        assert mem.search("postgres database schema", k=1, project_id=project.id) == [
+            "the database schema uses postgres tables"
+        ]
+        assert mem.search("borrow checker error", k=1, project_id=project.id) == [
+            "rust compiler error in the borrow checker"
+        ]
+        assert len(mem.search("postgres database schema", k=2)) == 2
+
+        # Compacted entries drop out; their summary becomes searchable.
+        compact(db, agent_id=agent.id, task_id=task_a.id, summarize=lambda e: "summary about postgres", keep_last=0)
+        assert mem.search("postgres database schema", k=1, project_id=project.id) == ["summary about postgres"]
+
+        # Many removed entries ahead of a live one do not crowd it out.
+        for i in range(40):
+            mem.save(agent_id=agent.id, task_id=task_a.id, content=f"postgres database schema note {i}")
+        mem.search("postgres database schema", k=1)  # index them before they are removed
+        compact(db, agent_id=agent.id, task_id=task_a.id, summarize=lambda e: "summary about postgres", keep_last=0)
+        assert mem.search("postgres database schema", k=2, project_id=project.id) == [
+            "summary about postgres", "rust compiler error in the borrow checker"
+        ]
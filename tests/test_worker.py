@@ -0,0 +1,132 @@
+"""Queue workers lease tasks from the shared tasks table."""
+import threading
+import time
+import uuid
+from collections import Counter
+from mimi3.crud import create_role, create_model, create_agent, create_project, create_tasks_bulk, unit_of_work
+from mimi3.database import init_db, SessionLocal
+from mimi3.runner import COMPLETED, FAILED, PENDING, run_claimed_task
+from mimi3.worker import Worker, claim_next, requeue_expired
+from mimi3 import models, worker
+
+class CountingAgent:
+    def __init__(self) -> None:
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def run(self, task) -> str:
+        title = task.compile_prompt().splitlines()[1]
+        with self.lock:
+            self.calls[title] += 1
+        time.sleep(0.02)
+        return title
+
+class FailingRootAgent(CountingAgent):
+    def run(self, task) -> str:
+        title = super().run(task)
+        if title == "Task: root":
+            raise RuntimeError("root broke")
+        return title
+
+def _seed(titles: list[str], depends_on_first: bool = False) -> tuple[int, list[int]]:
+    init_db()
+    with SessionLocal() as db, unit_of_work(db):
+        unique_id = str(uuid.uuid4())[:8]
+        role = create_role(db, name=f"WorkerRole-{unique_id}")
+        agent = create_agent(
+            db, name=f"WorkerAgent-{unique_id}", role=role, models_=[create_model(db, name=f"w-{unique_id}")]
+        )
+        project = create_project(db, name=f"WorkerProject-{unique_id}", goal="Drain the queue")
+        (first,) = create_tasks_bulk(db, project=project, tasks=[{"title": titles[0], "agents": [agent]}])
+        rest = create_tasks_bulk(
+            db,
+            project=project,
+            tasks=[{"title": t, "agents": [agent], "depends_on": [first] if depends_on_first else []} for t in titles[1:]],
+        )
+        return project.id, [first.id] + [t.id for t in rest]
+
+def _statuses(task_ids: list[int]) -> list[str]:
+    with SessionLocal() as db:
+        return [db.get(models.Task, i).status for i in task_ids]
+
+def test_workers_share_the_queue_without_duplicates():
+    project_id, task_ids = _seed([f"T{i}" for i in range(12)])
+    agent = CountingAgent()
+    workers = [
+        Worker(agent_factory=lambda a: agent, concurrency=2, project_id=project_id, poll_interval=0.01) for _ in range(2)
+    ]
+    threads = [threading.Thread(target=w.run, kwargs={"exit_when_idle": True}) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert set(agent.calls.values()) == {1} and len(agent.calls) == 12
+    assert sum(w.stats.completed for w in workers) == 12
+    assert _statuses(task_ids) == [COMPLETED] * 12
+    with SessionLocal() as db:
+        task = db.get(models.Task, task_ids[0])
+        assert task.attempts == 1 and task.lease_owner is None
+
+def test_claim_waits_for_dependencies():
+    project_id, task_ids = _seed(["root", "child"], depends_on_first=True)
+    with SessionLocal() as db:
+        assert claim_next(db, "w1", lease_seconds=30, project_id=project_id) == task_ids[0]
+        assert claim_next(db, "w2", lease_seconds=30, project_id=project_id) is None
+    run_claimed_task(task_ids[0], agent_factory=lambda a: CountingAgent(), session_factory=SessionLocal, owner="w1")
+    with SessionLocal() as db:
+        assert claim_next(db, "w2", lease_seconds=30, project_id=project_id) == task_ids[1]
+
+def test_expired_lease_is_requeued_then_failed():
+    project_id, (task_id,) = _seed(["lonely"])
+    with SessionLocal() as db:
+        # A worker that died right after claiming: its lease is already over.
+        assert claim_next(db, "dead", lease_seconds=-1, project_id=project_id) == task_id
+        assert requeue_expired(db, max_attempts=2) == (1, 0)
+    assert _statuses([task_id]) == [PENDING]
+
+    # The dead worker cannot overwrite a task it no longer owns.
+    with SessionLocal() as db:
+        assert claim_next(db, "alive", lease_seconds=-1, project_id=project_id) == task_id
+    outcome = run_claimed_task(task_id, agent_factory=lambda a: CountingAgent(), session_factory=SessionLocal, owner="dead")
+    assert outcome.status == "skipped"
+
+    with SessionLocal() as db:
+        assert requeue_expired(db, max_attempts=2) == (0, 1)
+        task = db.get(models.Task, task_id)
+        assert task.status == FAILED and task.attempts == 2
+
+def test_failed_upstream_fails_its_dependents():
+    project_id, task_ids = _seed(["root", "child", "sibling"], depends_on_first=True)
+    agent = FailingRootAgent()
+    w = Worker(agent_factory=lambda a: agent, project_id=project_id, poll_interval=0.01)
+    stats = w.run(exit_when_idle=True)
+
+    assert list(agent.calls) == ["Task: root"]
+    assert _statuses(task_ids) == [FAILED] * 3
+    assert stats.failed == 1 and stats.blocked == 2
+    with SessionLocal() as db:
+        assert db.get(models.Task, task_ids[1]).result == f"Not run: dependency {task_ids[0]} failed"
+
+def test_heartbeat_survives_a_failed_beat(monkeypatch):
+    project_id, (task_id,) = _seed(["slow"])
+    renew, beats = worker.renew_leases, []
+
+    def flaky_renew(*args, **kwargs):
+        beats.append(args[2])
+        if len(beats) == 1:
+            raise ConnectionError("database went away")
+        return renew(*args, **kwargs)
+
+    class SlowAgent(CountingAgent):
+        def run(self, task) -> str:
+            time.sleep(0.3)
+            return super().run(task)
+
+    monkeypatch.setattr(worker, "renew_leases", flaky_renew)
+    w = Worker(agent_factory=lambda a: SlowAgent(), project_id=project_id, lease_seconds=0.15, poll_interval=0.01)
+    stats = w.run(exit_when_idle=True)
+
+    assert len(beats) >= 2 and [task_id] in beats[1:]
+    assert stats.completed == 1 and stats.lost == 0
+    assert _statuses([task_id]) == [COMPLETED]